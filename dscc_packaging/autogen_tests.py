@@ -1,11 +1,18 @@
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import ast
+import hashlib
+import json
+import os
 import yaml
 import logging
 
-from .notebook_io import read_notebook_source_lines, write_metadata_block
+from .columns import COLUMN_FUNCTIONS, extract_columns
+from .notebook_io import parse_notebook, write_metadata_block
+from .shared_utils import get_cache_dir
 from .utils import generate_dscc_metadata
+from .sampling import SampleRequest, SamplingOptions, capture_samples
 
 try:
     from pyspark.sql import SparkSession
@@ -34,33 +41,23 @@ def prompt_input_args(defaults: Dict[str, Any]) -> Dict[str, Any]:
             result[k] = v
     return result
 
-def get_sample_data(table_name: str, func_name: str, notebook_path: Path, noninteractive: bool = False) -> Path:
+def prompt_sample_request(table_name: str, func_name: str, notebook_path: Path, noninteractive: bool = False, sample_format: str = "json", sampling: Optional[SamplingOptions] = None) -> SampleRequest:
     override = table_name
     if not noninteractive:
         print(f"📌 Detected use of `{table_name}` in `{func_name}`.")
         override = input(f"🔁 Table to use for sample data [default: {table_name}]: ").strip() or table_name
 
-    sample_path = notebook_path.parent.parent / "tests" / f"{func_name}_{override.replace('.', '_')}_sample.json"
+    sample_path = notebook_path.parent.parent / "tests" / f"{func_name}_{override.replace('.', '_')}_sample.{sample_format}"
 
-    try:
-        spark = SparkSession.getActiveSession() or SparkSession.builder.getOrCreate()
-        spark.sparkContext.setLogLevel("ERROR")
-        logging.getLogger("py4j").setLevel(logging.ERROR)
-        logging.getLogger("org.apache.spark").setLevel(logging.ERROR)
-
-        if not noninteractive:
-            print("🧪 Optional filter expression (e.g., action_name = 'IpAccessDenied'):")
-        filter_expr = input("🔎 Filter: ").strip() if not noninteractive else ""
-
-        df = spark.table(override)
-        if filter_expr:
-            df = df.filter(filter_expr)
-        df.limit(10).toPandas().to_json(sample_path, orient='records', lines=True)
-        print(f"📁 Sample saved to {sample_path}")
-    except Exception as e:
-        print(f"⚠️ Could not fetch sample for {override}: {e}")
+    if not noninteractive:
+        print("🧪 Optional filter expression (e.g., action_name = 'IpAccessDenied'):")
+    filter_expr = input("🔎 Filter: ").strip() if not noninteractive else ""
+    return SampleRequest(table=override, dest_path=sample_path, filter_expr=filter_expr, options=sampling or SamplingOptions())
 
-    return sample_path
+def get_sample_data(table_name: str, func_name: str, notebook_path: Path, noninteractive: bool = False, sample_format: str = "json", sampling: Optional[SamplingOptions] = None) -> Path:
+    request = prompt_sample_request(table_name, func_name, notebook_path, noninteractive, sample_format, sampling)
+    capture_samples([request], sample_format=sample_format)
+    return request.dest_path
 
 def build_expect_block(noninteractive: bool = False) -> Dict[str, Any]:
     print("📥 Define expectations for this test case.")
@@ -77,94 +74,30 @@ def build_expect_block(noninteractive: bool = False) -> Dict[str, Any]:
         "data": json_path if json_path else None
     }
 
-def build_test_case(func_name: str, call_args: Dict[str, Any], sample_path: Path, table_names: List[str], required_columns: List[str], expect_block: Dict[str, Any]) -> Dict[str, Any]:
+def build_test_case(func_name: str, call_args: Dict[str, Any], sample_paths: Dict[str, Optional[Path]], table_names: List[str], required_columns: List[str], expect_block: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "function": func_name,
         "input": call_args,
         "expect": expect_block,
-        "mocked_inputs": [{"table": t, "path": str(sample_path)} for t in table_names],
+        "mocked_inputs": [{"table": t, "path": str(sample_paths[t]) if sample_paths.get(t) else None} for t in table_names],
         "required_columns": sorted(required_columns)
     }
 
 
-"""
-def infer_dscc_tests(
-    notebook_path: Path,
-    dry_run: bool = False,
-    overwrite: bool = False,
-    no_sample: bool = False,
-    noninteractive: bool = False,
-):
-    notebook_path = normalize_notebook_filename(notebook_path)
-    
-    with open(notebook_path) as f:
-        source_lines = f.readlines()
-        clean_lines = [line for line in source_lines if not line.strip().startswith('%')]
-        tree = ast.parse("".join(clean_lines), filename=str(notebook_path))
-
-    test_cases = []
-    detection_functions, function_calls = {}, {}
-    function_tables, function_columns = {}, {}
-
-    class Analyzer(ast.NodeVisitor):
-        current_function = None
-        def visit_FunctionDef(self, node):
-            detection_functions[node.name] = node
-            Analyzer.current_function = node.name
-            function_tables[node.name], function_columns[node.name] = set(), set()
-            self.generic_visit(node)
-            Analyzer.current_function = None
-
-        def visit_Call(self, node):
-            if isinstance(node.func, ast.Attribute) and node.func.attr == 'table':
-                if isinstance(node.func.value, ast.Name) and node.func.value.id == 'spark':
-                    if node.args and isinstance(node.args[0], ast.Constant):
-                        function_tables[Analyzer.current_function].add(node.args[0].value)
-            elif isinstance(node.func, ast.Name) and node.func.id == 'col':
-                if node.args and isinstance(node.args[0], ast.Constant):
-                    function_columns[Analyzer.current_function].add(node.args[0].value)
-            elif isinstance(node.func, ast.Name) and node.func.id in detection_functions:
-                kwargs = {kw.arg: kw.value.value if isinstance(kw.value, ast.Constant) else None for kw in node.keywords}
-                function_calls.setdefault(node.func.id, []).append(kwargs)
-            self.generic_visit(node)
-
-    Analyzer().visit(tree)
-
-    # First generate dscc metadata
-    dscc_meta = generate_dscc_metadata(notebook_path, overwrite=overwrite, source_lines=source_lines)
-
-    for func_name in detection_functions:
-        calls = function_calls.get(func_name, [{}])
-        for idx, call_args in enumerate(calls):
-            print(f"\n🚀 Configuring test for `{func_name}`:")
-            input_args = prompt_input_args(call_args) if not noninteractive else call_args
-
-            sample_path = None
-            if not no_sample and spark_available:
-                for table in function_tables.get(func_name, []):
-                    sample_path = get_sample_data(table, func_name, notebook_path, noninteractive)
-
-            expect_block = build_expect_block(noninteractive)
-            test_case = build_test_case(func_name, input_args, sample_path, list(function_tables.get(func_name, [])), list(function_columns.get(func_name, [])), expect_block)
-            test_cases.append(test_case)
-
-    if dry_run:
-        print(yaml.dump({"dscc": dscc_meta.get("dscc", {}), "dscc-tests": {"tests": test_cases}}, sort_keys=False))
-        return test_cases
-
-    # write metadata and tests together
-    write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines, overwrite=overwrite)
-
-    return test_cases
-"""
-
-
-
 def analyze_notebook_ast(tree):
+    """
+    Returns (functions, calls, tables, columns, callees) for the functions
+    defined in `tree`: call kwargs of each function, the `spark.table()`
+    tables and the columns (see columns.extract_columns) used directly in
+    its body, and the names it calls (resolved across notebooks by
+    project_index).
+    """
     detection_functions = {}
     function_calls = {}
     function_tables = {}
     function_columns = {}
+    function_callees = {}
+    columns = extract_columns(tree)
 
     class Analyzer(ast.NodeVisitor):
         current_function = None
@@ -172,28 +105,81 @@ def analyze_notebook_ast(tree):
         def visit_FunctionDef(self, node):
             detection_functions[node.name] = node
             Analyzer.current_function = node.name
-            function_tables[node.name], function_columns[node.name] = set(), set()
+            function_tables[node.name] = set()
+            function_columns[node.name] = set(columns.get(node.name, ()))
+            function_callees[node.name] = set()
             self.generic_visit(node)
             Analyzer.current_function = None
 
         def visit_Call(self, node):
+            current = Analyzer.current_function
             if isinstance(node.func, ast.Attribute) and node.func.attr == 'table':
                 if isinstance(node.func.value, ast.Name) and node.func.value.id == 'spark':
-                    if node.args and isinstance(node.args[0], ast.Constant):
-                        function_tables[Analyzer.current_function].add(node.args[0].value)
-            elif isinstance(node.func, ast.Name) and node.func.id == 'col':
-                if node.args and isinstance(node.args[0], ast.Constant):
-                    function_columns[Analyzer.current_function].add(node.args[0].value)
+                    if node.args and isinstance(node.args[0], ast.Constant) and current:
+                        function_tables[current].add(node.args[0].value)
             elif isinstance(node.func, ast.Name) and node.func.id in detection_functions:
                 kwargs = {
                     kw.arg: kw.value.value if isinstance(kw.value, ast.Constant) else None
                     for kw in node.keywords
                 }
                 function_calls.setdefault(node.func.id, []).append(kwargs)
+            if isinstance(node.func, ast.Name) and node.func.id not in COLUMN_FUNCTIONS and current:
+                function_callees[current].add(node.func.id)
             self.generic_visit(node)
 
     Analyzer().visit(tree)
-    return detection_functions, function_calls, function_tables, function_columns
+    return detection_functions, function_calls, function_tables, function_columns, function_callees
+
+
+# Bump when analyze_notebook_ast changes so cached analyses are recomputed
+AST_CACHE_VERSION = 3
+
+
+def summarize_notebook_ast(tree) -> Dict[str, Any]:
+    """
+    JSON-safe form of analyze_notebook_ast: function names in definition
+    order, call kwargs as [name, value] pairs, sorted tables, columns and
+    callees, plus every column used anywhere in the notebook.
+    """
+    detection_functions, function_calls, function_tables, function_columns, function_callees = analyze_notebook_ast(tree)
+    all_columns = set().union(*extract_columns(tree).values())
+    return {
+        "functions": list(detection_functions),
+        "calls": {name: [[list(pair) for pair in kwargs.items()] for kwargs in calls] for name, calls in function_calls.items()},
+        "tables": {name: sorted(tables) for name, tables in function_tables.items()},
+        "columns": {name: sorted(columns) for name, columns in function_columns.items()},
+        "callees": {name: sorted(callees) for name, callees in function_callees.items()},
+        "all_columns": sorted(all_columns),
+    }
+
+
+def load_notebook_analysis(code: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Returns summarize_notebook_ast for a notebook's code cells, cached under
+    <cache>/ast by a hash of the code so unchanged notebooks are not parsed.
+    """
+    key = hashlib.sha256(f"{AST_CACHE_VERSION}\0{code}".encode("utf-8")).hexdigest()
+    cache_path = get_cache_dir() / "ast" / key[:2] / f"{key}.json"
+    if use_cache and cache_path.exists():
+        try:
+            with open(cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    summary = summarize_notebook_ast(ast.parse(code))
+    if use_cache:
+        try:
+            payload = json.dumps(summary)
+        except (TypeError, ValueError):
+            # Non-JSON constants in call kwargs; analyse again next time
+            return summary
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, cache_path)
+    return summary
 
 
 def infer_dscc_tests(
@@ -202,41 +188,67 @@ def infer_dscc_tests(
     overwrite: bool = False,
     no_sample: bool = False,
     noninteractive: bool = False,
+    sample_format: str = "json",
+    sampling: Optional[SamplingOptions] = None,
+    stats: Optional[Counter] = None,
+    validate_notebooks: bool = False,
+    index=None,
+    sample_source=None,
 ):
-    
-
-    notebook_path = normalize_notebook_filename(notebook_path)
-    source_lines = read_notebook_source_lines(notebook_path)
-    clean_lines = [line for line in source_lines if not line.strip().startswith('%')]
-    
-    #tree = ast.parse("".join([line for line in source_lines if not line.strip().startswith('%')]))
-    tree = ast.parse("".join(clean_lines))
+    """
+    Infers dscc-tests for a notebook and writes them with its dscc: block.
+    With a ProjectIndex, tables and columns used through helpers (including
+    `%run` lib functions) are included in each test's mocks and columns.
+    Samples come from `sample_source` (e.g. local snapshots), else Spark.
+    """
 
-    detection_functions, function_calls, function_tables, function_columns = analyze_notebook_ast(tree)
-    dscc_meta = generate_dscc_metadata(notebook_path, overwrite=overwrite, source_lines=source_lines)
 
-    test_cases = []
-    for func_name in detection_functions:
+    notebook_path = normalize_notebook_filename(notebook_path)
+    # Read and split once; shared with metadata generation and the write below
+    parsed = parse_notebook(notebook_path)
+    source_lines = parsed.lines
+    analysis = load_notebook_analysis(parsed.code)
+    function_calls = {name: [dict(pairs) for pairs in calls] for name, calls in analysis["calls"].items()}
+    function_tables, function_columns = analysis["tables"], analysis["columns"]
+    if index is not None:
+        function_tables, function_columns = index.notebook_summaries(notebook_path)
+
+    dscc_meta = generate_dscc_metadata(notebook_path, overwrite=overwrite, source_lines=source_lines, parsed=parsed, noninteractive=noninteractive)
+
+    # Collect all prompts first, then capture every table's sample concurrently
+    pending = []
+    for func_name in analysis["functions"]:
         calls = function_calls.get(func_name, [{}])
         for call_args in calls:
             print(f"\n🚀 Configuring test for `{func_name}`:")
             input_args = prompt_input_args(call_args) if not noninteractive else call_args
 
-            sample_path = None
-            if not no_sample and spark_available:
+            sample_requests = {}
+            if not no_sample and (sample_source is not None or spark_available):
                 for table in function_tables.get(func_name, []):
-                    sample_path = get_sample_data(table, func_name, notebook_path, noninteractive)
+                    sample_requests[table] = prompt_sample_request(table, func_name, notebook_path, noninteractive, sample_format, sampling)
 
             expect_block = build_expect_block(noninteractive)
-            test_case = build_test_case(
-                func_name,
-                input_args,
-                sample_path,
-                list(function_tables.get(func_name, [])),
-                list(function_columns.get(func_name, [])),
-                expect_block
-            )
-            test_cases.append(test_case)
+            pending.append((func_name, input_args, sample_requests, expect_block))
+
+    captured = capture_samples(
+        [request for _, _, sample_requests, _ in pending for request in sample_requests.values()],
+        sample_format=sample_format,
+        source=sample_source,
+    )
+
+    test_cases = []
+    for func_name, input_args, sample_requests, expect_block in pending:
+        sample_paths = {table: captured.get(request) for table, request in sample_requests.items()}
+        test_case = build_test_case(
+            func_name,
+            input_args,
+            sample_paths,
+            list(function_tables.get(func_name, [])),
+            list(function_columns.get(func_name, [])),
+            expect_block
+        )
+        test_cases.append(test_case)
 
     if dry_run:
         print("DEBUG dscc_meta:", dscc_meta)
@@ -259,5 +271,7 @@ def infer_dscc_tests(
             traceback.print_exc()
         return test_cases
 
-    write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines, overwrite=overwrite)
+    written = write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines, overwrite=overwrite, parsed=parsed, validate=validate_notebooks)
+    if stats is not None:
+        stats["written" if written else "unchanged"] += 1
     return test_cases
@@ -1,7 +1,8 @@
 from dscc_tool.logger import logging
 logger = logging.getLogger(__name__)
 
-from . import generator, validate
+from . import delta, generator, ignore, outputs, package, validate
+from .sampling import SAMPLE_FORMATS, SAMPLE_STRATEGIES, STRATIFY_BASES, DEFAULT_SAMPLE_LIMIT, SamplingOptions
 
 import sys
 
@@ -11,15 +12,27 @@ commands = {
     "prepare_notebooks": generator.prepare_notebooks,
     "inject_default_yaml": generator.inject_default_yaml,
     "export": generator.export_for_packaging,
+    "strip_outputs": outputs.strip_app_outputs,
+    "package": package.package_app,
+    "verify_package": package.verify_package,
+    "apply_delta": delta.apply_delta,
+    "clean": ignore.clean_system_files,
 }
 
 # Define allowed options for each command
 allowed_options = {
     'generate_manifest': {'--app_path', '--help'},
     'validate_manifest': {'--manifest_path', '--help'},
-    'prepare_notebooks': {'--app_path', '--overwrite', '--dry_run', '--noninteractive', '--no_sample', '--help'},
-    'inject_default_yaml': {'--app_path', '--help'},
-    'export': {'--workspace_path', '--local_path', '--auto-fix-structure', '--noninteractive', '--help'},
+    'prepare_notebooks': {'--app_path', '--overwrite', '--dry_run', '--noninteractive', '--no_sample', '--sample_format',
+                          '--sample_strategy', '--sample_limit', '--sample_time_column', '--sample_window_days',
+                          '--sample_percent', '--sample_stratify_column', '--sample_stratify_base', '--sample_snapshots', '--validate_notebooks', '--jobs', '--help'},
+    'inject_default_yaml': {'--app_path', '--validate_notebooks', '--help'},
+    'export': {'--workspace_path', '--local_path', '--auto-fix-structure', '--noninteractive', '--jobs', '--full', '--help'},
+    'strip_outputs': {'--app_path', '--dry_run', '--max_notebook_kb', '--max_total_kb', '--help'},
+    'package': {'--app_path', '--output', '--jobs', '--compress_level', '--since', '--help'},
+    'verify_package': {'--zip_path', '--help'},
+    'apply_delta': {'--zip_path', '--app_path', '--force', '--help'},
+    'clean': {'--app_path', '--dry_run', '--help'},
 }
 
 def generate_manifest(app_path="."):
@@ -28,31 +41,68 @@ def generate_manifest(app_path="."):
 def validate_manifest(manifest_path="manifest.yaml"):
     validate.validate_manifest(manifest_path=manifest_path)
 
-def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteractive=False, no_sample=False):
+def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteractive=False, no_sample=False, sample_format="json", sampling=None, validate_notebooks=False, jobs=None, sample_snapshots=None):
     generator.prepare_notebooks(
         app_path=app_path,
         overwrite=overwrite,
         dry_run=dry_run,
         noninteractive=noninteractive,
-        no_sample=no_sample
+        no_sample=no_sample,
+        sample_format=sample_format,
+        sampling=sampling,
+        validate_notebooks=validate_notebooks,
+        jobs=jobs,
+        sample_snapshots=sample_snapshots
     )
 
-def inject_default_yaml(app_path=".", overwrite=False):
-    generator.inject_default_yaml(app_path=app_path, overwrite=overwrite)
+def inject_default_yaml(app_path=".", overwrite=False, validate_notebooks=False):
+    generator.inject_default_yaml(app_path=app_path, overwrite=overwrite, validate_notebooks=validate_notebooks)
 
 def export(
     workspace_path=None,
     local_path=None,
     auto_fix_structure=False,
-    noninteractive=False
+    noninteractive=False,
+    jobs=None,
+    full=False
 ):
     generator.export_for_packaging(
         workspace_path=workspace_path,
         local_path=local_path,
         auto_fix=auto_fix_structure,
-        noninteractive=noninteractive
+        noninteractive=noninteractive,
+        jobs=jobs,
+        full=full
     )
 
+def strip_outputs(app_path=".", dry_run=False, max_notebook_kb=None, max_total_kb=None):
+    if not outputs.strip_app_outputs(
+        app_path=app_path,
+        dry_run=dry_run,
+        max_notebook_kb=max_notebook_kb,
+        max_total_kb=max_total_kb
+    ):
+        sys.exit(1)
+
+def package_app(app_path=".", output=None, jobs=None, compress_level=package.DEFAULT_COMPRESS_LEVEL, since=None):
+    if since:
+        result = delta.package_delta(app_path=app_path, since=since, output=output, jobs=jobs, level=compress_level)
+    else:
+        result = package.package_app(app_path=app_path, output=output, jobs=jobs, level=compress_level)
+    if result is None:
+        sys.exit(1)
+
+def verify_package(zip_path):
+    if not package.verify_package(zip_path):
+        sys.exit(1)
+
+def apply_delta(zip_path, app_path=".", force=False):
+    if not delta.apply_delta(zip_path, app_path=app_path, force=force):
+        sys.exit(1)
+
+def clean(app_path=".", dry_run=False):
+    ignore.clean_system_files(app_path=app_path, dry_run=dry_run)
+
 def main():
     import argparse
 
@@ -74,11 +124,23 @@ def main():
     prep_parser.add_argument("--dry_run", action="store_true", help="Print changes without writing")
     prep_parser.add_argument("--noninteractive", action="store_true", help="Skip prompts and use defaults")
     prep_parser.add_argument("--no_sample", action="store_true", help="Don't fetch sample data")
+    prep_parser.add_argument("--sample_format", choices=SAMPLE_FORMATS, default="json", help="File format for captured samples")
+    prep_parser.add_argument("--sample_strategy", choices=SAMPLE_STRATEGIES, default="limit", help="How sample rows are selected")
+    prep_parser.add_argument("--sample_limit", type=int, default=DEFAULT_SAMPLE_LIMIT, help="Rows per sample (per value for stratified)")
+    prep_parser.add_argument("--sample_time_column", help="Partition/timestamp column for the recent strategy (auto-detected if omitted)")
+    prep_parser.add_argument("--sample_window_days", type=int, default=1, help="Days of data read by the recent strategy")
+    prep_parser.add_argument("--sample_percent", type=float, default=1.0, help="TABLESAMPLE percentage for the tablesample strategy")
+    prep_parser.add_argument("--sample_stratify_column", help="Column to stratify on for the stratified strategy (ranks every row read: scans the whole table unless --sample_stratify_base is set)")
+    prep_parser.add_argument("--sample_stratify_base", choices=STRATIFY_BASES, help="Draw the stratified sample from a recent window or a TABLESAMPLE instead of the whole table")
+    prep_parser.add_argument("--sample_snapshots", help="Read samples from local Parquet/Delta snapshots (a directory or a table-to-path YAML) instead of Spark")
+    prep_parser.add_argument("--validate_notebooks", action="store_true", help="Validate .ipynb files against the nbformat schema before writing")
+    prep_parser.add_argument("--jobs", type=int, help="Worker processes for --noninteractive batch mode (default: CPU count)")
 
     # inject_default_yaml
     inject_parser = subparsers.add_parser("inject_default_yaml", help="Inject default YAML into all notebooks")
     inject_parser.add_argument("--app_path", default=".", help="Path to app root directory")
     inject_parser.add_argument("--overwrite", action="store_true", help="Overwrite existing metadata")
+    inject_parser.add_argument("--validate_notebooks", action="store_true", help="Validate .ipynb files against the nbformat schema before writing")
 
     # export
     export_parser = subparsers.add_parser("export", help="Export a Databricks workspace directory for local packaging")
@@ -86,6 +148,38 @@ def main():
     export_parser.add_argument("--local_path", required=False, help="Local path to export to")
     export_parser.add_argument("--auto-fix-structure", action="store_true", dest="auto_fix_structure", help="Auto-fix structure issues using template_app")
     export_parser.add_argument("--noninteractive", action="store_true", help="Skip prompts and use defaults")
+    export_parser.add_argument("--jobs", type=int, help="Concurrent downloads (default: 8)")
+    export_parser.add_argument("--full", action="store_true", help="Download every object, not only those changed since the last export")
+
+    # strip_outputs
+    strip_parser = subparsers.add_parser("strip_outputs", help="Strip .ipynb cell outputs and check notebook sizes against a budget")
+    strip_parser.add_argument("--app_path", default=".", help="Path to app root directory")
+    strip_parser.add_argument("--dry_run", action="store_true", help="Report sizes without writing")
+    strip_parser.add_argument("--max_notebook_kb", type=int, help="Fail if any notebook is larger than this after stripping")
+    strip_parser.add_argument("--max_total_kb", type=int, help="Fail if all notebooks together are larger than this after stripping")
+
+    # package
+    package_parser = subparsers.add_parser("package", help="Build the app's submission zip")
+    package_parser.add_argument("--app_path", default=".", help="Path to app root directory")
+    package_parser.add_argument("--output", help="Zip file to write (default: <app>.zip next to the app)")
+    package_parser.add_argument("--jobs", type=int, help="Compression threads (default: CPU count)")
+    package_parser.add_argument("--compress_level", type=int, choices=range(0, 10), default=package.DEFAULT_COMPRESS_LEVEL, metavar="0-9", help="Deflate level")
+    package_parser.add_argument("--since", help="Previous package zip or manifest.yaml; build a delta with only the files changed since it")
+
+    # verify_package
+    verify_parser = subparsers.add_parser("verify_package", help="Check a package's files against the digests in its manifest")
+    verify_parser.add_argument("--zip_path", required=True, help="Package zip to verify")
+
+    # apply_delta
+    apply_parser = subparsers.add_parser("apply_delta", help="Apply a delta package to an unpacked copy of the previous release")
+    apply_parser.add_argument("--zip_path", required=True, help="Delta package to apply")
+    apply_parser.add_argument("--app_path", default=".", help="App directory holding the previous release")
+    apply_parser.add_argument("--force", action="store_true", help="Apply even if files differ from the release the delta was built against")
+
+    # clean
+    clean_parser = subparsers.add_parser("clean", help="Remove system files (.DS_Store, __pycache__, checkpoints, ...) from the app")
+    clean_parser.add_argument("--app_path", default=".", help="Path to app root directory")
+    clean_parser.add_argument("--dry_run", action="store_true", help="List what would be removed")
 
     args = parser.parse_args()
 
@@ -99,17 +193,53 @@ def main():
             overwrite=args.overwrite,
             dry_run=args.dry_run,
             noninteractive=args.noninteractive,
-            no_sample=args.no_sample
+            no_sample=args.no_sample,
+            sample_format=args.sample_format,
+            sampling=SamplingOptions(
+                strategy=args.sample_strategy,
+                limit=args.sample_limit,
+                time_column=args.sample_time_column,
+                window_days=args.sample_window_days,
+                percent=args.sample_percent,
+                stratify_column=args.sample_stratify_column,
+                stratify_base=args.sample_stratify_base,
+            ),
+            validate_notebooks=args.validate_notebooks,
+            jobs=args.jobs,
+            sample_snapshots=args.sample_snapshots
         )
     elif args.command == "inject_default_yaml":
-        inject_default_yaml(app_path=args.app_path, overwrite=args.overwrite)
+        inject_default_yaml(app_path=args.app_path, overwrite=args.overwrite, validate_notebooks=args.validate_notebooks)
     elif args.command == "export":
         export(
             workspace_path=args.workspace_path,
             local_path=args.local_path,
             auto_fix_structure=args.auto_fix_structure,
-            noninteractive=args.noninteractive
+            noninteractive=args.noninteractive,
+            jobs=args.jobs,
+            full=args.full
+        )
+    elif args.command == "strip_outputs":
+        strip_outputs(
+            app_path=args.app_path,
+            dry_run=args.dry_run,
+            max_notebook_kb=args.max_notebook_kb,
+            max_total_kb=args.max_total_kb
+        )
+    elif args.command == "package":
+        package_app(
+            app_path=args.app_path,
+            output=args.output,
+            jobs=args.jobs,
+            compress_level=args.compress_level,
+            since=args.since
         )
+    elif args.command == "verify_package":
+        verify_package(zip_path=args.zip_path)
+    elif args.command == "apply_delta":
+        apply_delta(zip_path=args.zip_path, app_path=args.app_path, force=args.force)
+    elif args.command == "clean":
+        clean(app_path=args.app_path, dry_run=args.dry_run)
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,218 @@
+"""
+AST-based column extraction, shared by test inference and the tester's stub
+schemas.
+
+Columns are taken from:
+    col("a") / F.col("a") / column("a")        and nested paths via ["b"] / .getField("b")
+    df["a"]["b"]                                bracket access on known DataFrames only
+    df.select("a", "b.c"), groupBy, orderBy     column-name arguments
+    df.filter("a = 'x'"), where, selectExpr,    identifiers in SQL expression strings
+    expr("...")
+
+Nested struct paths are returned dotted (`a.b.c`). String comparisons and
+subscripts on anything that is not a DataFrame (dicts, rows, configs) are
+ignored.
+"""
+import ast
+import re
+from typing import Dict, Optional, Set
+
+COLUMN_FUNCTIONS = ("col", "column")
+EXPRESSION_FUNCTIONS = ("expr",)
+FUNCTION_MODULES = ("F", "functions", "sf")
+
+# DataFrame methods whose string arguments are column names / SQL expressions
+COLUMN_NAME_METHODS = ("select", "groupBy", "groupby", "orderBy", "sort", "drop", "dropDuplicates", "drop_duplicates", "cube", "rollup")
+EXPRESSION_METHODS = ("filter", "where", "selectExpr")
+FIRST_ARG_COLUMN_METHODS = ("withColumnRenamed",)
+
+# Calls that produce a DataFrame, used to recognise DataFrame variables
+DATAFRAME_METHODS = (
+    "table", "sql", "createDataFrame", "range", "json", "parquet", "csv", "orc", "load", "text",
+    "select", "selectExpr", "filter", "where", "withColumn", "withColumns", "withColumnRenamed",
+    "drop", "dropDuplicates", "distinct", "join", "union", "unionByName", "limit", "orderBy", "sort",
+    "alias", "agg", "sample", "repartition", "coalesce", "cache", "persist", "fillna", "dropna",
+)
+DATAFRAME_ROOTS = ("spark",)
+
+SQL_KEYWORDS = {
+    "AND", "OR", "NOT", "IN", "IS", "NULL", "TRUE", "FALSE", "LIKE", "RLIKE", "ILIKE", "BETWEEN",
+    "CASE", "WHEN", "THEN", "ELSE", "END", "AS", "DISTINCT", "INTERVAL", "ASC", "DESC", "NULLS",
+    "FIRST", "LAST", "EXISTS", "ALL", "ANY", "SOME", "DAY", "DAYS", "HOUR", "HOURS", "MINUTE",
+    "MINUTES", "SECOND", "SECONDS", "MONTH", "MONTHS", "YEAR", "YEARS", "WEEK", "WEEKS", "DIV",
+}
+
+_SQL_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_SQL_TOKEN = re.compile(r"`([^`]+)`|([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)|(\S)")
+
+
+def sql_expression_columns(expression: str) -> Set[str]:
+    """Identifiers referenced by a Spark SQL expression string (not functions, keywords or aliases)."""
+    text = _SQL_STRING.sub(" '' ", expression)
+    columns = set()
+    tokens = list(_SQL_TOKEN.finditer(text))
+    for index, match in enumerate(tokens):
+        quoted, name, _ = match.groups()
+        if quoted is None and name is None:
+            continue
+        previous = tokens[index - 1].group(0).upper() if index else ""
+        following = text[match.end():].lstrip()[:1]
+        if previous == "AS" or following == "(":
+            continue
+        if quoted is not None:
+            columns.add(quoted)
+        elif name.upper() not in SQL_KEYWORDS:
+            columns.add(name)
+    return columns
+
+
+def _string_args(node):
+    """String constants among a call's positional arguments, including inside lists."""
+    for arg in node.args:
+        items = arg.elts if isinstance(arg, (ast.List, ast.Tuple)) else [arg]
+        for item in items:
+            if isinstance(item, ast.Constant) and isinstance(item.value, str):
+                yield item.value
+
+
+def _string_constant(node) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _subscript_key(node) -> Optional[str]:
+    key = node.slice
+    # Python 3.8 wraps subscript keys in ast.Index
+    if isinstance(key, getattr(ast, "Index", ())):
+        key = key.value
+    return _string_constant(key)
+
+
+def _is_function(func, names) -> bool:
+    if isinstance(func, ast.Name):
+        return func.id in names
+    return (
+        isinstance(func, ast.Attribute)
+        and func.attr in names
+        and isinstance(func.value, ast.Name)
+        and func.value.id in FUNCTION_MODULES
+    )
+
+
+class ColumnExtractor(ast.NodeVisitor):
+    """
+    Collects columns per enclosing function. `columns[None]` holds those used
+    at module level; nested functions count towards the innermost one.
+    """
+
+    def __init__(self, dataframes=()):
+        self.columns: Dict[Optional[str], Set[str]] = {None: set()}
+        self.dataframes = set(dataframes)
+        self._functions = []
+
+    # --- DataFrame recognition -------------------------------------------------
+
+    def is_dataframe(self, node) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in self.dataframes
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            receiver = node.func.value
+            if node.func.attr in DATAFRAME_METHODS:
+                return self.is_dataframe(receiver) or self._is_spark_rooted(receiver)
+        return False
+
+    def _is_spark_rooted(self, node) -> bool:
+        while isinstance(node, ast.Attribute):
+            node = node.value
+        return isinstance(node, ast.Name) and node.id in DATAFRAME_ROOTS
+
+    def collect_dataframes(self, tree):
+        """Marks variables assigned from DataFrame expressions (to a fixpoint) and df-named parameters."""
+        assignments = [node for node in ast.walk(tree) if isinstance(node, (ast.Assign, ast.AnnAssign))]
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for arg in node.args.args + node.args.kwonlyargs:
+                    if arg.arg == "df" or arg.arg.endswith("_df"):
+                        self.dataframes.add(arg.arg)
+        changed = True
+        while changed:
+            changed = False
+            for node in assignments:
+                if node.value is None or not self.is_dataframe(node.value):
+                    continue
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name) and target.id not in self.dataframes:
+                        self.dataframes.add(target.id)
+                        changed = True
+
+    # --- Column paths ------------------------------------------------------------
+
+    def column_path(self, node) -> Optional[str]:
+        """The dotted column path a Column expression refers to, if it is a plain reference."""
+        if isinstance(node, ast.Call):
+            if _is_function(node.func, COLUMN_FUNCTIONS) and node.args:
+                return _string_constant(node.args[0])
+            if isinstance(node.func, ast.Attribute) and node.func.attr == "getField" and node.args:
+                parent, field = self.column_path(node.func.value), _string_constant(node.args[0])
+                if parent and field:
+                    return f"{parent}.{field}"
+            return None
+        if isinstance(node, ast.Subscript):
+            key = _subscript_key(node)
+            if key is None:
+                return None
+            if self.is_dataframe(node.value):
+                return key
+            parent = self.column_path(node.value)
+            return f"{parent}.{key}" if parent else None
+        return None
+
+    # --- Visitor -----------------------------------------------------------------
+
+    def _add(self, *names):
+        current = self._functions[-1] if self._functions else None
+        self.columns[current].update(name for name in names if name and name != "*")
+
+    def visit_FunctionDef(self, node):
+        self._functions.append(node.name)
+        self.columns.setdefault(node.name, set())
+        self.generic_visit(node)
+        self._functions.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Subscript(self, node):
+        path = self.column_path(node)
+        if path:
+            self._add(path)
+            return
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        path = self.column_path(node)
+        if path:
+            self._add(path)
+            return
+        if _is_function(node.func, EXPRESSION_FUNCTIONS):
+            for expression in _string_args(node):
+                self._add(*sql_expression_columns(expression))
+        elif isinstance(node.func, ast.Attribute):
+            method = node.func.attr
+            if method in COLUMN_NAME_METHODS:
+                self._add(*_string_args(node))
+            elif method in EXPRESSION_METHODS:
+                for expression in _string_args(node):
+                    self._add(*sql_expression_columns(expression))
+            elif method in FIRST_ARG_COLUMN_METHODS and node.args:
+                self._add(_string_constant(node.args[0]))
+        self.generic_visit(node)
+
+
+def extract_columns(tree) -> Dict[Optional[str], Set[str]]:
+    """Columns used in `tree`, keyed by enclosing function name (None for module level)."""
+    extractor = ColumnExtractor()
+    extractor.collect_dataframes(tree)
+    extractor.visit(tree)
+    return extractor.columns
@@ -0,0 +1,112 @@
+"""
+Reading Databricks .dbc archives in place.
+
+A .dbc export is a zip of JSON notebook documents, one per notebook, named
+`<folder>/<notebook>.<language>` and holding the notebook's commands. Entries
+are read one at a time straight from the archive and converted to Databricks
+source format, so archives with hundreds of notebooks are never unpacked.
+"""
+import json
+import zipfile
+from pathlib import Path, PurePosixPath
+
+from .notebook_io import COMMAND_DELIMITER, NOTEBOOK_HEADER, ParsedNotebook
+
+DBC_LANGUAGE_EXTENSIONS = {
+    ".python": "python",
+    ".scala": "scala",
+    ".sql": "sql",
+    ".r": "r",
+}
+
+
+class DbcNotebook(ParsedNotebook):
+    """
+    A notebook read from a .dbc archive. `path` is a virtual path
+    (`<archive>/<entry>.py`); `archive` and `entry` locate the source.
+    """
+
+    def __init__(self, archive, entry, rel_path, text):
+        super().__init__(Path(archive) / rel_path, text)
+        self.archive = Path(archive)
+        self.entry = entry
+        self.rel_path = rel_path
+
+
+def is_dbc(path) -> bool:
+    return Path(path).suffix == ".dbc"
+
+
+def _notebook_entries(zf):
+    return [
+        info for info in zf.infolist()
+        if not info.is_dir() and PurePosixPath(info.filename).suffix in DBC_LANGUAGE_EXTENSIONS
+    ]
+
+
+def _archive_root(names):
+    """The single top-level folder every entry sits under (the exported folder), if any."""
+    roots = {PurePosixPath(name).parts[0] for name in names if len(PurePosixPath(name).parts) > 1}
+    if len(roots) == 1 and all(len(PurePosixPath(name).parts) > 1 for name in names):
+        return roots.pop()
+    return None
+
+
+def _relative_notebook_path(name, root):
+    path = PurePosixPath(name)
+    if root:
+        path = path.relative_to(root)
+    # Python notebooks map to the .py files a source export would produce
+    if path.suffix == ".python":
+        path = path.with_suffix(".py")
+    return path.as_posix()
+
+
+def commands_to_source(commands) -> str:
+    """Renders notebook commands in Databricks .py source format."""
+    cells = []
+    for command in sorted(commands, key=lambda c: c.get("position", 0)):
+        text = command.get("command", "") or ""
+        lines = text.splitlines()
+        if lines and lines[0].lstrip().startswith("%"):
+            text = "\n".join(f"# MAGIC {line}" if line else "# MAGIC" for line in lines)
+        cells.append(text.rstrip("\n"))
+    return f"{NOTEBOOK_HEADER}\n" + f"\n\n{COMMAND_DELIMITER}\n\n".join(cells) + "\n"
+
+
+def list_dbc_paths(dbc_path):
+    """
+    Returns the relative paths in the archive, with the exported root folder
+    removed: every notebook (python ones as .py) and every parent folder.
+    """
+    with zipfile.ZipFile(dbc_path) as zf:
+        names = [info.filename for info in _notebook_entries(zf)]
+    root = _archive_root(names)
+    paths = set()
+    for name in names:
+        rel = PurePosixPath(_relative_notebook_path(name, root))
+        paths.add(rel.as_posix())
+        paths.update(parent.as_posix() for parent in rel.parents if parent.as_posix() != ".")
+    return sorted(paths)
+
+
+def iter_dbc_notebooks(dbc_path, languages=("python",)):
+    """
+    Yields a DbcNotebook for each notebook in the archive whose language is
+    in `languages`, reading one entry at a time.
+    """
+    with zipfile.ZipFile(dbc_path) as zf:
+        entries = _notebook_entries(zf)
+        root = _archive_root([info.filename for info in entries])
+        for info in entries:
+            language = DBC_LANGUAGE_EXTENSIONS[PurePosixPath(info.filename).suffix]
+            if languages and language not in languages:
+                continue
+            with zf.open(info) as f:
+                try:
+                    document = json.load(f)
+                except ValueError as e:
+                    print(f"⚠️  Skipping unreadable notebook {info.filename} in {Path(dbc_path).name}: {e}")
+                    continue
+            text = commands_to_source(document.get("commands", []))
+            yield DbcNotebook(dbc_path, info.filename, _relative_notebook_path(info.filename, root), text)
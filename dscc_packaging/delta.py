@@ -0,0 +1,213 @@
+"""
+Delta packages: only the files that changed since a previous release.
+
+`package_delta` compares the app against the files table of a previous
+package (or its manifest.yaml) and writes a zip holding the added and
+changed files, the new manifest.yaml (which still lists every file) and a
+`delta.yaml` with the removed paths (tombstones) and the digests the target
+must have before the delta applies:
+
+    from_version: 1.4.0
+    to_version: 1.4.1
+    added: [base/detections/new_rule.py]
+    changed: [base/detections/brute_force.py]
+    removed: [sample_data/old.json]
+    expected:
+      base/detections/brute_force.py: 9f2c...e1
+      sample_data/old.json: 41aa...07
+
+`apply_delta` checks those digests against an unpacked copy of the previous
+release, then writes the new files and removes the tombstoned ones.
+"""
+import hashlib
+import os
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Tuple
+
+import yaml
+from pydantic import ValidationError
+
+from .models import DSCCManifestFile
+from .package import (
+    BLOCK_SIZE,
+    DEFAULT_COMPRESS_LEVEL,
+    DELTA_NAME,
+    MANIFEST_NAME,
+    file_sha256,
+    package_app,
+)
+
+
+def _top_level_member(archive: zipfile.ZipFile, name: str) -> Optional[str]:
+    for member in archive.namelist():
+        parts = member.split("/")
+        if len(parts) == 2 and parts[1] == name:
+            return member
+    return None
+
+
+def load_previous_manifest(since) -> Tuple[dict, Dict[str, DSCCManifestFile]]:
+    """
+    Reads the manifest of a previous release, given its package zip or its
+    manifest.yaml. Returns (manifest data, files table keyed by path).
+    """
+    since = Path(since)
+    if zipfile.is_zipfile(since):
+        with zipfile.ZipFile(since) as archive:
+            member = _top_level_member(archive, MANIFEST_NAME)
+            if member is None:
+                raise ValueError(f"no {MANIFEST_NAME} in {since}")
+            data = yaml.safe_load(archive.read(member)) or {}
+    else:
+        with open(since) as f:
+            data = yaml.safe_load(f) or {}
+    if not data.get("files"):
+        raise ValueError(f"{since} has no files table; it was not built with `dscc packaging package`")
+    try:
+        files = [DSCCManifestFile(**entry) for entry in data["files"]]
+    except (TypeError, ValidationError) as e:
+        raise ValueError(f"invalid files table in {since}: {e}")
+    return data, {f.path: f for f in files}
+
+
+def default_delta_path(app_path) -> Path:
+    app_path = Path(app_path).resolve()
+    return app_path.parent / f"{app_path.name}-delta.zip"
+
+
+def package_delta(app_path=".", since=None, output=None, jobs=None, level=DEFAULT_COMPRESS_LEVEL) -> Optional[Path]:
+    """
+    Builds a delta package of the app against the release in `since`.
+    Returns the package path, or None on failure.
+    """
+    app_path = Path(app_path)
+    if not (app_path / MANIFEST_NAME).exists():
+        print(f"❌ Delta packages need {MANIFEST_NAME}; run `dscc packaging generate_manifest` first.")
+        return None
+    try:
+        previous_data, previous = load_previous_manifest(since)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"❌ Could not read the previous release: {e}")
+        return None
+
+    with open(app_path / MANIFEST_NAME) as f:
+        to_version = (yaml.safe_load(f) or {}).get("version")
+    summary = {}
+
+    def trailer(files):
+        current = {f.path: f for f in files if f.path != MANIFEST_NAME}
+        known = {path: f for path, f in previous.items() if path != MANIFEST_NAME}
+        added = sorted(path for path in current if path not in known)
+        changed = sorted(path for path in current if path in known and current[path].sha256 != known[path].sha256)
+        removed = sorted(path for path in known if path not in current)
+        summary.update(added=added, changed=changed, removed=removed)
+        record = {
+            "from_version": previous_data.get("version"),
+            "to_version": to_version,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "expected": {path: known[path].sha256 for path in changed + removed},
+        }
+        return [(DELTA_NAME, yaml.safe_dump(record, sort_keys=False).encode("utf-8"))]
+
+    print(f"🔁 Comparing against {since} ({len(previous)} file(s))...")
+    output = package_app(app_path, output or default_delta_path(app_path), jobs=jobs, level=level, previous=previous, trailer=trailer)
+    if output is not None:
+        print(
+            f"🧾 Delta: {len(summary['added'])} added, {len(summary['changed'])} changed, "
+            f"{len(summary['removed'])} removed"
+        )
+    return output
+
+
+def _target(app_path: Path, rel: str) -> Path:
+    """Resolves a package path inside the app, refusing anything that escapes it."""
+    path = PurePosixPath(rel)
+    if path.is_absolute() or ".." in path.parts:
+        raise ValueError(f"unsafe path in delta: {rel}")
+    return app_path.joinpath(*path.parts)
+
+
+def apply_delta(zip_path, app_path=".", force=False) -> bool:
+    """
+    Applies a delta package to an unpacked copy of the release it was built
+    against. Changed and removed files must still have their expected
+    digests unless `force`. New content is staged next to its target and
+    checked against the manifest before anything is replaced.
+    """
+    app_path = Path(app_path).resolve()
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"❌ Could not open {zip_path}: {e}")
+        return False
+
+    staged = []
+    with archive:
+        delta_member = _top_level_member(archive, DELTA_NAME)
+        manifest_member = _top_level_member(archive, MANIFEST_NAME)
+        if delta_member is None or manifest_member is None:
+            print(f"❌ {zip_path} is not a delta package (no {DELTA_NAME} or {MANIFEST_NAME})")
+            return False
+        prefix = delta_member.split("/", 1)[0]
+        delta = yaml.safe_load(archive.read(delta_member)) or {}
+        manifest = yaml.safe_load(archive.read(manifest_member)) or {}
+        digests = {entry["path"]: entry["sha256"] for entry in manifest.get("files") or []}
+
+        mismatched = []
+        for rel, expected in (delta.get("expected") or {}).items():
+            path = _target(app_path, rel)
+            if not path.is_file() or file_sha256(path) != expected:
+                mismatched.append(rel)
+        for rel in delta.get("added") or []:
+            if _target(app_path, rel).exists():
+                mismatched.append(rel)
+        if mismatched and not force:
+            for rel in mismatched:
+                print(f"❌ {rel} does not match the release this delta was built against")
+            print("ℹ️  Pass --force to apply anyway.")
+            return False
+
+        try:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename == delta_member:
+                    continue
+                rel = info.filename[len(prefix) + 1:]
+                path = _target(app_path, rel)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+                staged.append((tmp_path, path))
+                digest = hashlib.sha256()
+                with archive.open(info) as member, open(tmp_path, "wb") as f:
+                    for block in iter(lambda: member.read(BLOCK_SIZE), b""):
+                        digest.update(block)
+                        f.write(block)
+                if rel in digests and digest.hexdigest() != digests[rel]:
+                    raise ValueError(f"{rel} does not match its digest in {MANIFEST_NAME}")
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            for tmp_path, _ in staged:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            print(f"❌ Could not apply {zip_path}: {e}")
+            return False
+
+    for tmp_path, path in staged:
+        os.replace(tmp_path, path)
+    for rel in delta.get("removed") or []:
+        path = _target(app_path, rel)
+        if path.exists():
+            path.unlink()
+        # Drop directories the removal left empty
+        parent = path.parent
+        while parent != app_path and parent.is_dir() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    print(
+        f"✅ Applied {zip_path}: {len(delta.get('added') or [])} added, {len(delta.get('changed') or [])} changed, "
+        f"{len(delta.get('removed') or [])} removed"
+        + (f" ({delta.get('from_version')} → {delta.get('to_version')})" if delta.get("to_version") else "")
+    )
+    return True
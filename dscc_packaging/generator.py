@@ -2,12 +2,22 @@ from pathlib import Path
 import pathlib
 import re
 import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import time
+import requests
 import yaml
 from dscc_packaging.utils import extract_dscc_metadata, is_notebook_file
 from dscc_packaging.models import ContentType, Platform, Feature, DSCCNotebookMetadata, DSCCDetectionMetadata
 from dscc_tool.logger import logging
 from . import autogen_tests
+from .dbc import is_dbc, iter_dbc_notebooks
+from .project_index import ProjectIndex
+from .snapshots import LocalSnapshotSource
 from .utils import inject_all_defaults
+from .workspace_sync import DEFAULT_SYNC_WORKERS, RestWorkspaceClient, sync_workspace
 import subprocess
 import sys
 import tempfile
@@ -225,6 +235,30 @@ def clean_placeholders(meta_dict, app_name=None):
             cleaned[key] = value
     return cleaned
 
+def build_manifest_entry(path, meta, content_type, app_path):
+    """Normalizes a notebook's dscc: metadata into a manifest entry, or None if it has none."""
+    if not meta:
+        logger.debug(f"⚠️  No dscc: metadata in {path.name}, skipping...")
+        return None
+
+    meta["created"] = str(meta.get("created", ""))
+    meta["modified"] = str(meta.get("modified", ""))
+    meta["version"] = str(meta.get("version", "1.0.0"))
+
+    if not meta.get("uuid") or not is_valid_uuid(meta["uuid"]):
+        generated = str(uuid.uuid4())
+        logger.debug(f"⚙️  Generating UUID for {path.name}: {generated}")
+        meta["uuid"] = generated
+
+    meta.setdefault("content_type", content_type)
+
+    rel_path = path.relative_to(app_path)
+    logger.debug(f"✅ adding notebook: {path.name} to manifest")
+    return {
+        "path": str(rel_path),
+        "dscc": meta
+    }
+
 def generate_manifest(app_path: str = ".", output_file: str = "manifest.yaml"):
     print("CALLED")
     app_path = Path(app_path)
@@ -272,31 +306,25 @@ def generate_manifest(app_path: str = ".", output_file: str = "manifest.yaml"):
                 continue
 
             try:
-                meta = extract_dscc_metadata(path)
-                if not meta:
-                    logger.debug(f"⚠️  No dscc: metadata in {path.name}, skipping...")
-                    continue
-
-                meta["created"] = str(meta.get("created", ""))
-                meta["modified"] = str(meta.get("modified", ""))
-                meta["version"] = str(meta.get("version", "1.0.0"))
-
-                if not meta.get("uuid") or not is_valid_uuid(meta["uuid"]):
-                    generated = str(uuid.uuid4())
-                    logger.debug(f"⚙️  Generating UUID for {path.name}: {generated}")
-                    meta["uuid"] = generated
-
-                meta.setdefault("content_type", content_type)
-
-                rel_path = path.relative_to(app_path)
-                logger.debug(f"✅ adding notebook: {path.name} to manifest")
-                manifest["notebooks"].append({
-                    "path": str(rel_path),
-                    "dscc": meta
-                })
+                entry = build_manifest_entry(path, extract_dscc_metadata(path), content_type, app_path)
+                if entry:
+                    manifest["notebooks"].append(entry)
             except Exception as e:
                 logger.debug(f"❌ Error parsing {path}: {e}")
 
+        # Exported .dbc archives are read in place, one notebook at a time
+        for archive in content_dir.rglob("*.dbc"):
+            try:
+                for notebook in iter_dbc_notebooks(archive):
+                    if notebook.path.name.startswith("template_"):
+                        continue
+                    meta = (notebook.dscc or {}).get("dscc")
+                    entry = build_manifest_entry(notebook.path, meta, content_type, app_path)
+                    if entry:
+                        manifest["notebooks"].append(entry)
+            except Exception as e:
+                logger.debug(f"❌ Error reading archive {archive}: {e}")
+
     if not manifest["notebooks"]:
         logger.debug("⚠️ No notebooks with metadata found.")
         return
@@ -307,7 +335,78 @@ def generate_manifest(app_path: str = ".", output_file: str = "manifest.yaml"):
 
     logger.debug(f"✅ Manifest written to: {out_path}")
 
-def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteractive=False, no_sample=False, inject_defaults=False):
+# Set in each batch worker by _init_batch_worker
+_BATCH_INDEX = None
+
+
+def _init_batch_worker(index):
+    global _BATCH_INDEX
+    _BATCH_INDEX = index
+
+
+def _infer_notebook_batch(notebook, options):
+    """
+    Batch-mode worker: infers one notebook's tests with its output captured.
+    Returns a picklable result for the summary table.
+    """
+    started = time.perf_counter()
+    stats = Counter()
+    log = io.StringIO()
+    result = {"notebook": str(notebook), "tests": 0, "status": "ok", "error": None}
+    try:
+        with contextlib.redirect_stdout(log):
+            test_cases = autogen_tests.infer_dscc_tests(notebook_path=notebook, stats=stats, index=_BATCH_INDEX, **options)
+        result["tests"] = len(test_cases)
+        result["status"] = "written" if stats["written"] else "unchanged"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def print_batch_summary(results, skipped, elapsed):
+    counts = Counter(r["status"] for r in results)
+    rows = [
+        ("Notebooks processed", len(results)),
+        ("Tests inferred", sum(r["tests"] for r in results)),
+        ("Notebooks written", counts["written"]),
+        ("Notebooks unchanged", counts["unchanged"]),
+        ("Skipped", skipped),
+        ("Failed", counts["failed"]),
+        ("Time taken", f"{elapsed:.1f}s"),
+    ]
+    print("\n📊 Batch summary")
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    for label, value in rows:
+        print(f"  {label:<22} {value:>10}")
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    for r in results:
+        if r["status"] == "failed":
+            print(f"❌ {r['notebook']}: {r['error']}")
+
+
+def prepare_notebooks_batch(notebooks, options, index=None, jobs=None, skipped=0):
+    """
+    Non-interactive batch mode: infers every notebook's tests in a process
+    pool (each write is atomic) and prints one summary table at the end.
+    """
+    started = time.perf_counter()
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(notebooks) or 1))
+    print(f"⚙️  Inferring tests for {len(notebooks)} notebook(s) with {jobs} worker(s)...")
+    results = []
+    if jobs == 1:
+        _init_batch_worker(index)
+        results = [_infer_notebook_batch(notebook, options) for notebook in notebooks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker, initargs=(index,)) as pool:
+            futures = [pool.submit(_infer_notebook_batch, notebook, options) for notebook in notebooks]
+            results = [future.result() for future in futures]
+    print_batch_summary(results, skipped, time.perf_counter() - started)
+    return results
+
+
+def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteractive=False, no_sample=False, inject_defaults=False, sample_format="json", sampling=None, validate_notebooks=False, jobs=None, sample_snapshots=None):
     app_path = pathlib.Path(app_path)
     base_path = app_path / "base"
 
@@ -316,28 +415,53 @@ def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteracti
 
     print(f"🔍 Scanning {base_path} for notebooks...\n")
 
-    for notebook in base_path.rglob("*"):
+    stats = Counter()
+    # Symbol table over lib/ and base/, so helpers pulled in with %run are resolved
+    index = None if inject_defaults else ProjectIndex.build(app_path)
+
+    notebooks = []
+    skipped = 0
+    for notebook in sorted(base_path.rglob("*")):
         if not is_notebook_file(notebook.name):
             continue
         if notebook.name.startswith("template_"):
+            skipped += 1
             continue
-
+        if is_dbc(notebook):
+            print(f"⏭️  Skipping {notebook.relative_to(app_path)}: .dbc archives are read-only; export notebooks as source to prepare them.")
+            skipped += 1
+            continue
+        notebooks.append(notebook)
+
+    options = dict(
+        dry_run=dry_run,
+        overwrite=overwrite,
+        noninteractive=noninteractive,
+        no_sample=no_sample,
+        sample_format=sample_format,
+        sampling=sampling,
+        validate_notebooks=validate_notebooks,
+        # Local Parquet/Delta snapshots need no SparkSession, so they also work in batch mode
+        sample_source=LocalSnapshotSource.from_path(sample_snapshots) if sample_snapshots else None,
+    )
+
+    if noninteractive and not inject_defaults and not dry_run:
+        if no_sample or sample_snapshots or not autogen_tests.spark_available:
+            prepare_notebooks_batch(notebooks, options, index=index, jobs=jobs, skipped=skipped)
+            return
+        print("ℹ️  Sample capture uses this process's SparkSession, so notebooks are prepared one at a time. Pass --no_sample or --sample_snapshots for the parallel batch mode.\n")
+
+    for notebook in notebooks:
         print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
         print(f"📓 Notebook: {notebook.relative_to(app_path)}")
 
         if inject_defaults:
             print(f"🔧 Injecting default YAML...{notebook}")
-            inject_all_defaults(notebook, overwrite=overwrite)
+            inject_all_defaults(notebook, overwrite=overwrite, stats=stats, validate=validate_notebooks)
             continue
 
         try:
-            test_cases = autogen_tests.infer_dscc_tests(
-                notebook_path=notebook,
-                dry_run=dry_run,
-                overwrite=overwrite,
-                noninteractive=noninteractive,
-                no_sample=no_sample
-            )
+            test_cases = autogen_tests.infer_dscc_tests(notebook_path=notebook, stats=stats, index=index, **options)
         except Exception as e:
             print(f"❌ Failed to process {notebook.name}: {e}")
             continue
@@ -347,43 +471,38 @@ def prepare_notebooks(app_path=".", overwrite=False, dry_run=False, noninteracti
         else:
             print(f"✅ Done — {len(test_cases)} test case(s) inferred.\n")
 
-    print(f"🏁 Finished {'yaml' if inject_defaults else 'test'} generation.\n")
+    print(f"🏁 Finished {'yaml' if inject_defaults else 'test'} generation.")
+    if not dry_run:
+        print(f"📝 Notebooks written: {stats['written']}, unchanged: {stats['unchanged']}\n")
 
-def inject_default_yaml(app_path=".", overwrite=False):
-    prepare_notebooks(app_path=app_path, inject_defaults=True, overwrite=overwrite)
+def inject_default_yaml(app_path=".", overwrite=False, validate_notebooks=False):
+    prepare_notebooks(app_path=app_path, inject_defaults=True, overwrite=overwrite, validate_notebooks=validate_notebooks)
 
-def check_databricks_cli():
-    """Check if Databricks CLI is installed and configured."""
-    try:
-        subprocess.run(["databricks", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        result = subprocess.run(["databricks", "configure", "--list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if "No profiles configured" in result.stdout.decode():
-            return False, "Databricks CLI is installed but not configured. Please run 'databricks configure' first."
-        return True, None
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False, "Databricks CLI is not installed. Please install it first: pip install databricks-cli"
-
-def export_for_packaging(workspace_path: str, local_path: str = None, auto_fix=True, noninteractive=False):
+def export_for_packaging(workspace_path: str, local_path: str = None, auto_fix=True, noninteractive=False, jobs=None, full=False, client=None):
     """
     Export a Databricks workspace directory for local packaging.
+    Only objects modified since the last export to the same folder are downloaded (see workspace_sync.py).
     Args:
         workspace_path (str): Path to the workspace directory (e.g., '/Workspace/Users/me/my_app')
         local_path (str, optional): Local path to export to. If None, creates a temp directory.
         auto_fix (bool): Whether to auto-fix structure issues.
         noninteractive (bool): Whether to skip prompts.
+        jobs (int, optional): Concurrent downloads.
+        full (bool): Download every object, ignoring the previous sync.
+        client (WorkspaceClient, optional): Workspace client; defaults to the Workspace API with the configured credentials.
     Returns:
         str: Path to the exported directory
     """
-    cli_installed, error_msg = check_databricks_cli()
-    if not cli_installed:
-        print(f"❌ {error_msg}")
+    owns_client = client is None
+    if owns_client:
+        client = RestWorkspaceClient.from_environment(max_connections=jobs or DEFAULT_SYNC_WORKERS)
+    if client is None:
+        print("❌ No Databricks credentials found.")
         print("\n✨ To fix this:")
-        print("1. Install the Databricks CLI:")
-        print("   pip install databricks-cli")
-        print("2. Configure the CLI:")
-        print("   databricks configure")
-        print("3. Make sure you have access to the workspace")
-        print("4. Try again")
+        print("1. Set DATABRICKS_HOST and DATABRICKS_TOKEN, or")
+        print("   run 'databricks configure --token' to create ~/.databrickscfg")
+        print("2. Make sure you have access to the workspace")
+        print("3. Try again")
         sys.exit(1)
 
     app_name = os.path.basename(workspace_path.rstrip("/"))
@@ -402,25 +521,21 @@ def export_for_packaging(workspace_path: str, local_path: str = None, auto_fix=T
     export_dir = Path(export_dir)
     export_dir.mkdir(parents=True, exist_ok=True)
 
-    export_cmd = [
-        "databricks",
-        "workspace",
-        "export_dir",
-        workspace_path,
-        str(export_dir),
-        "--overwrite"
-    ]
-
     print(f"\n📦 Exporting workspace directory to: {export_dir}")
     try:
-        result = subprocess.run(
-            export_cmd,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+        try:
+            result = sync_workspace(client, workspace_path, export_dir, max_workers=jobs, force=full)
+        finally:
+            if owns_client:
+                client.close()
+        for rel, error in result.failed.items():
+            print(f"❌ {rel}: {error}")
+        if not result.ok:
+            raise RuntimeError(f"{len(result.failed)} object(s) could not be downloaded")
+        print(
+            f"✅ Export successful! {len(result.downloaded)} downloaded ({result.bytes / 1024:.1f} KB), "
+            f"{len(result.unchanged)} unchanged, {len(result.removed)} removed"
         )
-        print("✅ Export successful!")
         # --- Structure validation and auto-fix ---
         template_dir = Path(__file__).parent / "template_app"
         validate_and_fix_app_structure(
@@ -439,36 +554,9 @@ def export_for_packaging(workspace_path: str, local_path: str = None, auto_fix=T
 # Usage: ./package_locally.sh [dscc-tool options]
 # Example: ./package_locally.sh --noninteractive --no-sample
 
-# Function to clean system files
-clean_system_files() {{
-    local dir="$1"
-    echo "🧹 Cleaning system files..."
-    
-    # macOS files
-    find "$dir" -name ".DS_Store" -type f -delete
-    find "$dir" -name "._*" -type f -delete
-    
-    # Windows files
-    find "$dir" -name "Thumbs.db" -type f -delete
-    
-    # Python files
-    find "$dir" -name "__pycache__" -type d -exec rm -rf {{}} +
-    find "$dir" -name "*.pyc" -type f -delete
-    find "$dir" -name "*.pyo" -type f -delete
-    find "$dir" -name "*.pyd" -type f -delete
-    
-    # Jupyter files
-    find "$dir" -name ".ipynb_checkpoints" -type d -exec rm -rf {{}} +
-    
-    echo "✅ System files cleaned"
-}}
-
 echo "🚀 Starting local packaging process..."
 cd "{export_dir}"
 
-# Clean system files before starting
-clean_system_files "."
-
 # Check Python version
 python_version=$(python3 --version 2>&1 | cut -d' ' -f2)
 if [[ "$python_version" < "3.11" ]]; then
@@ -484,6 +572,9 @@ else
     exit 1
 fi
 
+# Clean system files before starting
+dscc packaging clean --app_path "."
+
 # Run the packaging process, passing all user arguments
 if dscc packaging prepare_notebooks --app_path "{export_dir}" "$@"; then
     echo "✅ Notebook preparation complete"
@@ -563,14 +654,11 @@ Happy packaging! 🎉
         print(f"3. Follow the interactive prompts to complete packaging")
         print(f"4. After packaging, run: dscc packaging package --app_path . (inside the app directory)")
         return str(export_dir)
-    except subprocess.CalledProcessError as e:
-        print("❌ Export failed!")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
+    except (requests.RequestException, OSError, RuntimeError) as e:
+        print(f"❌ Export failed: {e}")
         print("\n✨ Troubleshooting tips:")
         print("1. Check if the workspace path is correct")
-        print("2. Verify your Databricks CLI configuration")
+        print("2. Verify your Databricks host and token")
         print("3. Ensure you have access to the workspace")
-        print("4. Try running the export command manually:")
-        print(f"   databricks workspace export_dir {workspace_path} {export_dir} --overwrite")
+        print("4. Run the export again; objects that were downloaded are not fetched twice")
         raise
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+System-file ignore patterns, compiled once and shared by cleanup, structure
+validation, packaging and the tester's source copy (`dscc packaging clean`
+replaces the find -delete loops the Makefile and scripts used to run).
+
+Patterns follow .gitignore rules:
+    name          matches a file or folder with that name at any depth
+    name/         matches folders only
+    dir/name      contains a slash: matched against the path from the app root
+    *, ?, [..]    wildcards within one path component; ** spans components
+    !pattern      re-includes what an earlier pattern excluded
+
+An ignored folder is skipped as a whole, so `.git`, `__pycache__` and
+`.ipynb_checkpoints` subtrees are never listed.
+"""
+import os
+import re
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+SYSTEM_FILE_PATTERNS = (
+    ".DS_Store",            # macOS Finder metadata
+    "._*",                  # macOS resource forks
+    "Thumbs.db",            # Windows thumbnail cache
+    ".git",                 # Git directory
+    "__pycache__/",         # Python bytecode cache
+    "*.pyc",                # Python compiled files
+    "*.pyo",                # Python optimized files
+    "*.pyd",                # Python DLL files
+    ".ipynb_checkpoints/",  # Jupyter checkpoints
+)
+
+
+def _translate(pattern: str) -> str:
+    """Regex source for one glob pattern, where * and ? stay within a component."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRule:
+    def __init__(self, pattern: str):
+        self.negate = pattern.startswith("!")
+        pattern = pattern[1:] if self.negate else pattern
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to the root
+        self.anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        self.source = _translate(pattern)
+        self.regex = re.compile(self.source + r"\Z")
+
+    def matches(self, rel: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return bool(self.regex.match(rel if self.anchored else name))
+
+
+class IgnoreMatcher:
+    """
+    Compiled ignore patterns. Without negations, all name patterns are
+    joined into one regex (and all anchored ones into another), so a lookup
+    is at most two regex matches regardless of the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        lines = [p.strip() for p in patterns]
+        self.rules = [IgnoreRule(p) for p in lines if p and not p.startswith("#")]
+        self._ordered = any(rule.negate for rule in self.rules)
+        if not self._ordered:
+            self._combined = {}
+            for anchored in (False, True):
+                for is_dir in (False, True):
+                    sources = [
+                        rule.source for rule in self.rules
+                        if rule.anchored == anchored and (is_dir or not rule.dir_only)
+                    ]
+                    self._combined[anchored, is_dir] = re.compile(f"(?:{'|'.join(sources)})\\Z") if sources else None
+
+    def match(self, rel, is_dir: bool = False) -> bool:
+        """Whether the app-relative path (posix style) is ignored."""
+        rel = str(rel).replace(os.sep, "/").strip("/")
+        name = rel.rsplit("/", 1)[-1]
+        if not self._ordered:
+            by_name = self._combined[False, is_dir]
+            by_path = self._combined[True, is_dir]
+            return bool((by_name and by_name.match(name)) or (by_path and by_path.match(rel)))
+        ignored = False
+        for rule in self.rules:
+            if rule.matches(rel, name, is_dir):
+                ignored = not rule.negate
+        return ignored
+
+    def walk(self, root) -> Iterator[Tuple[Path, List[str], List[str]]]:
+        """os.walk over `root` in sorted order, without ignored files and folders."""
+        root = Path(root)
+        for dirpath, dirs, files in os.walk(root):
+            base = Path(dirpath).relative_to(root).as_posix()
+            prefix = "" if base == "." else f"{base}/"
+            dirs[:] = sorted(d for d in dirs if not self.match(prefix + d, is_dir=True))
+            yield Path(dirpath), dirs, sorted(f for f in files if not self.match(prefix + f))
+
+    def find_ignored(self, root) -> List[Path]:
+        """The ignored files and folders under `root`, without descending into ignored folders."""
+        root = Path(root)
+        found = []
+        for dirpath, dirs, files in os.walk(root):
+            base = Path(dirpath).relative_to(root).as_posix()
+            prefix = "" if base == "." else f"{base}/"
+            kept = []
+            for d in dirs:
+                if self.match(prefix + d, is_dir=True):
+                    found.append(Path(dirpath) / d)
+                else:
+                    kept.append(d)
+            dirs[:] = kept
+            found.extend(Path(dirpath) / f for f in files if self.match(prefix + f))
+        return sorted(found)
+
+    def copytree_ignore(self, root):
+        """An `ignore` callable for shutil.copytree rooted at `root`."""
+        root = Path(root).resolve()
+
+        def ignore(directory, names):
+            base = Path(directory).resolve().relative_to(root).as_posix()
+            prefix = "" if base == "." else f"{base}/"
+            return {name for name in names if self.match(prefix + name, is_dir=os.path.isdir(os.path.join(directory, name)))}
+        return ignore
+
+
+@lru_cache(maxsize=1)
+def default_matcher() -> IgnoreMatcher:
+    """The matcher for SYSTEM_FILE_PATTERNS, compiled once per process."""
+    return IgnoreMatcher(SYSTEM_FILE_PATTERNS)
+
+
+def clean_system_files(app_path=".", dry_run=False) -> List[Path]:
+    """Deletes ignored system files and folders under the app. Returns what was (or would be) removed."""
+    app_path = Path(app_path)
+    removed = default_matcher().find_ignored(app_path)
+    for path in removed:
+        if dry_run:
+            print(f"🧹 Would remove: {path}")
+            continue
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            print(f"🧹 Removed system file: {path}")
+        except OSError as e:
+            print(f"⚠️  Could not remove {path}: {e}")
+    print(f"✅ System files cleaned ({len(removed)} {'found' if dry_run else 'removed'})")
+    return removed
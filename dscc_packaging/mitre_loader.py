@@ -4,26 +4,10 @@ import re
 import json
 import requests
 from typing import Dict, Any, List
+from dscc_packaging.shared_utils import get_cache_dir
 
 MITRE_ENTERPRISE_URL = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
 
-def get_cache_dir():
-    # Detect Databricks
-    in_databricks = any(
-        os.environ.get(var) for var in ["DATABRICKS_RUNTIME_VERSION", "DATABRICKS_HOST"]
-    )
-    if in_databricks:
-        cache_dir = Path("/tmp/dscc-tool")
-    else:
-        cache_dir = Path(os.path.expanduser("~/.cache/dscc-tool"))
-    try:
-        cache_dir.mkdir(parents=True, exist_ok=True)
-    except Exception:
-        # Fallback to /tmp if home is not writable
-        cache_dir = Path("/tmp/dscc-tool")
-        cache_dir.mkdir(parents=True, exist_ok=True)
-    return cache_dir
-
 CACHE_DIR = get_cache_dir()
 CACHE_FILE = CACHE_DIR / "mitre_enterprise_attack.json"
 
@@ -142,6 +142,22 @@ class DSCCNotebook(BaseModel):
     path: str
     dscc: DSCCNotebookMetadata
 
+# ─────────────────────────────────────
+# Package Contents
+# ─────────────────────────────────────
+
+class DSCCManifestFile(BaseModel):
+    path: str
+    size: int
+    sha256: str
+
+    @field_validator("sha256")
+    @classmethod
+    def validate_digest(cls, v: str):
+        if len(v) != 64 or any(c not in "0123456789abcdef" for c in v):
+            raise ValueError("sha256 must be 64 lowercase hex characters")
+        return v
+
 # ─────────────────────────────────────
 # App Manifest
 # ─────────────────────────────────────
@@ -164,6 +180,9 @@ class DSCCManifest(BaseModel):
 
     requirements: DSCCRequirements
 
+    # Set at packaging time: every other file in the package with its digest
+    files: Optional[List[DSCCManifestFile]] = None
+
     @field_validator("version")
     @classmethod
     def validate_app_version(cls, v: str):
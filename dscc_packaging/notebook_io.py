@@ -1,3 +1,8 @@
+import io
+import json
+import os
+import re
+import shutil
 import yaml
 from pathlib import Path
 import nbformat
@@ -16,11 +21,11 @@ def is_magic_cell(cell):
 
 
 def is_ipynb(path: Path) -> bool:
-    return path.suffix == ".ipynb"
+    return Path(path).suffix == ".ipynb"
 
 def discover_notebook_files(base_path: Path) -> list[Path]:
     return [
-        f for f in base_path.rglob("*")
+        f for f in Path(base_path).rglob("*")
         if f.suffix in [".py", ".ipynb"] and f.is_file()
     ]
 
@@ -59,38 +64,97 @@ def read_notebook_source_lines(notebook_path: Path) -> list[str]:
 
 
 
-def write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines=None, overwrite=False):
+COMMAND_DELIMITER = "# COMMAND ----------"
+NOTEBOOK_HEADER = "# Databricks notebook source"
+
+
+class NotebookCell:
+    """One notebook cell and its [start, end) offsets into ParsedNotebook.lines."""
+
+    def __init__(self, index, cell_type, start, end):
+        self.index = index
+        self.cell_type = cell_type
+        self.start = start
+        self.end = end
+
+
+class YamlBlock:
     """
-    Writes or updates the dscc: and dscc-tests: metadata block in a Databricks notebook (.py or .ipynb).
-    - Only updates the YAML block containing a dscc: key.
-    - If no such block exists, inserts a new one.
-    - Unrelated YAML blocks are left untouched.
+    A ```yaml fenced block. `start`/`end` are the fence line offsets and
+    `md_start` the enclosing `%md` line (.py); `cell_index` locates the
+    markdown cell (.ipynb).
     """
-    if source_lines is None:
-        source_lines = read_notebook_source_lines(notebook_path)
 
-    if not is_ipynb(notebook_path):
-        # --- .py logic ---
-        # Find all YAML blocks and their indices
-        yaml_blocks = []  # (start_idx, end_idx, parsed_yaml)
+    def __init__(self, data, start=None, end=None, md_start=None, cell_index=None):
+        self.data = data
+        self.start = start
+        self.end = end
+        self.md_start = md_start
+        self.cell_index = cell_index
+
+
+class ParsedNotebook:
+    """
+    A notebook read and split once: its raw text, logical source lines (as
+    returned by read_notebook_source_lines), cells with line offsets, YAML
+    blocks, the located `dscc:` and `dscc-tests:` blocks and the code for AST
+    analysis.
+
+    Built once per file and shared by metadata generation, test inference,
+    write_metadata_block and the tester's test discovery, so a command reads
+    each notebook once.
+    """
+
+    def __init__(self, path, text):
+        self.path = Path(path)
+        self.text = text
+        self.is_ipynb = is_ipynb(self.path)
+        self.nb = None
+        self.cells = []
+        self.yaml_blocks = []
+        if self.is_ipynb:
+            self.nb = _read_ipynb(text)
+            self._parse_ipynb()
+        else:
+            self.lines = io.StringIO(text).readlines()
+            self._parse_py()
+        self.dscc_block = next(
+            (b for b in self.yaml_blocks if isinstance(b.data, dict) and "dscc" in b.data),
+            None,
+        )
+        self.tests_block = next(
+            (b for b in self.yaml_blocks if isinstance(b.data, dict) and ("dscc-tests" in b.data or "tests" in b.data)),
+            None,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(path, f.read())
+
+    def _parse_py(self):
+        start = 0
+        for idx, line in enumerate(self.lines):
+            if line.startswith(COMMAND_DELIMITER):
+                self._add_py_cell(start, idx)
+                start = idx + 1
+        self._add_py_cell(start, len(self.lines))
+
         in_yaml_block = False
         block_start = None
         block_lines = []
-        for idx, line in enumerate(source_lines):
+        for idx, line in enumerate(self.lines):
             if "# MAGIC ```yaml" in line:
                 in_yaml_block = True
                 block_start = idx
                 block_lines = []
                 continue
             if in_yaml_block and "# MAGIC ```" in line:
-                try:
-                    parsed = yaml.safe_load("\n".join(block_lines))
-                except Exception:
-                    parsed = None
-                yaml_blocks.append((block_start, idx, parsed))
+                md_start = block_start
+                while md_start > 0 and not self.lines[md_start].strip().startswith("# MAGIC %md"):
+                    md_start -= 1
+                self.yaml_blocks.append(YamlBlock(_safe_yaml("\n".join(block_lines)), block_start, idx, md_start))
                 in_yaml_block = False
-                block_start = None
-                block_lines = []
                 continue
             if in_yaml_block:
                 content = line.strip()
@@ -98,68 +162,246 @@ def write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines=None
                     content = content[len("# MAGIC "):]
                 block_lines.append(content)
 
-        # Find the block with a dscc: key
-        dscc_block = None
-        for start, end, parsed in yaml_blocks:
-            if parsed and isinstance(parsed, dict) and "dscc" in parsed:
-                dscc_block = (start, end, parsed)
-                break
+    def _add_py_cell(self, start, end):
+        body = [line for line in self.lines[start:end] if line.strip() and not line.startswith(NOTEBOOK_HEADER)]
+        cell_type = "markdown" if body and body[0].strip().startswith("# MAGIC %md") else "code"
+        self.cells.append(NotebookCell(len(self.cells), cell_type, start, end))
+
+    def _parse_ipynb(self):
+        self.lines = []
+        for idx, cell in enumerate(self.nb.cells):
+            start = len(self.lines)
+            if cell.cell_type == "code":
+                self.lines.extend(cell.source.splitlines())
+            elif cell.cell_type == "markdown":
+                # Emulate Databricks style
+                self.lines.extend(f"# MAGIC {line}" for line in cell.source.splitlines())
+                yaml_lines = _fenced_yaml_lines(cell.source)
+                if yaml_lines:
+                    self.yaml_blocks.append(YamlBlock(_safe_yaml("\n".join(yaml_lines)), cell_index=idx))
+            self.cells.append(NotebookCell(idx, cell.cell_type, start, len(self.lines)))
+
+    @property
+    def dscc(self):
+        """The parsed `dscc:` block (the whole YAML mapping), or None."""
+        return self.dscc_block.data if self.dscc_block else None
+
+    @property
+    def tests(self):
+        """
+        The test cases of the `dscc-tests:` block (`dscc-tests: {tests: [...]}`,
+        a bare `dscc-tests: [...]` list, or a top-level `tests:` key), or [].
+        """
+        if self.tests_block is None:
+            return []
+        data = self.tests_block.data
+        tests = data.get("dscc-tests", data.get("tests"))
+        if isinstance(tests, dict):
+            tests = tests.get("tests")
+        return tests if isinstance(tests, list) else []
+
+    @property
+    def code(self):
+        """
+        Source for AST analysis, with magic lines removed: the code cells of
+        an .ipynb, the whole file for .py (markdown there is `# MAGIC`
+        comments, and a YAML block may share a cell with code).
+        """
+        code_lines = []
+        for cell in self.cells:
+            if self.is_ipynb and cell.cell_type != "code":
+                continue
+            for line in self.lines[cell.start:cell.end]:
+                if not line.strip().startswith('%'):
+                    code_lines.append(line.rstrip("\n"))
+        return "\n".join(code_lines) + "\n"
+
 
-        # Prepare the new/updated metadata
+def _read_ipynb(text):
+    """
+    Reads notebook JSON without schema validation; nbformat 4 documents are
+    read as-is so cell indices match the raw JSON, older ones are converted.
+    """
+    try:
+        if find_json_value(text, ["nbformat"]) == 4:
+            return nbformat.v4.reads(text)
+    except ValueError:
+        pass
+    return nbformat.reads(text, as_version=4)
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _skip_ws(text, pos):
+    return _JSON_WHITESPACE.match(text, pos).end()
+
+
+def find_json_span(text, path, pos=0):
+    """
+    Returns the (start, end) character span of the value at `path` (object
+    keys and list indices) in the JSON document `text`. Sibling values are
+    skipped with raw_decode rather than building the whole document.
+    Raises ValueError if the path does not exist.
+    """
+    pos = _skip_ws(text, pos)
+    if not path:
+        _, end = _JSON_DECODER.raw_decode(text, pos)
+        return pos, end
+
+    target, rest = path[0], path[1:]
+    opener = text[pos:pos + 1]
+    if opener == "{" and isinstance(target, str):
+        pos = _skip_ws(text, pos + 1)
+        while text[pos:pos + 1] != "}":
+            key, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = _skip_ws(text, pos)
+            if text[pos:pos + 1] != ":":
+                raise ValueError(f"malformed JSON object at offset {pos}")
+            pos = _skip_ws(text, pos + 1)
+            if key == target:
+                return find_json_span(text, rest, pos)
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = _skip_ws(text, pos)
+            if text[pos:pos + 1] == ",":
+                pos = _skip_ws(text, pos + 1)
+    elif opener == "[" and isinstance(target, int):
+        pos = _skip_ws(text, pos + 1)
+        index = 0
+        while text[pos:pos + 1] != "]":
+            if index == target:
+                return find_json_span(text, rest, pos)
+            _, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = _skip_ws(text, pos)
+            if text[pos:pos + 1] == ",":
+                pos = _skip_ws(text, pos + 1)
+            index += 1
+    raise ValueError(f"JSON path {path!r} not found")
+
+
+def find_json_value(text, path):
+    start, end = find_json_span(text, path)
+    return json.loads(text[start:end])
+
+
+def _render_ipynb_source(source, old_value):
+    """
+    Serializes a cell source the way the existing value is laid out: a
+    single string, or a list of lines indented like the current list.
+    """
+    if old_value.startswith('"'):
+        return json.dumps(source, ensure_ascii=False)
+    lines = source.splitlines(keepends=True)
+    if not lines:
+        return "[]"
+    match = re.match(r"\[\s*?\n([ \t]*)", old_value)
+    item_indent = match.group(1) if match else " "
+    close_match = re.search(r"\n([ \t]*)\]$", old_value)
+    close_indent = close_match.group(1) if close_match else ""
+    items = ",\n".join(item_indent + json.dumps(line, ensure_ascii=False) for line in lines)
+    return f"[\n{items}\n{close_indent}]"
+
+
+def patch_ipynb_cell_source(text, cell_index, source):
+    """
+    Replaces only `cells[cell_index].source` in the raw notebook JSON and
+    returns the new text; every other byte of the document is kept.
+    """
+    start, end = find_json_span(text, ["cells", cell_index, "source"])
+    return text[:start] + _render_ipynb_source(source, text[start:end]) + text[end:]
+
+
+def _safe_yaml(text):
+    try:
+        return yaml.safe_load(text)
+    except Exception:
+        return None
+
+
+def _fenced_yaml_lines(source):
+    in_yaml = False
+    yaml_lines = []
+    for line in source.splitlines():
+        if line.strip() == "```yaml":
+            in_yaml = True
+            yaml_lines = []
+            continue
+        if in_yaml and line.strip() == "```":
+            break
+        if in_yaml:
+            yaml_lines.append(line)
+    return yaml_lines
+
+
+# Parsed notebooks keyed by path, validated against the file's mtime and size
+_PARSE_CACHE = {}
+_PARSE_CACHE_SIZE = 256
+
+
+def parse_notebook(notebook_path) -> ParsedNotebook:
+    """
+    Returns the ParsedNotebook for a file, reusing the last parse while the
+    file's mtime and size are unchanged.
+    """
+    path = Path(notebook_path)
+    key = os.path.abspath(path)
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _PARSE_CACHE.pop(key, None)
+    if cached is None or cached[0] != signature:
+        cached = (signature, ParsedNotebook.load(path))
+    _PARSE_CACHE[key] = cached
+    while len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+        del _PARSE_CACHE[next(iter(_PARSE_CACHE))]
+    return cached[1]
+
+
+def write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines=None, overwrite=False, parsed=None, validate=False):
+    """
+    Writes or updates the dscc: and dscc-tests: metadata block in a Databricks notebook (.py or .ipynb).
+    - Only updates the YAML block containing a dscc: key.
+    - If no such block exists, inserts a new one.
+    - Unrelated YAML blocks are left untouched.
+    Pass the notebook's ParsedNotebook as `parsed` to reuse it instead of reading the file again.
+    Returns True if the file was written, False if it already held the same content.
+
+    For .ipynb files an existing dscc: cell is patched in the raw JSON, leaving
+    the rest of the document byte-for-byte; nbformat schema validation of the
+    result only runs with `validate=True`.
+    """
+    if parsed is None:
+        parsed = parse_notebook(notebook_path)
+    dscc_block = parsed.dscc_block
+
+    if not parsed.is_ipynb:
+        # --- .py logic ---
+        if source_lines is None:
+            source_lines = parsed.lines
         if dscc_block:
-            start, end, parsed = dscc_block
-            # Step back to the nearest %md line
-            md_start = start
-            while md_start > 0 and not source_lines[md_start].strip().startswith("# MAGIC %md"):
-                md_start -= 1
-            full_metadata = dict(dscc_meta) if overwrite else dict(parsed)
+            full_metadata = dict(dscc_meta) if overwrite else dict(dscc_block.data)
             full_metadata["dscc-tests"] = {"tests": test_cases}
             yaml_lines_out = yaml.dump(full_metadata, sort_keys=False).splitlines()
-            _write_magic_yaml_to_py(notebook_path, yaml_lines_out, source_lines, overwrite=True, block_range=(md_start, end))
+            return _write_magic_yaml_to_py(notebook_path, yaml_lines_out, source_lines, overwrite=True, block_range=(dscc_block.md_start, dscc_block.end), current=parsed.text)
         else:
             # Always insert a new DSCC block if none exists, regardless of overwrite
             full_metadata = dict(dscc_meta) if dscc_meta else {}
             full_metadata["dscc-tests"] = {"tests": test_cases}
             yaml_lines_out = yaml.dump(full_metadata, sort_keys=False).splitlines()
-            _write_magic_yaml_to_py(notebook_path, yaml_lines_out, source_lines, overwrite=True, block_range=None)
+            return _write_magic_yaml_to_py(notebook_path, yaml_lines_out, source_lines, overwrite=True, block_range=None, current=parsed.text)
     else:
         # --- .ipynb logic ---
-        nb: nbformat.NotebookNode = nbformat.read(notebook_path, as_version=4)
-        # Find all markdown YAML blocks
-        yaml_cells = []  # (cell_idx, parsed_yaml)
-        for idx, cell in enumerate(nb.cells):
-            if cell.cell_type == "markdown":
-                lines = cell.source.splitlines()
-                in_yaml = False
-                yaml_lines = []
-                for line in lines:
-                    if line.strip() == "```yaml":
-                        in_yaml = True
-                        yaml_lines = []
-                        continue
-                    if in_yaml and line.strip() == "```":
-                        break
-                    if in_yaml:
-                        yaml_lines.append(line)
-                if yaml_lines:
-                    try:
-                        parsed = yaml.safe_load("\n".join(yaml_lines))
-                    except Exception:
-                        parsed = None
-                    yaml_cells.append((idx, parsed))
-        # Find the cell with a dscc: key
-        dscc_cell = None
-        for cell_idx, parsed in yaml_cells:
-            if parsed and isinstance(parsed, dict) and "dscc" in parsed:
-                dscc_cell = (cell_idx, parsed)
-                break
-        # Prepare the new/updated metadata
-        if dscc_cell:
-            cell_idx, parsed = dscc_cell
-            full_metadata = dict(dscc_meta) if overwrite else dict(parsed)
+        nb = parsed.nb
+        if dscc_block:
+            full_metadata = dict(dscc_meta) if overwrite else dict(dscc_block.data)
             full_metadata["dscc-tests"] = {"tests": test_cases}
             yaml_lines_out = ["```yaml"] + yaml.dump(full_metadata, sort_keys=False).splitlines() + ["```"]
-            nb.cells[cell_idx].source = "\n".join(yaml_lines_out)
+            nb.cells[dscc_block.cell_index].source = "\n".join(yaml_lines_out)
+            try:
+                content = patch_ipynb_cell_source(parsed.text, dscc_block.cell_index, nb.cells[dscc_block.cell_index].source)
+            except ValueError:
+                # Converted (pre-v4) or unusual JSON; fall back to a full re-serialization
+                content = None
         else:
             full_metadata = dict(dscc_meta) if dscc_meta else {}
             full_metadata["dscc-tests"] = {"tests": test_cases}
@@ -172,9 +414,44 @@ def write_metadata_block(notebook_path, dscc_meta, test_cases, source_lines=None
                 if cell.cell_type == "code" and any(cell.source.strip().startswith(cmd) for cmd in ("%run", "%pip", "%conda")):
                     insert_idx = i + 1
             nb.cells.insert(insert_idx, new_cell)
-        nbformat.write(nb, notebook_path)
+            content = None
+
+        if content is None:
+            content = nbformat.v4.writes(nb)
+            if not content.endswith("\n"):
+                content += "\n"
+        if validate:
+            nbformat.validate(nbformat.v4.reads(content))
+        return write_if_changed(notebook_path, content, current=parsed.text)
+
+def write_if_changed(path, content, current=None):
+    """
+    Writes `content` to `path` unless the file already holds exactly that.
+    Changed files are written to a temp file and renamed into place, so an
+    interrupted write never leaves a truncated notebook. Returns True if the
+    file was written.
+    """
+    path = Path(path)
+    _PARSE_CACHE.pop(os.path.abspath(path), None)
+    if current is None and path.exists():
+        with open(path, encoding="utf-8") as f:
+            current = f.read()
+    if current == content:
+        return False
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return True
 
-def _write_magic_yaml_to_py(path, yaml_lines, source_lines, overwrite, block_range=None):
+def _write_magic_yaml_to_py(path, yaml_lines, source_lines, overwrite, block_range=None, current=None):
     block = ["# MAGIC %md\n", "# MAGIC ```yaml\n"]
     block.extend([f"# MAGIC {line}\n" for line in yaml_lines])
     block.append("# MAGIC ```\n")
@@ -186,8 +463,7 @@ def _write_magic_yaml_to_py(path, yaml_lines, source_lines, overwrite, block_ran
         insert_idx = next((i for i, line in enumerate(source_lines) if line.startswith("# COMMAND")), 0) + 1
         new_source = source_lines[:insert_idx] + block + source_lines[insert_idx:]
 
-    with open(path, "w") as f:
-        f.writelines(new_source)
+    return write_if_changed(path, "".join(new_source), current=current)
 
 def _write_yaml_cell_to_ipynb(path: Path, yaml_lines: list, overwrite: bool):
     nb = nbformat.read(path, as_version=4)
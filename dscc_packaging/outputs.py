@@ -0,0 +1,116 @@
+"""
+Stripping cell outputs from .ipynb notebooks at packaging time.
+
+Outputs and execution counts are cleared in one pass over the raw notebook
+JSON: only those values are replaced, everything else is kept byte-for-byte.
+Notebook sizes are reported before and after, and a size budget can fail the
+packaging run.
+"""
+import os
+from pathlib import Path
+
+from .notebook_io import _JSON_DECODER, _skip_ws, discover_notebook_files, find_json_span, is_ipynb, write_if_changed
+from .shared_utils import format_bytes
+
+# Cell keys and the value they are reset to
+CLEARED_VALUES = {
+    "outputs": "[]",
+    "execution_count": "null",
+}
+
+
+def _skip(text, pos, char=None):
+    pos = _skip_ws(text, pos)
+    if char is not None and text[pos:pos + 1] == char:
+        pos = _skip_ws(text, pos + 1)
+    return pos
+
+
+def strip_outputs_text(text):
+    """
+    Returns (new_text, cleared) where every cell's outputs and execution
+    count are emptied and `cleared` counts the values that changed.
+    """
+    start, _ = find_json_span(text, ["cells"])
+    pieces = []
+    last = 0
+    cleared = 0
+
+    pos = _skip(text, start + 1)
+    while text[pos:pos + 1] != "]":
+        if text[pos:pos + 1] != "{":
+            raise ValueError(f"expected a cell object at offset {pos}")
+        pos = _skip(text, pos + 1)
+        while text[pos:pos + 1] != "}":
+            key, pos = _JSON_DECODER.raw_decode(text, pos)
+            pos = _skip(text, pos)
+            if text[pos:pos + 1] != ":":
+                raise ValueError(f"malformed cell at offset {pos}")
+            pos = _skip(text, pos + 1)
+            _, value_end = _JSON_DECODER.raw_decode(text, pos)
+            replacement = CLEARED_VALUES.get(key)
+            if replacement is not None and text[pos:value_end] != replacement:
+                pieces.append(text[last:pos])
+                pieces.append(replacement)
+                last = value_end
+                cleared += 1
+            pos = _skip(text, value_end, ",")
+        pos = _skip(text, pos + 1, ",")
+
+    pieces.append(text[last:])
+    return "".join(pieces), cleared
+
+
+def strip_notebook_outputs(path, dry_run=False):
+    """
+    Strips one notebook in place (unless `dry_run`).
+    Returns (size_before, size_after) in bytes.
+    """
+    before = os.path.getsize(path)
+    if not is_ipynb(path):
+        return before, before
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    stripped, cleared = strip_outputs_text(text)
+    if cleared and not dry_run:
+        write_if_changed(path, stripped, current=text)
+    return before, len(stripped.encode("utf-8"))
+
+
+def strip_app_outputs(app_path=".", dry_run=False, max_notebook_kb=None, max_total_kb=None):
+    """
+    Strips outputs from every notebook under <app>/base, reports sizes and
+    checks them against the optional per-notebook and total budgets (KB,
+    measured after stripping). Returns True when within budget.
+    """
+    app_path = Path(app_path)
+    base_path = app_path / "base"
+    # .dbc archives count towards the budget but are not rewritten
+    notebooks = sorted(discover_notebook_files(base_path) + list(base_path.rglob("*.dbc")))
+
+    total_before = total_after = 0
+    over_budget = []
+    print(f"✂️  {'Checking' if dry_run else 'Stripping'} notebook outputs in {base_path}...\n")
+    for notebook in notebooks:
+        rel = notebook.relative_to(app_path)
+        try:
+            before, after = strip_notebook_outputs(notebook, dry_run=dry_run)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not strip {rel}: {e}")
+            before = after = os.path.getsize(notebook)
+        total_before += before
+        total_after += after
+        if after != before:
+            print(f"📓 {rel}: {format_bytes(before)} → {format_bytes(after)}")
+        if max_notebook_kb is not None and after > max_notebook_kb * 1024:
+            over_budget.append(f"{rel} is {format_bytes(after)}, over the {max_notebook_kb} KB per-notebook budget")
+
+    print(f"\n📦 Total: {format_bytes(total_before)} → {format_bytes(total_after)} across {len(notebooks)} notebook(s)")
+    if max_total_kb is not None and total_after > max_total_kb * 1024:
+        over_budget.append(f"notebooks total {format_bytes(total_after)}, over the {max_total_kb} KB budget")
+
+    for message in over_budget:
+        print(f"❌ {message}")
+    if not over_budget:
+        print("✅ Notebooks are within the size budget.")
+    return not over_budget
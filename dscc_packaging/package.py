@@ -0,0 +1,472 @@
+"""
+Building the submission zip of an app.
+
+Files are streamed straight from the app directory into the archive, so no
+staged copy of the app is written. The walk skips system files and folders
+(see ignore.py), replacing a separate delete pass.
+
+Archives are deterministic: entries are written in sorted order with a fixed
+timestamp and normalised permissions, so packaging unchanged content yields
+a byte-identical zip.
+
+The SHA-256 and size of every file are recorded while it is streamed and
+embedded as a `files` table in the archived `manifest.yaml` (see
+`DSCCManifestFile`). The manifest is therefore written last, after all the
+files it describes. The app's own manifest.yaml is left untouched. Consumers can
+check the table against the archive with `verify_package`, or compare digests
+to skip unchanged files, without unpacking.
+
+Each file is read once, in blocks. Blocks are deflated independently on a
+thread pool (zlib releases the GIL), each primed with the previous 32 KiB as
+a dictionary, and concatenated into one deflate stream. Large entries are
+therefore compressed in parallel, and the output does not depend on the
+number of workers. Files in already-compressed formats (STORED_SUFFIXES),
+and files whose first block does not shrink when deflated, are stored.
+"""
+import hashlib
+import io
+import os
+import re
+import stat
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from pydantic import ValidationError
+
+from .models import DSCCManifest, DSCCManifestFile
+from .shared_utils import format_bytes
+from .ignore import default_matcher
+
+MANIFEST_NAME = "manifest.yaml"
+# Tombstones and base digests of a delta package (see delta.py)
+DELTA_NAME = "delta.yaml"
+
+BLOCK_SIZE = 1024 * 1024
+DICTIONARY_SIZE = 32 * 1024
+DEFAULT_COMPRESS_LEVEL = 6
+
+# 1980-01-01 00:00:00, the earliest DOS timestamp
+DOS_TIME = 0
+DOS_DATE = (1 << 5) | 1
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+VERSION_MADE_BY = (3 << 8) | 45  # Unix, zip spec 4.5
+
+# Already-compressed formats, stored without trying to deflate them
+STORED_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".whl", ".jar",
+    ".parquet", ".orc", ".avro",
+}
+
+
+class ZipEntry:
+    """An archive member and what the central directory needs to know about it."""
+
+    def __init__(self, name, mode, is_dir=False):
+        self.name = name
+        self.mode = mode
+        self.is_dir = is_dir
+        self.method = METHOD_STORED if is_dir or Path(name).suffix.lower() in STORED_SUFFIXES else METHOD_DEFLATED
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.offset = 0
+        self.zip64 = False
+        self.sha256 = None
+
+    @property
+    def external_attr(self):
+        attr = self.mode << 16
+        return attr | 0x10 if self.is_dir else attr
+
+
+def iter_app_files(app_path: Path, exclude=()) -> Iterator[Tuple[Path, str, bool]]:
+    """
+    Yields (path, archive path, is_dir) for everything to package under
+    `app_path`, in sorted order, skipping ignored system files and the paths
+    in `exclude`. Archive paths are prefixed with the app directory's name.
+    """
+    app_path = Path(app_path).resolve()
+    exclude = {Path(path).resolve() for path in exclude}
+    for root, dirs, files in default_matcher().walk(app_path):
+        rel = root.relative_to(app_path.parent).as_posix()
+        yield root, f"{rel}/", True
+        for name in files:
+            path = root / name
+            if path in exclude:
+                continue
+            yield path, f"{rel}/{name}", False
+
+
+def _normalised_mode(path: Path, is_dir: bool) -> int:
+    if is_dir:
+        return stat.S_IFDIR | 0o755
+    executable = os.stat(path).st_mode & 0o111
+    return stat.S_IFREG | (0o755 if executable else 0o644)
+
+
+def deflate_block(data: bytes, dictionary: bytes, last: bool, level: int = DEFAULT_COMPRESS_LEVEL) -> bytes:
+    """
+    Raw-deflates one block. Non-final blocks end on a byte boundary (sync
+    flush), so consecutive blocks concatenate into a single valid stream.
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ZipStreamWriter:
+    """
+    Writes zip members sequentially to a binary stream. Entries use data
+    descriptors, so nothing is seeked back to; Zip64 records are added when
+    sizes, offsets or the entry count need them.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = 0
+        self.entries: List[ZipEntry] = []
+
+    def _write(self, data: bytes):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def start_entry(self, entry: ZipEntry, expected_size: int = 0):
+        entry.offset = self.offset
+        entry.zip64 = expected_size >= ZIP64_LIMIT
+        name = entry.name.encode("utf-8")
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if entry.zip64 else b""
+        sizes = ZIP64_LIMIT if entry.zip64 else 0
+        flags = FLAG_UTF8 | (0 if entry.is_dir else FLAG_DATA_DESCRIPTOR)
+        self._write(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if entry.zip64 else 20, flags, entry.method,
+            DOS_TIME, DOS_DATE, 0, sizes, sizes, len(name), len(extra),
+        ) + name + extra)
+        self.entries.append(entry)
+
+    def write_data(self, entry: ZipEntry, data: bytes):
+        entry.compressed_size += len(data)
+        self._write(data)
+
+    def end_entry(self, entry: ZipEntry):
+        if entry.is_dir:
+            return
+        if entry.zip64:
+            self._write(struct.pack("<IIQQ", 0x08074B50, entry.crc, entry.compressed_size, entry.size))
+        else:
+            self._write(struct.pack("<IIII", 0x08074B50, entry.crc, entry.compressed_size, entry.size))
+
+    def close(self):
+        directory_offset = self.offset
+        for entry in self.entries:
+            name = entry.name.encode("utf-8")
+            values = []
+            size, compressed_size, offset = entry.size, entry.compressed_size, entry.offset
+            if size >= ZIP64_LIMIT or entry.zip64:
+                values.append(size)
+                size = ZIP64_LIMIT
+            if compressed_size >= ZIP64_LIMIT or entry.zip64:
+                values.append(compressed_size)
+                compressed_size = ZIP64_LIMIT
+            if offset >= ZIP64_LIMIT:
+                values.append(offset)
+                offset = ZIP64_LIMIT
+            extra = struct.pack(f"<HH{len(values)}Q", 0x0001, 8 * len(values), *values) if values else b""
+            flags = FLAG_UTF8 | (0 if entry.is_dir else FLAG_DATA_DESCRIPTOR)
+            self._write(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, VERSION_MADE_BY, 45 if values else 20, flags,
+                entry.method, DOS_TIME, DOS_DATE, entry.crc, compressed_size, size,
+                len(name), len(extra), 0, 0, 0, entry.external_attr, offset,
+            ) + name + extra)
+
+        directory_size = self.offset - directory_offset
+        count = len(self.entries)
+        if count >= ZIP64_COUNT_LIMIT or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+            end_offset = self.offset
+            self._write(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, VERSION_MADE_BY, 45, 0, 0,
+                count, count, directory_size, directory_offset,
+            ))
+            self._write(struct.pack("<IIQI", 0x07064B50, 0, end_offset, 1))
+        self._write(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+            min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0,
+        ))
+
+
+def manifest_file_table(entries: List[ZipEntry]) -> List[DSCCManifestFile]:
+    """The manifest `files` table for packaged entries: app-relative paths, sorted."""
+    return sorted(
+        (
+            DSCCManifestFile(path=entry.name.split("/", 1)[1], size=entry.size, sha256=entry.sha256)
+            for entry in entries
+            if not entry.is_dir
+        ),
+        key=lambda f: f.path,
+    )
+
+
+def _without_files_table(text: str) -> str:
+    """Drops a top-level `files:` block, leaving every other line as written."""
+    lines = []
+    skipping = False
+    for line in text.splitlines(keepends=True):
+        if re.match(r"files\s*:", line):
+            skipping = True
+            continue
+        # The block ends at the next top-level key
+        if skipping and re.match(r"[^\s#-]", line):
+            skipping = False
+        if not skipping:
+            lines.append(line)
+    return "".join(lines)
+
+
+def manifest_with_files(text: str, files: List[DSCCManifestFile]) -> str:
+    """
+    Returns the manifest YAML with `files` appended as its files table. The
+    rest of the text, comments and formatting included, is kept verbatim.
+    Raises ValueError if the result does not validate against the schema.
+    """
+    text = _without_files_table(text)
+    if text and not text.endswith("\n"):
+        text += "\n"
+    text += yaml.safe_dump({"files": [f.model_dump() for f in files]}, sort_keys=False)
+    try:
+        DSCCManifest(**(yaml.safe_load(text) or {}))
+    except (TypeError, ValidationError, yaml.YAMLError) as e:
+        raise ValueError(f"{MANIFEST_NAME} does not validate against the manifest schema: {e}")
+    return text
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_app_zip(
+    app_path,
+    stream,
+    jobs=None,
+    level=DEFAULT_COMPRESS_LEVEL,
+    exclude=(),
+    previous: Optional[Dict[str, DSCCManifestFile]] = None,
+    trailer: Optional[Callable[[List[DSCCManifestFile]], List[Tuple[str, bytes]]]] = None,
+) -> List[ZipEntry]:
+    """
+    Streams the app into a zip written to `stream` and returns its entries.
+    Up to a few blocks per worker are in flight, bounding memory use. When
+    the app has a manifest.yaml, it is written last with the files table.
+
+    With `previous` (a files table keyed by path), files whose size and
+    digest are unchanged are left out and no directory entries are written;
+    the manifest still lists every file. `trailer` receives the full table
+    and returns extra (app-relative path, content) members to append.
+    """
+    writer = ZipStreamWriter(stream)
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    window = jobs * 4
+    # Work items in archive order: ("start", entry, size), ("block", entry, future, data), ("end", entry)
+    pending = deque()
+    hashed = []
+
+    def drain(limit):
+        while len(pending) > limit:
+            item = pending.popleft()
+            entry = item[1]
+            if item[0] == "start":
+                # Incompressible content is stored: decided on the first block, which
+                # is always queued right after the start item
+                if entry.method == METHOD_DEFLATED:
+                    first = pending[0]
+                    if len(first[2].result()) >= len(first[3]):
+                        entry.method = METHOD_STORED
+                writer.start_entry(entry, item[2])
+            elif item[0] == "block":
+                writer.write_data(entry, item[3] if entry.method == METHOD_STORED else item[2].result())
+            else:
+                writer.end_entry(entry)
+
+    def add_file(entry, f, size):
+        # One read per block feeds the CRC, the digest and the compressor
+        pending.append(("start", entry, size))
+        digest = hashlib.sha256()
+        dictionary = b""
+        block = f.read(BLOCK_SIZE)
+        while True:
+            following = f.read(BLOCK_SIZE) if len(block) == BLOCK_SIZE else b""
+            entry.crc = zlib.crc32(block, entry.crc)
+            entry.size += len(block)
+            digest.update(block)
+            last = not following
+            future = pool.submit(deflate_block, block, dictionary, last, level) if entry.method == METHOD_DEFLATED else None
+            pending.append(("block", entry, future, block))
+            drain(window)
+            if last:
+                break
+            dictionary = block[-DICTIONARY_SIZE:]
+            block = following
+        entry.sha256 = digest.hexdigest()
+        hashed.append(entry)
+        pending.append(("end", entry))
+
+    app_path = Path(app_path).resolve()
+    manifest_path = app_path / MANIFEST_NAME
+    manifest_entry = None
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for path, name, is_dir in iter_app_files(app_path, exclude=exclude):
+            entry = ZipEntry(name, _normalised_mode(path, is_dir), is_dir=is_dir)
+            if is_dir:
+                if previous is not None:
+                    continue
+                pending.append(("start", entry, 0))
+                pending.append(("end", entry))
+                drain(window)
+            elif path == manifest_path:
+                manifest_entry = entry
+            elif previous is not None and _unchanged(entry, path, previous):
+                hashed.append(entry)
+            else:
+                with open(path, "rb") as f:
+                    add_file(entry, f, os.path.getsize(path))
+
+        if manifest_entry is not None:
+            with open(manifest_path, encoding="utf-8") as f:
+                current = f.read()
+            data = manifest_with_files(current, manifest_file_table(hashed)).encode("utf-8")
+            add_file(manifest_entry, io.BytesIO(data), len(data))
+        if trailer is not None:
+            for rel, data in trailer(manifest_file_table(hashed)):
+                add_file(ZipEntry(f"{app_path.name}/{rel}", stat.S_IFREG | 0o644), io.BytesIO(data), len(data))
+        drain(0)
+    writer.close()
+    return writer.entries
+
+
+def _unchanged(entry: ZipEntry, path: Path, previous: Dict[str, DSCCManifestFile]) -> bool:
+    """Whether `path` matches its previous table entry; fills in the entry's size and digest if so."""
+    known = previous.get(entry.name.split("/", 1)[1])
+    if known is None:
+        return False
+    size = os.path.getsize(path)
+    # A size change already means new content, so only same-size files are hashed
+    if size != known.size:
+        return False
+    digest = file_sha256(path)
+    if digest != known.sha256:
+        return False
+    entry.size, entry.sha256 = size, digest
+    return True
+
+
+def default_package_path(app_path) -> Path:
+    app_path = Path(app_path).resolve()
+    return app_path.parent / f"{app_path.name}.zip"
+
+
+def verify_package(zip_path) -> bool:
+    """
+    Checks every file in a package against the manifest's files table,
+    streaming each member through SHA-256. Returns True when all match.
+    """
+    import zipfile
+
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"❌ Could not open {zip_path}: {e}")
+        return False
+
+    with archive:
+        names = [info.filename for info in archive.infolist() if not info.is_dir()]
+        manifests = [name for name in names if name.count("/") == 1 and name.endswith(f"/{MANIFEST_NAME}")]
+        if not manifests:
+            print(f"❌ No {MANIFEST_NAME} found in {zip_path}")
+            return False
+        prefix = manifests[0].split("/", 1)[0]
+        data = yaml.safe_load(archive.read(manifests[0])) or {}
+        try:
+            files = [DSCCManifestFile(**f) for f in data.get("files") or []]
+        except (TypeError, ValidationError) as e:
+            print(f"❌ The files table in {MANIFEST_NAME} is invalid: {e}")
+            return False
+        if not files:
+            print(f"❌ {MANIFEST_NAME} has no files table; package it with `dscc packaging package`")
+            return False
+
+        problems = []
+        listed = {f"{prefix}/{f.path}" for f in files}
+        # Delta packages only carry the files that changed
+        is_delta = f"{prefix}/{DELTA_NAME}" in names
+        for f in files:
+            name = f"{prefix}/{f.path}"
+            if name not in names:
+                if not is_delta:
+                    problems.append(f"{f.path} is missing")
+                continue
+            digest = hashlib.sha256()
+            size = 0
+            with archive.open(name) as member:
+                for block in iter(lambda: member.read(BLOCK_SIZE), b""):
+                    digest.update(block)
+                    size += len(block)
+            if size != f.size or digest.hexdigest() != f.sha256:
+                problems.append(f"{f.path} does not match its digest")
+        problems += [f"{name.split('/', 1)[1]} is not in the files table" for name in names if name not in listed and name not in (manifests[0], f"{prefix}/{DELTA_NAME}")]
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        checked = sum(f"{prefix}/{f.path}" in names for f in files)
+        print(f"✅ {checked} file(s) in {zip_path} match the manifest.")
+    return not problems
+
+
+def package_app(app_path=".", output=None, jobs=None, level=DEFAULT_COMPRESS_LEVEL, previous=None, trailer=None) -> Optional[Path]:
+    """
+    Builds `<app>.zip` (next to the app unless `output` is given). The zip is
+    written to a temp file and moved into place, so a failed run never
+    leaves a truncated package. Returns the package path, or None on failure.
+    `previous` and `trailer` are passed to write_app_zip (delta packages).
+    """
+    app_path = Path(app_path)
+    if not app_path.is_dir():
+        print(f"❌ App directory not found: {app_path}")
+        return None
+    output = Path(output) if output else default_package_path(app_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+
+    print(f"📦 Packaging {app_path} into {output}...")
+    try:
+        with open(tmp_path, "wb") as f:
+            entries = write_app_zip(
+                app_path, f, jobs=jobs, level=level, exclude=(output, tmp_path), previous=previous, trailer=trailer
+            )
+        os.replace(tmp_path, output)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not create {output}: {e}")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return None
+
+    files = [entry for entry in entries if not entry.is_dir]
+    total = sum(entry.size for entry in files)
+    print(f"✅ Created: {output} ({len(files)} file(s), {format_bytes(total)} → {format_bytes(os.path.getsize(output))})")
+    return output
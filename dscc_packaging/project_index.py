@@ -0,0 +1,191 @@
+"""
+Project-wide symbol table for test inference.
+
+Detections often call helpers defined in `lib/` and pulled in with
+`%run ../lib/<file>`, so the tables and columns a detection reads are not
+visible in its own notebook. The index is built once per run: every `lib/`
+module and `base/` notebook is analysed once (through the AST cache), `%run`
+targets are resolved to files, and each function's tables and columns are
+propagated through the helpers it calls.
+"""
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+
+from .autogen_tests import load_notebook_analysis
+from .notebook_io import discover_notebook_files, parse_notebook
+
+NOTEBOOK_SUFFIXES = ("", ".py", ".ipynb")
+
+
+class ModuleSummary:
+    """The analysis of one notebook or lib module and its resolved %run targets."""
+
+    def __init__(self, path, analysis, runs):
+        self.path = path
+        self.functions = analysis["functions"]
+        self.tables = analysis["tables"]
+        self.columns = analysis["columns"]
+        self.callees = analysis.get("callees", {})
+        self.runs = runs
+
+
+def run_targets(lines) -> List[str]:
+    """The `%run` targets in a notebook's source lines, in order."""
+    targets = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("# MAGIC"):
+            stripped = stripped[len("# MAGIC"):].strip()
+        parts = stripped.split()
+        if len(parts) > 1 and parts[0] == "%run":
+            targets.append(parts[1].strip("\"'"))
+    return targets
+
+
+class ProjectIndex:
+    """
+    Analyses of every notebook and lib module in an app, keyed by resolved
+    path, plus the call-graph resolution on top of them.
+    """
+
+    def __init__(self, app_path="."):
+        self.app_path = Path(app_path).resolve()
+        self.modules: Dict[Path, Optional[ModuleSummary]] = {}
+        self._scopes: Dict[Path, Dict[str, Path]] = {}
+        self._summaries: Dict[Tuple[Path, str], Tuple[Set[str], Set[str]]] = {}
+
+    @classmethod
+    def build(cls, app_path="."):
+        """Indexes all notebooks under lib/ and base/ of the app."""
+        index = cls(app_path)
+        for folder in ("lib", "base"):
+            root = index.app_path / folder
+            if root.is_dir():
+                for path in sorted(discover_notebook_files(root)):
+                    if not path.name.startswith("template_"):
+                        index.module(path)
+        return index
+
+    def module(self, path) -> Optional[ModuleSummary]:
+        """Returns the summary for `path`, analysing it on first use."""
+        path = Path(path).resolve()
+        if path not in self.modules:
+            self.modules[path] = None
+            try:
+                parsed = parse_notebook(path)
+                analysis = load_notebook_analysis(parsed.code)
+            except (OSError, SyntaxError, ValueError) as e:
+                print(f"⚠️  Could not index {path.name}: {e}")
+                return None
+            runs = [target for target in (self.resolve_run(path, t) for t in run_targets(parsed.lines)) if target]
+            self.modules[path] = ModuleSummary(path, analysis, runs)
+        return self.modules[path]
+
+    def resolve_run(self, notebook_path, target) -> Optional[Path]:
+        """
+        Resolves a `%run` target relative to the notebook, falling back to the
+        app root (how the tester imports it). Workspace-absolute paths and
+        missing files resolve to None.
+        """
+        if target.startswith("/"):
+            return None
+        relative = PurePosixPath(target)
+        candidates = [Path(notebook_path).parent / relative]
+        rooted = [part for part in relative.parts if part not in ("..", ".")]
+        if rooted:
+            candidates.append(self.app_path.joinpath(*rooted))
+        for candidate in candidates:
+            for suffix in NOTEBOOK_SUFFIXES:
+                path = candidate.with_name(candidate.name + suffix)
+                if path.is_file():
+                    return path.resolve()
+        return None
+
+    def scope(self, path, _seen=None) -> Dict[str, Path]:
+        """
+        Maps every function name visible in a notebook to the file defining it:
+        functions from its %run targets (later ones win), then its own.
+        """
+        path = Path(path).resolve()
+        if path in self._scopes:
+            return self._scopes[path]
+        seen = _seen if _seen is not None else set()
+        seen.add(path)
+
+        scope = {}
+        module = self.module(path)
+        if module is not None:
+            for target in module.runs:
+                if target not in seen:
+                    scope.update(self.scope(target, seen))
+            scope.update({name: path for name in module.functions})
+        if _seen is None:
+            self._scopes[path] = scope
+        return scope
+
+    def function_summary(self, path, name) -> Tuple[Set[str], Set[str]]:
+        """
+        (tables, columns) used by function `name` defined in `path`, including
+        everything used by the helpers it calls, transitively.
+        """
+        key = (Path(path).resolve(), name)
+        if key not in self._summaries:
+            self._summarize(key, {}, [], {})
+        return self._summaries[key]
+
+    def _summarize(self, key, index, stack, partial) -> int:
+        """
+        Tarjan's SCC walk over the call graph. Helpers that call each other
+        (a cycle) share one summary, stored for every member once the cycle's
+        root finishes, so each function is summarised once. Returns the
+        lowest stack index reachable from `key`.
+        """
+        index[key] = low = len(index)
+        stack.append(key)
+        tables, columns = set(), set()
+        module = self.module(key[0])
+        if module is not None and key[1] in module.functions:
+            tables.update(module.tables.get(key[1], []))
+            columns.update(module.columns.get(key[1], []))
+            scope = self.scope(key[0])
+            for callee in module.callees.get(key[1], []):
+                defining = scope.get(callee)
+                if defining is None:
+                    continue
+                callee_key = (defining, callee)
+                if callee_key not in self._summaries:
+                    if callee_key in index:
+                        # Visited but not summarised yet: on the stack, so in the same cycle
+                        low = min(low, index[callee_key])
+                        continue
+                    low = min(low, self._summarize(callee_key, index, stack, partial))
+                if callee_key in self._summaries:
+                    callee_tables, callee_columns = self._summaries[callee_key]
+                    tables |= callee_tables
+                    columns |= callee_columns
+        partial[key] = (tables, columns)
+
+        if low == index[key]:
+            members = []
+            while True:
+                member = stack.pop()
+                members.append(member)
+                if member == key:
+                    break
+            for member in members:
+                member_tables, member_columns = partial.pop(member)
+                tables |= member_tables
+                columns |= member_columns
+            for member in members:
+                self._summaries[member] = (tables, columns)
+        return low
+
+    def notebook_summaries(self, path) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """Propagated (tables, columns) for each function a notebook defines, sorted."""
+        module = self.module(path)
+        tables, columns = {}, {}
+        for name in (module.functions if module else []):
+            function_tables, function_columns = self.function_summary(path, name)
+            tables[name] = sorted(function_tables)
+            columns[name] = sorted(function_columns)
+        return tables, columns
@@ -0,0 +1,365 @@
+"""
+Sample data capture for generated dscc tests.
+
+Samples for every table a notebook touches are captured concurrently and
+collected through Arrow. Each capture is cached under the dscc cache dir,
+keyed by (source, table, filter, sampling options, table version), so re-preparing
+an app only queries a table again when it has changed since the last capture.
+
+Sampling strategies keep captures from scanning whole tables:
+    limit        Filter and take the first rows (the original behaviour).
+    recent       Only read the last N days, via the partition/timestamp column.
+    tablesample  Read a percentage of the table with TABLESAMPLE.
+    stratified   Take up to `limit` rows per distinct value of a column. This
+                 ranks every row it reads, so on its own it scans (and
+                 shuffles) the whole filtered table; `stratify_base` narrows
+                 the input to a `recent` window or a `tablesample` first.
+
+Samples come from a sample source: `SparkSampleSource` queries live tables,
+`snapshots.LocalSnapshotSource` reads local Parquet / Delta copies without a
+JVM. A source provides `start()`, `table_version(table)`,
+`cache_scope(table)` and `fetch(request) -> (arrow table, files scanned, bytes scanned)`.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .shared_utils import format_bytes, get_cache_dir
+
+DEFAULT_SAMPLE_LIMIT = 10
+DEFAULT_MAX_WORKERS = 4
+SAMPLE_FORMATS = ("json", "parquet")
+SAMPLE_STRATEGIES = ("limit", "recent", "tablesample", "stratified")
+# Strategies a stratified sample can be drawn from instead of the whole table
+STRATIFY_BASES = ("recent", "tablesample")
+
+TIME_COLUMN_TYPES = ("timestamp", "date")
+TIME_COLUMN_NAMES = ("event_date", "date", "event_time", "timestamp", "ts", "time")
+
+# SQL metric names of file scans (OSS Spark and Databricks)
+SCAN_FILE_METRICS = ("numFiles", "number of files read")
+SCAN_BYTES_METRICS = ("filesSize", "size of files read")
+
+
+@dataclass(frozen=True)
+class SamplingOptions:
+    strategy: str = "limit"
+    limit: int = DEFAULT_SAMPLE_LIMIT
+    time_column: Optional[str] = None
+    window_days: int = 1
+    percent: float = 1.0
+    stratify_column: Optional[str] = None
+    stratify_base: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SampleRequest:
+    table: str
+    dest_path: Path
+    filter_expr: str = ""
+    options: SamplingOptions = field(default_factory=SamplingOptions)
+
+
+@dataclass
+class SampleResult:
+    path: Path
+    from_cache: bool = False
+    files_scanned: Optional[int] = None
+    bytes_scanned: Optional[int] = None
+
+
+def get_spark():
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.getActiveSession() or SparkSession.builder.getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    logging.getLogger("py4j").setLevel(logging.ERROR)
+    logging.getLogger("org.apache.spark").setLevel(logging.ERROR)
+    try:
+        spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    except Exception:
+        pass
+    return spark
+
+
+def get_table_version(spark, table: str) -> Optional[str]:
+    """
+    Returns a cheap, metadata-only version marker for `table`: the latest
+    Delta version, else the last-modified time. None if neither is known,
+    in which case the sample is not cached.
+    """
+    try:
+        row = spark.sql(f"DESCRIBE HISTORY {table} LIMIT 1").select("version").first()
+        if row is not None:
+            return f"v{row[0]}"
+    except Exception:
+        pass
+    try:
+        row = spark.sql(f"DESCRIBE DETAIL {table}").select("lastModified").first()
+        if row is not None and row[0] is not None:
+            return f"t{row[0]}"
+    except Exception:
+        pass
+    return None
+
+
+def sample_cache_key(request: SampleRequest, version: str, sample_format: str, scope: str) -> str:
+    """`scope` names where the sample is read from, since sources share version labels."""
+    options = request.options
+    # A recent-window sample moves with the calendar even if the table does not
+    day = date.today().isoformat() if options.strategy == "recent" else None
+    payload = json.dumps(
+        [scope, request.table, request.filter_expr, astuple(options), version, sample_format, day],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def resolve_time_column(spark, table: str, df) -> str:
+    """
+    Picks the column to bound a recent-window sample on: a date/timestamp
+    partition column if there is one, else the first date/timestamp column.
+    """
+    types = {f.name: f.dataType.simpleString() for f in df.schema.fields}
+    partition_columns = []
+    try:
+        row = spark.sql(f"DESCRIBE DETAIL {table}").select("partitionColumns").first()
+        partition_columns = list(row[0] or []) if row is not None else []
+    except Exception:
+        pass
+
+    for name in partition_columns:
+        if types.get(name) in TIME_COLUMN_TYPES or name.lower() in TIME_COLUMN_NAMES:
+            return name
+    for name, type_name in types.items():
+        if type_name in TIME_COLUMN_TYPES:
+            return name
+    raise ValueError(f"no date/timestamp column found in {table}; pass --sample_time_column")
+
+
+def sample_base(options: SamplingOptions) -> str:
+    """
+    The strategy that selects the rows a sample is drawn from: the strategy
+    itself, or for stratified samples their `stratify_base` ("limit", meaning
+    the whole filtered table, when unset).
+    """
+    if options.strategy not in SAMPLE_STRATEGIES:
+        raise ValueError(f"unknown sampling strategy '{options.strategy}'")
+    if options.strategy != "stratified":
+        return options.strategy
+    if options.stratify_base is None:
+        return "limit"
+    if options.stratify_base not in STRATIFY_BASES:
+        raise ValueError(f"stratified samples can be based on {', '.join(STRATIFY_BASES)}, not '{options.stratify_base}'")
+    return options.stratify_base
+
+
+def build_sample_query(spark, request: SampleRequest):
+    """
+    Returns the DataFrame a capture collects, shaped by the sampling strategy.
+    A stratified sample ranks every row of its base, so without a `recent` or
+    `tablesample` base it scans the whole filtered table.
+    """
+    from pyspark.sql import functions as F
+    from pyspark.sql.types import MapType
+    from pyspark.sql.window import Window
+
+    options = request.options
+    base = sample_base(options)
+
+    if base == "tablesample":
+        df = spark.sql(f"SELECT * FROM {request.table} TABLESAMPLE ({float(options.percent)} PERCENT)")
+    else:
+        df = spark.table(request.table)
+
+    if base == "recent":
+        time_column = options.time_column or resolve_time_column(spark, request.table, df)
+        df = df.filter(F.col(time_column) >= F.date_sub(F.current_date(), int(options.window_days)))
+
+    if request.filter_expr:
+        df = df.filter(request.filter_expr)
+
+    if options.strategy == "stratified":
+        if not options.stratify_column:
+            raise ValueError("the stratified strategy needs --sample_stratify_column")
+        # Rank by a hash of the row, so the same table version always yields the same rows
+        hashable = [F.col(f"`{f.name}`") for f in df.schema.fields if not isinstance(f.dataType, MapType)]
+        window = Window.partitionBy(options.stratify_column).orderBy(F.xxhash64(*hashable) if hashable else F.lit(1))
+        row_number = "__dscc_sample_row"
+        return (
+            df.withColumn(row_number, F.row_number().over(window))
+            .filter(F.col(row_number) <= int(options.limit))
+            .drop(row_number)
+        )
+    return df.limit(int(options.limit))
+
+
+def _collect_arrow(df):
+    if hasattr(df, "toArrow"):
+        return df.toArrow()
+    import pyarrow as pa
+    return pa.Table.from_pandas(df.toPandas(), preserve_index=False)
+
+
+def scan_metrics(df) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Best-effort (files, bytes) read by the scans of an executed DataFrame,
+    taken from the SQL metrics of its physical plan via py4j. Returns
+    (None, None) when the plan or its metrics are not reachable.
+    """
+    try:
+        plan = df._jdf.queryExecution().executedPlan()
+    except Exception:
+        return None, None
+
+    files = size = None
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        try:
+            if node.getClass().getSimpleName() == "AdaptiveSparkPlanExec":
+                stack.append(node.executedPlan())
+                continue
+            metrics = node.metrics()
+            for names, kind in ((SCAN_FILE_METRICS, "files"), (SCAN_BYTES_METRICS, "bytes")):
+                for name in names:
+                    metric = metrics.get(name)
+                    if metric.isDefined():
+                        value = int(metric.get().value())
+                        if kind == "files":
+                            files = (files or 0) + value
+                        else:
+                            size = (size or 0) + value
+                        break
+            children = node.children()
+            stack.extend(children.apply(i) for i in range(children.size()))
+        except Exception:
+            continue
+    return files, size
+
+
+def _fetch_sample(spark, request: SampleRequest):
+    df = build_sample_query(spark, request)
+    table = _collect_arrow(df)
+    files, size = scan_metrics(df)
+    return table, files, size
+
+
+class SparkSampleSource:
+    """Samples live tables through the active (or a new) SparkSession."""
+
+    name = "spark"
+
+    def __init__(self):
+        self.spark = None
+
+    def start(self):
+        self.spark = get_spark()
+
+    def table_version(self, table: str) -> Optional[str]:
+        return get_table_version(self.spark, table)
+
+    def cache_scope(self, table: str) -> str:
+        return self.name
+
+    def fetch(self, request: SampleRequest):
+        return _fetch_sample(self.spark, request)
+
+
+def write_arrow_table(table, path: Path, sample_format: str):
+    """Writes an Arrow table as JSON Lines or Parquet via a temp file."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if sample_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path)
+    else:
+        with open(tmp_path, "w") as f:
+            for record in table.to_pylist():
+                f.write(json.dumps(record, default=str) + "\n")
+    os.replace(tmp_path, path)
+
+
+def capture_sample(source, request: SampleRequest, sample_format: str = "json", use_cache: bool = True) -> SampleResult:
+    """
+    Captures one sample into `request.dest_path`, reusing a cached capture
+    of the same table version when available.
+    """
+    cache_dir = get_cache_dir() / "samples"
+    dest_path = Path(request.dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    version = source.table_version(request.table) if use_cache else None
+    cached_path = None
+    if version is not None:
+        key = sample_cache_key(request, version, sample_format, source.cache_scope(request.table))
+        cached_path = cache_dir / key[:2] / f"{key}.{sample_format}"
+        if cached_path.exists():
+            shutil.copyfile(cached_path, dest_path)
+            return SampleResult(dest_path, from_cache=True)
+
+    table, files, size = source.fetch(request)
+    write_arrow_table(table, dest_path, sample_format)
+    if cached_path is not None:
+        cached_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cached_path.with_name(f".{cached_path.name}.{os.getpid()}.tmp")
+        shutil.copyfile(dest_path, tmp_path)
+        os.replace(tmp_path, cached_path)
+    return SampleResult(dest_path, files_scanned=files, bytes_scanned=size)
+
+
+def capture_samples(
+    requests: List[SampleRequest],
+    sample_format: str = "json",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    use_cache: bool = True,
+    source=None,
+) -> Dict[SampleRequest, Optional[Path]]:
+    """
+    Captures all requested samples concurrently from `source` (Spark by
+    default). Duplicate requests are captured once. Failed captures map to None.
+    """
+    unique = list(dict.fromkeys(requests))
+    results: Dict[SampleRequest, Optional[Path]] = {}
+    if not unique:
+        return results
+
+    source = source or SparkSampleSource()
+    try:
+        source.start()
+    except Exception as e:
+        print(f"⚠️ Could not start the {source.name} sample source: {e}")
+        return {request: None for request in unique}
+
+    def run(request):
+        try:
+            return capture_sample(source, request, sample_format, use_cache)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        for request, outcome in zip(unique, pool.map(run, unique)):
+            if isinstance(outcome, Exception):
+                print(f"⚠️ Could not fetch sample for {request.table}: {outcome}")
+                results[request] = None
+                continue
+            if outcome.from_cache:
+                detail = "from cache"
+            else:
+                detail = f"{request.options.strategy} sample of {request.table}"
+                if outcome.files_scanned is not None or outcome.bytes_scanned is not None:
+                    scanned = []
+                    if outcome.files_scanned is not None:
+                        scanned.append(f"{outcome.files_scanned} file(s)")
+                    if outcome.bytes_scanned is not None:
+                        scanned.append(format_bytes(outcome.bytes_scanned))
+                    detail += f", scanned {', '.join(scanned)}"
+            print(f"📁 Sample saved to {outcome.path} ({detail})")
+            results[request] = outcome.path
+    return results
@@ -34,6 +34,30 @@ def read_notebook_source_lines(notebook_path: Path) -> list[str]:
                     lines.append(f"# MAGIC {line}")
         return lines
 
+def get_cache_dir():
+    """Returns the dscc-tool cache directory, creating it if needed."""
+    # Detect Databricks
+    in_databricks = any(
+        os.environ.get(var) for var in ["DATABRICKS_RUNTIME_VERSION", "DATABRICKS_HOST"]
+    )
+    if in_databricks:
+        cache_dir = Path("/tmp/dscc-tool")
+    else:
+        cache_dir = Path(os.path.expanduser("~/.cache/dscc-tool"))
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except Exception:
+        # Fallback to /tmp if home is not writable
+        cache_dir = Path("/tmp/dscc-tool")
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
 def extract_dscc_metadata(file_path: str) -> dict:
     """
     Extracts the dscc: metadata block from the first markdown cell in a Databricks notebook (.py format).
@@ -0,0 +1,444 @@
+"""
+Offline sample source reading local Parquet / Delta snapshots of tables.
+
+Tables are mapped to local directories either by a YAML file
+(`catalog.schema.table: path/to/snapshot`) or by a snapshot root, where
+`a.b.c` resolves to `<root>/a.b.c` or `<root>/a/b/c`. Each directory is a
+Parquet dataset (optionally hive-partitioned) or a Delta table, whose active
+files are read from `_delta_log` without Spark.
+
+Filters are translated to pyarrow dataset expressions, so partitions and
+Parquet row groups that cannot match are pruned before any rows are read.
+Only simple predicates are supported: comparisons with literals, IN,
+IS [NOT] NULL, combined with AND / OR / NOT and parentheses.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import yaml
+
+from .sampling import SAMPLE_STRATEGIES, TIME_COLUMN_NAMES, sample_base
+
+COMPARISON_OPERATORS = ("=", "==", "!=", "<>", "<", "<=", ">", ">=")
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<string>'(?:[^'\\]|\\.|'')*')"
+    r"|(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+    r"|(?P<op><=|>=|<>|!=|==|=|<|>)"
+    r"|(?P<punct>[(),])"
+    r"|(?P<ident>`[^`]+`|[A-Za-z_][\w.]*)"
+    r")"
+)
+
+
+class FilterParseError(ValueError):
+    pass
+
+
+class UnsupportedDeltaTable(ValueError):
+    """The Delta table uses a feature the log replay cannot read correctly."""
+
+
+# --- Filter expressions ----------------------------------------------------------
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise FilterParseError(f"unsupported filter syntax near: {text[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1].replace("''", "'").replace("\\'", "'")
+        elif kind == "number":
+            value = float(value) if any(c in value for c in ".eE") else int(value)
+        elif kind == "ident" and value.startswith("`"):
+            value = value[1:-1]
+        tokens.append((kind, value))
+        pos = match.end()
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _coerce(value, field_type):
+    """Converts a filter literal to the column's type so the comparison is valid in Arrow."""
+    import pyarrow as pa
+
+    if value is None or field_type is None:
+        return value
+    if pa.types.is_timestamp(field_type) and isinstance(value, str):
+        return pa.scalar(datetime.fromisoformat(value), type=field_type)
+    if pa.types.is_date(field_type) and isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if (pa.types.is_integer(field_type) or pa.types.is_floating(field_type)) and isinstance(value, str):
+        return float(value) if "." in value else int(value)
+    if pa.types.is_string(field_type) and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+class _FilterParser:
+    def __init__(self, text, schema):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.schema = schema
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def keyword(self, *words):
+        kind, value = self.peek()
+        if kind == "ident" and value.upper() in words:
+            self.pos += 1
+            return value.upper()
+        return None
+
+    def expect(self, kind, value=None):
+        token = self.peek()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise FilterParseError(f"expected {value or kind}, got {token[1]!r}")
+        self.pos += 1
+        return token[1]
+
+    def parse(self):
+        expression = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise FilterParseError(f"unexpected {self.peek()[1]!r}")
+        return expression
+
+    def parse_or(self):
+        expression = self.parse_and()
+        while self.keyword("OR"):
+            expression = expression | self.parse_and()
+        return expression
+
+    def parse_and(self):
+        expression = self.parse_not()
+        while self.keyword("AND"):
+            expression = expression & self.parse_not()
+        return expression
+
+    def parse_not(self):
+        if self.keyword("NOT"):
+            return ~self.parse_not()
+        if self.peek() == ("punct", "("):
+            self.pos += 1
+            expression = self.parse_or()
+            self.expect("punct", ")")
+            return expression
+        return self.parse_predicate()
+
+    def literal(self, field_type):
+        kind, value = self.peek()
+        if kind in ("string", "number"):
+            self.pos += 1
+            return _coerce(value, field_type)
+        word = self.keyword("TRUE", "FALSE", "NULL")
+        if word:
+            return {"TRUE": True, "FALSE": False, "NULL": None}[word]
+        raise FilterParseError(f"expected a literal, got {value!r}")
+
+    @staticmethod
+    def isin(field, values, negate):
+        """
+        SQL `IN`: NULL when the column is NULL, or when nothing matched and the
+        list holds a NULL, so that `NOT IN` drops those rows as Spark does.
+        Arrow's isin returns false there, which negation would turn into true.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        null = pa.scalar(None, pa.bool_())
+        expression = pc.if_else(field.is_valid(), field.isin([v for v in values if v is not None]), null)
+        if None in values:
+            expression = pc.if_else(expression, True, null)
+        return ~expression if negate else expression
+
+    def parse_predicate(self):
+        import pyarrow.dataset as ds
+
+        name = self.expect("ident")
+        field = ds.field(*name.split(".")) if name not in self.schema.names else ds.field(name)
+        field_type = self.schema.field(name).type if name in self.schema.names else None
+
+        if self.keyword("IS"):
+            negate = self.keyword("NOT")
+            if not self.keyword("NULL"):
+                raise FilterParseError("only IS [NOT] NULL is supported")
+            return field.is_valid() if negate else field.is_null()
+
+        negate = self.keyword("NOT")
+        if self.keyword("IN"):
+            self.expect("punct", "(")
+            values = [self.literal(field_type)]
+            while self.peek() == ("punct", ","):
+                self.pos += 1
+                values.append(self.literal(field_type))
+            self.expect("punct", ")")
+            return self.isin(field, values, negate)
+        if negate:
+            raise FilterParseError("NOT must be followed by IN here")
+
+        operator = self.expect("op")
+        value = self.literal(field_type)
+        if operator in ("=", "=="):
+            return field == value
+        if operator in ("!=", "<>"):
+            return field != value
+        return {"<": field < value, "<=": field <= value, ">": field > value, ">=": field >= value}[operator]
+
+
+def parse_filter(text: str, schema):
+    """Translates a simple SQL filter into a pyarrow dataset expression."""
+    return _FilterParser(text, schema).parse()
+
+
+# --- Snapshot resolution --------------------------------------------------------
+
+
+def is_delta_table(path: Path) -> bool:
+    return (Path(path) / "_delta_log").is_dir()
+
+
+def _check_delta_add(table_path: Path, add: dict):
+    if add.get("deletionVector"):
+        raise UnsupportedDeltaTable(
+            f"{table_path}: {add['path']} has a deletion vector; reading it as plain Parquet would "
+            "return deleted rows. Purge the deletion vectors (REORG TABLE ... APPLY (PURGE)) or sample with Spark."
+        )
+
+
+def _check_delta_metadata(table_path: Path, metadata: dict):
+    configuration = metadata.get("configuration") or {}
+    # Checkpoints store the configuration as a Parquet map, which reads back as key/value pairs
+    mode = dict(configuration).get("delta.columnMapping.mode", "none")
+    if mode != "none":
+        raise UnsupportedDeltaTable(
+            f"{table_path}: delta.columnMapping.mode is '{mode}'; the Parquet files use physical column "
+            "names that the log replay does not map back. Sample this table with Spark."
+        )
+
+
+def delta_active_files(path: Path) -> Tuple[int, List[Path]]:
+    """
+    Replays a Delta table's `_delta_log` (last checkpoint + later commits) and
+    returns (version, active data files). Raises UnsupportedDeltaTable for
+    deletion vectors and column mapping, which plain Parquet reads get wrong.
+    """
+    import pyarrow.parquet as pq
+
+    log_dir = Path(path) / "_delta_log"
+    active = {}
+    metadata = {}
+    version = -1
+    last_checkpoint = log_dir / "_last_checkpoint"
+    if last_checkpoint.exists():
+        with open(last_checkpoint) as f:
+            checkpoint = json.load(f)
+        version = int(checkpoint["version"])
+        parts = checkpoint.get("parts")
+        if parts:
+            names = [f"{version:020d}.checkpoint.{i:010d}.{parts:010d}.parquet" for i in range(1, parts + 1)]
+        else:
+            names = [f"{version:020d}.checkpoint.parquet"]
+        for name in names:
+            schema_names = pq.read_schema(log_dir / name).names
+            columns = [c for c in ("add", "metaData") if c in schema_names]
+            table = pq.read_table(log_dir / name, columns=columns)
+            for row in table.column("add").to_pylist() if "add" in columns else []:
+                if row and row.get("path"):
+                    active[row["path"]] = row
+            for row in table.column("metaData").to_pylist() if "metaData" in columns else []:
+                if row:
+                    metadata = row
+
+    commits = sorted(
+        (int(p.stem), p) for p in log_dir.glob("*.json") if p.stem.isdigit() and int(p.stem) > version
+    )
+    for commit_version, commit in commits:
+        with open(commit) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                action = json.loads(line)
+                if "add" in action:
+                    active[action["add"]["path"]] = action["add"]
+                elif "remove" in action:
+                    active.pop(action["remove"]["path"], None)
+                elif "metaData" in action:
+                    metadata = action["metaData"]
+        version = commit_version
+    _check_delta_metadata(path, metadata)
+    for add in active.values():
+        _check_delta_add(path, add)
+    return version, [Path(path) / unquote(p) for p in active]
+
+
+class LocalSnapshotSource:
+    """
+    Sample source backed by local Parquet / Delta snapshots, read with
+    pyarrow.dataset. No Spark session or JVM is started.
+    """
+
+    name = "local"
+
+    def __init__(self, tables: Optional[Dict[str, str]] = None, root: Optional[str] = None):
+        self.tables = {k: Path(v) for k, v in (tables or {}).items()}
+        self.root = Path(root) if root else None
+
+    @classmethod
+    def from_path(cls, path):
+        """A YAML mapping file (table: directory) or a snapshot root directory."""
+        path = Path(path)
+        if path.is_file():
+            with open(path) as f:
+                mapping = yaml.safe_load(f) or {}
+            base = path.parent
+            return cls(tables={table: base / location for table, location in mapping.items()})
+        return cls(root=path)
+
+    def start(self):
+        import pyarrow.dataset  # noqa: F401 - fail early when pyarrow is missing
+
+    def resolve(self, table: str) -> Path:
+        candidates = []
+        if table in self.tables:
+            candidates.append(self.tables[table])
+        if self.root is not None:
+            candidates += [self.root / table, self.root.joinpath(*table.split("."))]
+        for candidate in candidates:
+            if candidate.is_dir() or candidate.is_file():
+                return candidate
+        raise FileNotFoundError(f"no local snapshot for {table}")
+
+    def open_dataset(self, table: str):
+        import pyarrow.dataset as ds
+
+        path = self.resolve(table)
+        if is_delta_table(path):
+            _, files = delta_active_files(path)
+            return ds.dataset(
+                [str(f) for f in files], format="parquet",
+                partitioning=ds.partitioning(flavor="hive"), partition_base_dir=str(path),
+            )
+        return ds.dataset(str(path), format="parquet", partitioning="hive")
+
+    def table_version(self, table: str) -> Optional[str]:
+        """The Delta version, else a digest of the snapshot's file names, sizes and mtimes."""
+        try:
+            path = self.resolve(table)
+        except FileNotFoundError:
+            return None
+        if is_delta_table(path):
+            return f"v{delta_active_files(path)[0]}"
+        digest = hashlib.sha256()
+        files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+        for f in files:
+            stat = f.stat()
+            digest.update(f"{f.relative_to(path.parent)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return f"s{digest.hexdigest()[:16]}"
+
+    def cache_scope(self, table: str) -> str:
+        """The snapshot's location, so captures never mix with live Spark or other snapshots."""
+        return f"{self.name}:{self.resolve(table).resolve()}"
+
+    def _time_column(self, dataset, options):
+        import pyarrow as pa
+
+        if options.time_column:
+            return options.time_column
+        partition_names = set(dataset.partitioning.schema.names) if getattr(dataset, "partitioning", None) else set()
+        fields = list(dataset.schema)
+        for field in fields:
+            if field.name in partition_names and (pa.types.is_timestamp(field.type) or pa.types.is_date(field.type) or field.name.lower() in TIME_COLUMN_NAMES):
+                return field.name
+        for field in fields:
+            if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+                return field.name
+        raise ValueError("no date/timestamp column found; pass --sample_time_column")
+
+    def _recent_filter(self, dataset, options):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        name = self._time_column(dataset, options)
+        field_type = dataset.schema.field(name).type
+        cutoff = date.today() - timedelta(days=int(options.window_days))
+        if pa.types.is_timestamp(field_type):
+            value = pa.scalar(datetime.combine(cutoff, datetime.min.time()), type=field_type)
+        elif pa.types.is_date(field_type):
+            value = cutoff
+        else:
+            value = cutoff.isoformat()
+        return ds.field(name) >= value
+
+    def fetch(self, request):
+        """Returns (arrow table, files scanned, bytes scanned) for a SampleRequest."""
+        import pyarrow as pa
+
+        options = request.options
+        if options.strategy not in SAMPLE_STRATEGIES:
+            raise ValueError(f"unknown sampling strategy '{options.strategy}'")
+        dataset = self.open_dataset(request.table)
+
+        expression = parse_filter(request.filter_expr, dataset.schema) if request.filter_expr else None
+        base = sample_base(options)
+        if base == "recent":
+            recent = self._recent_filter(dataset, options)
+            expression = recent if expression is None else expression & recent
+
+        # Partition pruning happens here; row-group statistics prune during the scan
+        fragments = list(dataset.get_fragments(filter=expression)) if expression is not None else list(dataset.get_fragments())
+        files = len(fragments)
+        size = sum(os.path.getsize(f.path) for f in fragments if getattr(f, "path", None))
+
+        limit = int(options.limit)
+        if options.strategy in ("limit", "recent"):
+            return dataset.head(limit, filter=expression), files, size
+
+        batches = dataset.to_batches(filter=expression)
+        if base == "tablesample":
+            # Seeded, so captures of the same snapshot are identical
+            rng = random.Random(0)
+            batches = (
+                batch.filter(pa.array([rng.random() * 100 < float(options.percent) for _ in range(batch.num_rows)]))
+                for batch in batches
+            )
+        if options.strategy == "tablesample":
+            kept, rows = [], 0
+            for batch in batches:
+                kept.append(batch)
+                rows += batch.num_rows
+                if rows >= limit:
+                    break
+            table = pa.Table.from_batches(kept, schema=dataset.schema) if kept else dataset.schema.empty_table()
+            return table.slice(0, limit), files, size
+
+        if not options.stratify_column:
+            raise ValueError("the stratified strategy needs --sample_stratify_column")
+        counts, kept = {}, []
+        for batch in batches:
+            values = batch.column(options.stratify_column).to_pylist()
+            indices = []
+            for i, value in enumerate(values):
+                if counts.get(value, 0) < limit:
+                    counts[value] = counts.get(value, 0) + 1
+                    indices.append(i)
+            if indices:
+                kept.append(batch.take(pa.array(indices)))
+        table = pa.Table.from_batches(kept, schema=dataset.schema) if kept else dataset.schema.empty_table()
+        return table, files, size
@@ -1,7 +1,12 @@
-from pathlib import Path
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath, PurePosixPath
+from typing import Dict, List
+import os
 import shutil
 import yaml
 from dscc_packaging.models import AppMetadata
+from dscc_packaging.dbc import is_dbc, list_dbc_paths
+from dscc_packaging.ignore import SYSTEM_FILE_PATTERNS, default_matcher
 from pydantic import ValidationError
 
 def build_template_from_model(model_cls):
@@ -53,37 +58,139 @@ def build_template_from_model(model_cls):
 
 def load_template_structure(template_dir: Path):
     structure = {}
-    for path in template_dir.rglob("*"):
-        rel = path.relative_to(template_dir)
-        if path.is_dir():
-            structure[str(rel)] = 'dir'
-        else:
-            structure[str(rel)] = 'file'
+    # System files in the template (e.g. a stray __pycache__) are not part of it
+    for root, dirs, files in default_matcher().walk(template_dir):
+        rel = root.relative_to(template_dir)
+        structure.update({str(rel / d): 'dir' for d in dirs})
+        structure.update({str(rel / f): 'file' for f in files})
     return structure
 
+NOTEBOOK_SUFFIXES = (".py", ".ipynb")
+
+
+class TemplateNode:
+    """A node of the template's path-component trie."""
+
+    def __init__(self, kind="dir"):
+        self.kind = kind
+        self.children: Dict[str, "TemplateNode"] = {}
+
+
+@dataclass
+class StructureReport:
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    misplaced: List[Path] = field(default_factory=list)
+    junk: List[Path] = field(default_factory=list)
+
+
+def build_template_trie(template_structure: dict) -> TemplateNode:
+    """Builds the trie of template paths (as returned by load_template_structure)."""
+    root = TemplateNode()
+    for rel, kind in sorted(template_structure.items()):
+        parts = PurePath(rel).parts
+        if not parts:
+            continue
+        node = root
+        for part in parts[:-1]:
+            node = node.children.setdefault(part, TemplateNode())
+        node.children.setdefault(parts[-1], TemplateNode(kind)).kind = kind
+    return root
+
+
+def list_app_paths(app_dir: Path) -> list:
+    """Relative paths under an app directory, or inside an exported .dbc archive."""
+    if is_dbc(app_dir):
+        return list_dbc_paths(app_dir)
+    return [str(p.relative_to(app_dir)) for p in app_dir.rglob("*")]
+
+
+def _directory_lister(app_dir: Path):
+    """Returns a function listing (name, is_dir) entries of an app-relative directory."""
+    if is_dbc(app_dir):
+        tree = {}
+        for rel in list_dbc_paths(app_dir):
+            node = tree
+            for part in PurePosixPath(rel).parts:
+                node = node.setdefault(part, {})
+
+        def list_dbc_dir(rel):
+            node = tree
+            for part in rel.parts:
+                node = node[part]
+            return sorted((name, bool(children)) for name, children in node.items())
+        return list_dbc_dir
+
+    def list_dir(rel):
+        with os.scandir(app_dir / rel) as entries:
+            return sorted((entry.name, entry.is_dir(follow_symlinks=False)) for entry in entries)
+    return list_dir
+
+
+def scan_app_structure(app_dir: Path, template_structure: dict) -> StructureReport:
+    """
+    Compares app_dir (a directory or a .dbc archive) to the template in one
+    walk. Template directories are allowed containers: anything inside them
+    is accepted, so only their template subdirectories are descended into
+    and the rest of their content (sample data, tests, ...) is never listed.
+
+        missing    template files outside containers that the app lacks
+        extra      app paths outside containers that the template does not
+                   have (an extra directory is reported once, not per file)
+        misplaced  notebooks outside containers
+        junk       system files and folders found by the walk (ignored
+                   folders are reported, not descended into)
+    """
+    trie = build_template_trie(template_structure)
+    list_dir = _directory_lister(app_dir)
+    matcher = default_matcher()
+    report = StructureReport()
+    present = set()
+
+    # (relative dir, trie node or None outside the template, inside a container)
+    stack = [(PurePosixPath(), trie, False)]
+    while stack:
+        rel, node, in_container = stack.pop()
+        for name, is_dir in list_dir(rel):
+            child_rel = rel / name
+            if matcher.match(child_rel.as_posix(), is_dir):
+                report.junk.append(app_dir / child_rel)
+                continue
+            if in_container:
+                child = node.children.get(name)
+                if is_dir and child is not None and child.kind == "dir":
+                    stack.append((child_rel, child, True))
+                continue
+            if node is not None:
+                child = node.children.get(name)
+                if child is not None and (child.kind == "dir") == is_dir:
+                    present.add(child_rel.as_posix())
+                    if is_dir:
+                        stack.append((child_rel, child, True))
+                    continue
+                report.extra.append(child_rel.as_posix())
+            if is_dir:
+                stack.append((child_rel, None, False))
+            elif name.endswith(NOTEBOOK_SUFFIXES):
+                report.misplaced.append(app_dir / child_rel)
+
+    report.missing = sorted(
+        name for name, child in trie.children.items() if child.kind == "file" and name not in present
+    )
+    report.extra.sort()
+    report.misplaced.sort()
+    report.junk.sort()
+    return report
+
+
 def validate_structure(app_dir: Path, template_structure: dict):
     """
-    Compare app_dir to template_structure.
+    Compare app_dir (a directory or a .dbc archive) to template_structure.
     Any directory present in template_app is an allowed container (arbitrary content allowed).
     Returns (missing, extra) as lists of relative paths.
     """
-    # All directories in the template are allowed containers
-    allowed_dirs = set(k for k, v in template_structure.items() if v == 'dir')
-
-    app_paths = set()
-    for p in app_dir.rglob("*"):
-        rel = str(p.relative_to(app_dir))
-        # If in an allowed dir (or is the allowed dir itself), skip
-        if any(rel == ad or rel.startswith(ad + "/") for ad in allowed_dirs):
-            continue
-        app_paths.add(rel)
-
-    # Only require the structure and key files, not the contents of allowed dirs
-    missing = [k for k, v in template_structure.items()
-               if k not in app_paths and not any(k == ad or k.startswith(ad + "/") for ad in allowed_dirs)]
-    extra = [k for k in app_paths
-             if k not in template_structure and not any(k == ad or k.startswith(ad + "/") for ad in allowed_dirs)]
-    return missing, extra
+    report = scan_app_structure(app_dir, template_structure)
+    return report.missing, report.extra
 
 def auto_fix_structure(app_dir: Path, template_dir: Path, missing: list):
     for rel_path in missing:
@@ -98,11 +205,8 @@ def auto_fix_structure(app_dir: Path, template_dir: Path, missing: list):
             print(f"🛠️  Created missing file: {dst}")
 
 def find_misplaced_notebooks(app_dir: Path, valid_dirs: list):
-    misplaced = []
-    for nb in app_dir.rglob("*.py"):
-        if not any(str(nb.parent).endswith(vd) for vd in valid_dirs):
-            misplaced.append(nb)
-    return misplaced
+    """Notebooks outside the given container directories (see scan_app_structure)."""
+    return scan_app_structure(app_dir, {d: "dir" for d in valid_dirs}).misplaced
 
 def prompt_user_for_placement(notebook_path: Path, valid_dirs: list):
     print(f"❓ Notebook {notebook_path} is not in a recognized folder.")
@@ -185,27 +289,12 @@ def validate_and_fill_metadata(meta_path: Path, metadata_model, noninteractive=F
         return False
 
 def get_system_files_to_ignore() -> list[str]:
-    """Returns a list of system files that should be ignored during packaging."""
-    return [
-        ".DS_Store",  # macOS Finder metadata
-        "Thumbs.db",  # Windows thumbnail cache
-        ".git",       # Git directory
-        "__pycache__", # Python bytecode cache
-        "*.pyc",      # Python compiled files
-        "*.pyo",      # Python optimized files
-        "*.pyd",      # Python DLL files
-        ".ipynb_checkpoints", # Jupyter checkpoints
-    ]
+    """Returns the gitignore-style patterns of system files that are never packaged (see ignore.py)."""
+    return list(SYSTEM_FILE_PATTERNS)
 
 def should_ignore_file(file_path: Path) -> bool:
     """Check if a file should be ignored during packaging."""
-    ignore_patterns = get_system_files_to_ignore()
-    return any(
-        file_path.name == pattern or 
-        file_path.name.endswith(pattern.lstrip("*")) or
-        file_path.name.startswith(pattern.rstrip("*"))
-        for pattern in ignore_patterns
-    )
+    return default_matcher().match(file_path.name, is_dir=file_path.is_dir())
 
 def validate_and_fix_app_structure(
     app_dir: Path,
@@ -215,17 +304,22 @@ def validate_and_fix_app_structure(
     noninteractive=False,
     app_name=None
 ):
+    template_structure = load_template_structure(template_dir)
+    report = scan_app_structure(app_dir, template_structure)
+
     # First, clean up system files
-    for file_path in app_dir.rglob("*"):
-        if file_path.is_file() and should_ignore_file(file_path):
+    if not is_dbc(app_dir):
+        for path in report.junk:
             try:
-                file_path.unlink()
-                print(f"🧹 Removed system file: {file_path}")
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+                print(f"🧹 Removed system file: {path}")
             except Exception as e:
-                print(f"⚠️  Could not remove {file_path}: {e}")
+                print(f"⚠️  Could not remove {path}: {e}")
 
-    template_structure = load_template_structure(template_dir)
-    missing, extra = validate_structure(app_dir, template_structure)
+    missing, extra = report.missing, report.extra
     if not missing and not extra:
         print("✅ App structure matches template.")
     else:
@@ -241,8 +335,7 @@ def validate_and_fix_app_structure(
             return False
 
     valid_dirs = [d for d in template_structure if template_structure[d] == 'dir']
-    misplaced = find_misplaced_notebooks(app_dir, valid_dirs)
-    for nb in misplaced:
+    for nb in report.misplaced:
         if noninteractive:
             print(f"⚠️  Misplaced notebook: {nb} (please move manually)")
         else:
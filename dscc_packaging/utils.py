@@ -3,7 +3,7 @@ from dscc_tool.logger import logging
 from pathlib import Path
 from .preset_engine import PresetEngine
 from .shared_utils import read_notebook_source_lines, extract_dscc_metadata, clean_for_yaml
-from .notebook_io import write_metadata_block
+from .notebook_io import parse_notebook, write_metadata_block
 
 logger = logging.getLogger(__name__)
 
@@ -40,12 +40,21 @@ def write_metadata_block_ipynb(notebook_path: Path, dscc_meta: dict, test_cases:
     print(f"✅ Injected YAML metadata block into {notebook_path.name}")
 """
 
-def generate_dscc_metadata(notebook_path, overwrite=False, source_lines=None):
-    has_block = any("# MAGIC dscc:" in line for line in source_lines) if source_lines else False
+def generate_dscc_metadata(notebook_path, overwrite=False, source_lines=None, parsed=None, noninteractive=False):
+    """
+    Builds dscc: metadata for a notebook without a block (or with `overwrite`).
+    Prompts for each field, or uses the preset defaults with `noninteractive`.
+    """
+    if parsed is not None:
+        has_block = parsed.dscc_block is not None
+    else:
+        has_block = any("# MAGIC dscc:" in line for line in source_lines) if source_lines else False
     if overwrite or not has_block:
         try:
-            preset = PresetEngine.from_path(notebook_path).prompt_user()
-            return preset.to_yaml_dict()
+            preset = PresetEngine.from_path(notebook_path)
+            if noninteractive:
+                return clean_for_yaml(preset.to_yaml_dict())
+            return preset.prompt_user().to_yaml_dict()
         except ValueError as e:
             print(str(e))
     return {}
@@ -141,13 +150,14 @@ def extract_dscc_metadata(file_path: str) -> dict:
 def is_notebook_file(filename: str) -> bool:
     return filename.endswith((".py", ".dbc", ".ipynb"))
 
-def inject_all_defaults(notebook_path: Path, overwrite=False):
+def inject_all_defaults(notebook_path: Path, overwrite=False, stats=None, validate=False):
 
     #with open(notebook_path) as f:
     #    source_lines = f.readlines()
-    source_lines = read_notebook_source_lines(notebook_path)
+    parsed = parse_notebook(notebook_path)
+    source_lines = parsed.lines
 
-    if any("# MAGIC dscc:" in line for line in source_lines) and not overwrite:
+    if parsed.dscc_block is not None and not overwrite:
         print(f"⏭️ Skipping {notebook_path.name} (already annotated)")
         return
 
@@ -161,8 +171,13 @@ def inject_all_defaults(notebook_path: Path, overwrite=False):
         cleaned_dscc_meta = clean_for_yaml(dscc_meta)
         #print("[DEBUG] cleaned_dscc_meta to be written:")
         #pprint.pprint(cleaned_dscc_meta)
-        write_metadata_block(notebook_path, cleaned_dscc_meta, test_cases=[], source_lines=source_lines, overwrite=overwrite)
-        print(f"✅ Injected default YAML into {notebook_path.name}")
+        written = write_metadata_block(notebook_path, cleaned_dscc_meta, test_cases=[], source_lines=source_lines, overwrite=overwrite, parsed=parsed, validate=validate)
+        if stats is not None:
+            stats["written" if written else "unchanged"] += 1
+        if written:
+            print(f"✅ Injected default YAML into {notebook_path.name}")
+        else:
+            print(f"⏭️ {notebook_path.name} already has this YAML; left untouched")
     except Exception as e:
         print(f"❌ Failed to inject into {notebook_path.name}: {e}")
         import traceback
@@ -0,0 +1,333 @@
+"""
+Incremental export of a Databricks workspace directory.
+
+`sync_workspace` lists the workspace tree (directories are listed
+concurrently), compares each object's modification time with the state
+recorded by the previous sync, and downloads only new and modified objects
+on a thread pool. Objects that disappeared from the workspace are removed
+locally, but only if an earlier sync wrote them, so files generated during
+packaging (manifest.yaml, tests, samples) are never touched.
+
+Notebooks are exported in SOURCE format with an extension for their
+language, matching `databricks workspace export_dir`; workspace files keep
+their names.
+
+The sync state lives in the cache directory, keyed by the workspace and the
+local folder, so it is never packaged with the app:
+
+    <cache>/workspace_sync/<key>.json
+    {"source": "https://adb-123.azuredatabricks.net:/Users/me/my_app",
+     "objects": {"base/detections/brute_force.py": {"modified_at": 1718000000000, "size": 5120}}}
+
+The workspace is reached through a `WorkspaceClient`. `RestWorkspaceClient`
+talks to the Workspace API over one pooled HTTP session; `LocalWorkspaceClient`
+serves a local folder in its place.
+"""
+import configparser
+import hashlib
+import json
+import os
+import posixpath
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .shared_utils import get_cache_dir
+
+DEFAULT_SYNC_WORKERS = 8
+STATE_VERSION = 1
+CHUNK_SIZE = 1 << 20
+
+NOTEBOOK_EXTENSIONS = {
+    "PYTHON": ".py",
+    "SQL": ".sql",
+    "SCALA": ".scala",
+    "R": ".r",
+}
+# Object types whose children are listed; LIBRARY, DASHBOARD etc. are not exported
+CONTAINER_TYPES = {"DIRECTORY", "REPO"}
+EXPORTED_TYPES = {"NOTEBOOK", "FILE"}
+
+
+@dataclass
+class WorkspaceObject:
+    path: str
+    object_type: str
+    language: Optional[str] = None
+    modified_at: Optional[int] = None  # milliseconds since the epoch
+    size: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return posixpath.basename(self.path.rstrip("/"))
+
+    @property
+    def local_name(self) -> str:
+        """File name of the exported object (notebooks get their language's extension)."""
+        if self.object_type == "NOTEBOOK":
+            return self.name + NOTEBOOK_EXTENSIONS.get(self.language or "", "")
+        return self.name
+
+
+class WorkspaceClient:
+    """
+    Lists and downloads workspace objects. `download` may be called from
+    several threads at once.
+    """
+
+    # Identifies the workspace in the sync state key
+    source = "workspace"
+
+    def list(self, path: str) -> List[WorkspaceObject]:
+        raise NotImplementedError
+
+    def download(self, obj: WorkspaceObject, stream) -> int:
+        """Writes the exported object to a binary stream; returns the number of bytes written."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RestWorkspaceClient(WorkspaceClient):
+    """Workspace API client sharing one connection pool across download threads."""
+
+    def __init__(self, host: str, token: str, max_connections: int = DEFAULT_SYNC_WORKERS, timeout: float = 60):
+        self.host = host.rstrip("/")
+        if not self.host.startswith(("http://", "https://")):
+            self.host = f"https://{self.host}"
+        self.source = self.host
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_environment(cls, profile: Optional[str] = None, **kwargs) -> Optional["RestWorkspaceClient"]:
+        """
+        Reads credentials from DATABRICKS_HOST/DATABRICKS_TOKEN, or else from a
+        profile in ~/.databrickscfg (as written by `databricks configure`).
+        Returns None if neither is set up.
+        """
+        host = os.environ.get("DATABRICKS_HOST")
+        token = os.environ.get("DATABRICKS_TOKEN")
+        if not (host and token):
+            config_path = Path(os.environ.get("DATABRICKS_CONFIG_FILE", "~/.databrickscfg")).expanduser()
+            profile = profile or os.environ.get("DATABRICKS_CONFIG_PROFILE", "DEFAULT")
+            config = configparser.ConfigParser()
+            try:
+                config.read(config_path)
+            except configparser.Error:
+                return None
+            section = config[profile] if config.has_section(profile) or profile == "DEFAULT" else {}
+            host, token = section.get("host"), section.get("token")
+        if not (host and token):
+            return None
+        return cls(host, token, **kwargs)
+
+    def list(self, path):
+        response = self.session.get(f"{self.host}/api/2.0/workspace/list", params={"path": path}, timeout=self.timeout)
+        response.raise_for_status()
+        return [
+            WorkspaceObject(
+                path=entry["path"],
+                object_type=entry.get("object_type", ""),
+                language=entry.get("language"),
+                modified_at=entry.get("modified_at"),
+                size=entry.get("size"),
+            )
+            for entry in response.json().get("objects", [])
+        ]
+
+    def download(self, obj, stream):
+        params = {
+            "path": obj.path,
+            "format": "SOURCE" if obj.object_type == "NOTEBOOK" else "AUTO",
+            "direct_download": "true",
+        }
+        written = 0
+        with self.session.get(f"{self.host}/api/2.0/workspace/export", params=params, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                stream.write(chunk)
+                written += len(chunk)
+        return written
+
+    def close(self):
+        self.session.close()
+
+
+class LocalWorkspaceClient(WorkspaceClient):
+    """Serves a local folder as the workspace; workspace paths are relative to `root`."""
+
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self.source = f"file://{self.root}"
+
+    def _local(self, path: str) -> Path:
+        return self.root.joinpath(*[part for part in path.split("/") if part])
+
+    def list(self, path):
+        objects = []
+        with os.scandir(self._local(path)) as entries:
+            for entry in entries:
+                info = entry.stat()
+                objects.append(WorkspaceObject(
+                    path=posixpath.join(path, entry.name),
+                    object_type="DIRECTORY" if entry.is_dir() else "FILE",
+                    modified_at=info.st_mtime_ns // 1_000_000,
+                    size=None if entry.is_dir() else info.st_size,
+                ))
+        return objects
+
+    def download(self, obj, stream):
+        written = 0
+        with open(self._local(obj.path), "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                stream.write(chunk)
+                written += len(chunk)
+        return written
+
+
+@dataclass
+class SyncResult:
+    downloaded: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def list_workspace_tree(client: WorkspaceClient, workspace_path: str, pool: ThreadPoolExecutor) -> Dict[str, WorkspaceObject]:
+    """
+    Lists every exportable object under `workspace_path`, one request per
+    directory, with sibling directories listed concurrently. Returns the
+    objects keyed by their local path relative to the export folder.
+    """
+    found = {}
+    pending = {pool.submit(client.list, workspace_path): ""}
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            prefix = pending.pop(future)
+            for obj in future.result():
+                rel = f"{prefix}{obj.local_name}"
+                if obj.object_type in CONTAINER_TYPES:
+                    pending[pool.submit(client.list, obj.path)] = f"{rel}/"
+                elif obj.object_type in EXPORTED_TYPES:
+                    found[rel] = obj
+    return found
+
+
+def sync_state_path(client: WorkspaceClient, workspace_path: str, local_dir) -> Path:
+    key = hashlib.sha256(f"{client.source}\0{workspace_path}\0{Path(local_dir).resolve()}".encode("utf-8")).hexdigest()
+    return get_cache_dir() / "workspace_sync" / f"{key[:32]}.json"
+
+
+def load_sync_state(path: Path) -> Dict[str, dict]:
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return {}
+    return state.get("objects") or {}
+
+
+def save_sync_state(path: Path, source: str, objects: Dict[str, dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": STATE_VERSION, "source": source, "objects": objects}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _download(client: WorkspaceClient, obj: WorkspaceObject, target: Path) -> int:
+    """Downloads to a temp file next to `target` and renames it into place."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{id(obj)}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            written = client.download(obj, f)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return written
+
+
+def _remove(local_dir: Path, rel: str) -> bool:
+    path = local_dir / rel
+    if not path.is_file():
+        return False
+    path.unlink()
+    # Drop directories the removal left empty
+    parent = path.parent
+    while parent != local_dir and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+    return True
+
+
+def sync_workspace(client: WorkspaceClient, workspace_path: str, local_dir, max_workers: Optional[int] = None, force: bool = False) -> SyncResult:
+    """
+    Brings `local_dir` up to date with `workspace_path`. An object is
+    downloaded if it is new, its modification time differs from the last
+    sync, or its local copy is gone (`force` downloads everything, but still
+    uses the previous state to remove objects deleted from the workspace). Failed
+    downloads are left out of the saved state, so the next sync retries them.
+    Listing errors propagate.
+    """
+    local_dir = Path(local_dir).resolve()
+    local_dir.mkdir(parents=True, exist_ok=True)
+    workspace_path = workspace_path.rstrip("/") or "/"
+    state_path = sync_state_path(client, workspace_path, local_dir)
+    previous = load_sync_state(state_path)
+    result = SyncResult()
+
+    with ThreadPoolExecutor(max_workers=max_workers or DEFAULT_SYNC_WORKERS) as pool:
+        remote = list_workspace_tree(client, workspace_path, pool)
+        state = {}
+        to_fetch: List[Tuple[str, WorkspaceObject]] = []
+        for rel in sorted(remote):
+            obj = remote[rel]
+            known = previous.get(rel)
+            if not force and known and known.get("modified_at") == obj.modified_at and obj.modified_at is not None and (local_dir / rel).is_file():
+                result.unchanged.append(rel)
+                state[rel] = known
+            else:
+                to_fetch.append((rel, obj))
+
+        futures = {pool.submit(_download, client, obj, local_dir / rel): (rel, obj) for rel, obj in to_fetch}
+        for future in futures:
+            rel, obj = futures[future]
+            try:
+                result.bytes += future.result()
+            except (requests.RequestException, OSError) as e:
+                result.failed[rel] = str(e)
+                # Keep the previous entry so a file the workspace still has is not treated as removed
+                if rel in previous:
+                    state[rel] = previous[rel]
+                continue
+            result.downloaded.append(rel)
+            state[rel] = {"path": obj.path, "modified_at": obj.modified_at, "size": obj.size}
+
+    for rel in sorted(set(previous) - set(remote)):
+        if _remove(local_dir, rel):
+            result.removed.append(rel)
+
+    save_sync_state(state_path, f"{client.source}:{workspace_path}", state)
+    return result
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import pathlib
+import platform
+import re
+import time
+from functools import lru_cache
+
+from dscc_packaging.shared_utils import get_cache_dir
+from dscc_packaging.notebook_io import read_notebook_source_lines
+
+RUN_MAGIC_PATTERN = re.compile(r"^\s*(?:#\s*MAGIC\s+)?%run\s+(\S+)")
+MOCK_EXTENSIONS = (".parquet", ".csv", ".json")
+
+
+def get_package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+def get_tool_version():
+    return get_package_version("dscc-tool")
+
+
+@lru_cache(maxsize=1)
+def get_tester_digest():
+    """
+    Hashes the source of dscc_tester (harness, comparison, lite engine, test
+    generation), so changing how verdicts are reached invalidates cached
+    passes without a version bump.
+    """
+    digest = hashlib.sha256()
+    root = pathlib.Path(__file__).parent
+    for path in sorted(root.glob("*.py")):
+        digest.update(path.name.encode() + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def get_spark_version():
+    try:
+        import pyspark
+        return pyspark.__version__
+    except ImportError:
+        return "none"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def resolve_run_target(notebook_path, target):
+    """
+    Resolves a `%run` target relative to the notebook that references it.
+    Databricks omits the extension, so both .py and .ipynb are tried.
+    """
+    candidate = (pathlib.Path(notebook_path).parent / target).resolve()
+    for path in (candidate, candidate.with_suffix(".py"), candidate.with_suffix(".ipynb")):
+        if path.is_file():
+            return path
+    return None
+
+
+def resolve_run_dependencies(notebook_path):
+    """
+    Returns every notebook reachable from `notebook_path` through `%run` magics,
+    following nested `%run` chains in lib/ modules.
+    """
+    seen = set()
+    stack = [pathlib.Path(notebook_path).resolve()]
+    dependencies = []
+    while stack:
+        current = stack.pop()
+        for line in read_notebook_source_lines(current):
+            match = RUN_MAGIC_PATTERN.match(line)
+            if not match:
+                continue
+            target = resolve_run_target(current, match.group(1))
+            if target is None or target in seen:
+                continue
+            seen.add(target)
+            dependencies.append(target)
+            stack.append(target)
+    return sorted(dependencies)
+
+
+def find_mock_files(test, app_root):
+    """
+    Returns the candidate input/expected files a test depends on, whether or
+    not they exist; a file appearing later must change the cache key.
+    """
+    app_root = pathlib.Path(app_root)
+    files = []
+    for mocked in test.get("mocked_inputs") or []:
+        if not isinstance(mocked, dict):
+            continue
+        table = mocked.get("table")
+        if table:
+            base = app_root / "tests" / table.replace(".", "_")
+            files.extend(base.with_suffix(ext) for ext in MOCK_EXTENSIONS)
+        if mocked.get("path"):
+            files.append(app_root / mocked["path"])
+    expect = test.get("expect") or {}
+    if isinstance(expect, dict) and expect.get("data"):
+        data = expect["data"]
+        path = data.get("path") if isinstance(data, dict) else data
+        if path:
+            files.append(app_root / str(path))
+    return files
+
+
+class ResultCache:
+    """
+    Content-addressed store of passing test results.
+
+    A test's key covers the notebook, its `%run` dependencies, its mock and
+    expected-output files, its `dscc-tests:` entry, the tool version and the
+    source of dscc_tester, and the Python and Spark the tests run against
+    (`runtime`, from the executor; the local versions if not given), so any
+    change to what the test sees invalidates it.
+    """
+
+    def __init__(self, cache_dir=None, enabled=True, runtime=None):
+        self.enabled = enabled
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else get_cache_dir() / "test_results"
+        self._digests = {}
+        runtime = runtime or f"python={platform.python_version()} pyspark={get_spark_version()}"
+        self._environment = "\n".join([get_tool_version(), get_tester_digest(), runtime])
+
+    def _digest(self, path):
+        path = pathlib.Path(path)
+        if path not in self._digests:
+            self._digests[path] = file_digest(path) if path.is_file() else "missing"
+        return self._digests[path]
+
+    def test_key(self, notebook_path, test, app_root, exec_mode):
+        app_root = pathlib.Path(app_root).resolve()
+        notebook_path = pathlib.Path(notebook_path).resolve()
+
+        key = hashlib.sha256()
+        key.update(self._environment.encode())
+        key.update(f"\nexec={exec_mode}\n".encode())
+        key.update(f"notebook={self._digest(notebook_path)}\n".encode())
+        for dep in resolve_run_dependencies(notebook_path):
+            key.update(f"run:{os.path.relpath(dep, app_root)}={self._digest(dep)}\n".encode())
+        for mock in find_mock_files(test, app_root):
+            key.update(f"mock:{os.path.relpath(mock, app_root)}={self._digest(mock)}\n".encode())
+        key.update(json.dumps(test, sort_keys=True, default=str).encode())
+        return key.hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def is_cached_pass(self, key):
+        if not self.enabled:
+            return False
+        return self._entry_path(key).exists()
+
+    def record_pass(self, key, notebook, function):
+        if not self.enabled:
+            return
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"notebook": str(notebook), "function": function, "passed_at": time.time()}, f)
+        os.replace(tmp_path, entry_path)
@@ -1,8 +1,8 @@
 import sys
 from .generator import run
 
-def run_unit_tests(app_path, module=None, exec="local"):
-    run(app_path, module=module, exec=exec)
+def run_unit_tests(app_path, module=None, exec="local", no_cache=False, results_dir=None):
+    run(app_path, module=module, exec=exec, no_cache=no_cache, results_dir=results_dir)
 
 commands = {
     "run_unit_tests": run_unit_tests
@@ -11,7 +11,7 @@ commands = {
 def main():
     import fire
     allowed_options = {
-        'run_unit_tests': {'--app_path', '--module', '--exec', '--help'},
+        'run_unit_tests': {'--app_path', '--module', '--exec', '--no_cache', '--no-cache', '--results_dir', '--help'},
     }
     if len(sys.argv) > 1 and sys.argv[1] in allowed_options:
         allowed = allowed_options[sys.argv[1]]
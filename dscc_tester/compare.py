@@ -0,0 +1,277 @@
+"""
+Expected-output comparison for generated dscc tests.
+
+This module is copied into the patched app tree as `dscc_compare.py` and
+called from generated test files, so it must only depend on the standard
+library (and pyspark for the Spark-side comparison).
+
+Modes:
+    unordered  Order-insensitive, computed in Spark with `exceptAll` both ways.
+    hash       Order-insensitive, streams both sides and compares row-hash counts.
+    ordered    Row-by-row in returned order, streamed.
+    keys       Joins rows on key columns and reports missing/unexpected/changed keys.
+
+Expected files are JSON Lines, or a single JSON array for small fixtures.
+Only the first `max_diffs` mismatches are kept for the failure message.
+"""
+import datetime
+import decimal
+import hashlib
+import json
+from collections import Counter
+
+MODES = ("unordered", "hash", "ordered", "keys")
+DEFAULT_MODE = "unordered"
+DEFAULT_MAX_DIFFS = 10
+
+
+def normalize(value):
+    """Converts a row value into a JSON-stable form so both sides hash alike."""
+    if value is None:
+        return None
+    if hasattr(value, "asDict"):
+        return normalize(value.asDict(recursive=True))
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        value = float(value)
+    if hasattr(value, "item"):
+        # numpy / pandas scalars from the lite engine
+        try:
+            return normalize(value.item())
+        except (TypeError, ValueError):
+            pass
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            return int(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
+def row_hash(record):
+    payload = json.dumps(normalize(record), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _is_json_array(path):
+    with open(path) as f:
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                return ch == "["
+
+
+def iter_expected(path):
+    """Yields expected records one at a time; JSON arrays are loaded whole."""
+    if _is_json_array(path):
+        with open(path) as f:
+            yield from json.load(f)
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_actual(df):
+    if df is None:
+        return iter(())
+    rows = df.toLocalIterator() if hasattr(df, "toLocalIterator") else df.collect()
+    return (normalize(row) for row in rows)
+
+
+def _format_rows(title, rows, total):
+    if not total:
+        return []
+    lines = [f"{title} ({total}):"]
+    lines.extend(f"  {json.dumps(normalize(row), sort_keys=True, default=str)}" for row in rows)
+    if total > len(rows):
+        lines.append(f"  ... {total - len(rows)} more")
+    return lines
+
+
+def _fail(summary, *sections):
+    lines = [summary]
+    for section in sections:
+        lines.extend(section)
+    raise AssertionError("\n".join(lines))
+
+
+def compare_hash(df, path, max_diffs=DEFAULT_MAX_DIFFS):
+    """
+    Order-insensitive comparison that holds only row hashes in memory.
+    The actual rows are streamed once; the expected file is re-read only to
+    show missing rows when the comparison fails.
+    """
+    expected = Counter(row_hash(record) for record in iter_expected(path))
+    expected_total = sum(expected.values())
+
+    actual_total = 0
+    unexpected, unexpected_rows = 0, []
+    for record in iter_actual(df):
+        actual_total += 1
+        digest = row_hash(record)
+        if expected[digest] > 0:
+            expected[digest] -= 1
+        else:
+            unexpected += 1
+            if len(unexpected_rows) < max_diffs:
+                unexpected_rows.append(record)
+
+    missing = sum(count for count in expected.values() if count > 0)
+    if not missing and not unexpected:
+        return
+
+    missing_rows = []
+    for record in iter_expected(path):
+        if len(missing_rows) >= max_diffs:
+            break
+        digest = row_hash(record)
+        if expected[digest] > 0:
+            expected[digest] -= 1
+            missing_rows.append(record)
+
+    _fail(
+        f"Returned rows do not match {path}: expected {expected_total} rows, got {actual_total}",
+        _format_rows("Missing rows", missing_rows, missing),
+        _format_rows("Unexpected rows", unexpected_rows, unexpected),
+    )
+
+
+def compare_ordered(df, path, max_diffs=DEFAULT_MAX_DIFFS):
+    """Compares rows pairwise in returned order, streaming both sides."""
+    expected_iter = iter_expected(path)
+    actual_iter = iter_actual(df)
+    sentinel = object()
+    mismatches, shown = 0, []
+    position = 0
+    while True:
+        expected = next(expected_iter, sentinel)
+        actual = next(actual_iter, sentinel)
+        if expected is sentinel and actual is sentinel:
+            break
+        if expected is sentinel or actual is sentinel or normalize(expected) != actual:
+            mismatches += 1
+            if len(shown) < max_diffs:
+                shown.append({
+                    "row": position,
+                    "expected": None if expected is sentinel else expected,
+                    "actual": None if actual is sentinel else actual,
+                })
+        position += 1
+    if mismatches:
+        _fail(f"Returned rows do not match {path} in order", _format_rows("Mismatched positions", shown, mismatches))
+
+
+def compare_keys(df, path, keys, max_diffs=DEFAULT_MAX_DIFFS):
+    """
+    Matches rows on `keys` and reports missing, unexpected and changed keys.
+    Only key tuples and row hashes are held in memory.
+    """
+    if not keys:
+        raise ValueError("mode 'keys' needs at least one key column")
+    keys = [keys] if isinstance(keys, str) else list(keys)
+
+    def key_of(record):
+        return tuple(json.dumps(normalize(record.get(k)), sort_keys=True, default=str) for k in keys)
+
+    expected = {}
+    for record in iter_expected(path):
+        key = key_of(record)
+        if key in expected:
+            raise AssertionError(f"Duplicate key {dict(zip(keys, key))} in {path}")
+        expected[key] = row_hash(record)
+
+    unexpected, unexpected_rows = 0, []
+    changed, changed_rows = 0, {}
+    seen = set()
+    for record in iter_actual(df):
+        key = key_of(record)
+        if key in seen or key not in expected:
+            unexpected += 1
+            if len(unexpected_rows) < max_diffs:
+                unexpected_rows.append(record)
+            continue
+        seen.add(key)
+        if expected[key] != row_hash(record):
+            changed += 1
+            if len(changed_rows) < max_diffs:
+                changed_rows[key] = {"key": dict(zip(keys, key)), "actual": record}
+
+    missing_keys = [key for key in expected if key not in seen]
+    if not missing_keys and not unexpected and not changed:
+        return
+
+    wanted_missing = set(missing_keys[:max_diffs])
+    missing_rows = []
+    for record in iter_expected(path):
+        key = key_of(record)
+        if key in changed_rows:
+            changed_rows[key]["expected"] = record
+        elif key in wanted_missing:
+            missing_rows.append(record)
+
+    _fail(
+        f"Returned rows do not match {path} on keys {keys}",
+        _format_rows("Missing keys", missing_rows, len(missing_keys)),
+        _format_rows("Unexpected rows", unexpected_rows, unexpected),
+        _format_rows("Changed rows", list(changed_rows.values()), changed),
+    )
+
+
+def compare_unordered(df, path, max_diffs=DEFAULT_MAX_DIFFS):
+    """
+    Order-insensitive comparison in Spark: the expected file is read as a
+    DataFrame, cast to the returned schema and diffed with `exceptAll` both
+    ways, so neither side is collected. Falls back to `compare_hash` when no
+    Spark DataFrame is involved (e.g. the lite engine).
+    """
+    if df is None or getattr(df, "_dscc_lite", False) or not hasattr(df, "exceptAll"):
+        return compare_hash(df, path, max_diffs)
+
+    from pyspark.sql import functions as F
+
+    spark = df.sparkSession
+    expected = spark.read.option("multiLine", _is_json_array(path)).json(path)
+    if set(expected.columns) != set(df.columns):
+        _fail(
+            f"Returned columns do not match {path}",
+            [f"  expected: {sorted(expected.columns)}", f"  actual:   {sorted(df.columns)}"],
+        )
+    expected = expected.select([F.col(f"`{field.name}`").cast(field.dataType) for field in df.schema.fields])
+
+    missing_df = expected.exceptAll(df)
+    unexpected_df = df.exceptAll(expected)
+    missing = missing_df.count()
+    unexpected = unexpected_df.count()
+    if not missing and not unexpected:
+        return
+    _fail(
+        f"Returned rows do not match {path}",
+        _format_rows("Missing rows", missing_df.limit(max_diffs).collect(), missing),
+        _format_rows("Unexpected rows", unexpected_df.limit(max_diffs).collect(), unexpected),
+    )
+
+
+def assert_matches_expected(df, path, mode=DEFAULT_MODE, keys=None, max_diffs=DEFAULT_MAX_DIFFS):
+    """Asserts that `df` matches the expected rows in `path` using `mode`."""
+    if mode == "unordered":
+        compare_unordered(df, path, max_diffs)
+    elif mode == "hash":
+        compare_hash(df, path, max_diffs)
+    elif mode == "ordered":
+        compare_ordered(df, path, max_diffs)
+    elif mode == "keys":
+        compare_keys(df, path, keys, max_diffs)
+    else:
+        raise ValueError(f"Unknown comparison mode '{mode}'. Expected one of: {', '.join(MODES)}")
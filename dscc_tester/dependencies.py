@@ -0,0 +1,131 @@
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import site
+import subprocess
+import sys
+
+from dscc_packaging.shared_utils import get_cache_dir
+from dscc_packaging.notebook_io import read_notebook_source_lines, discover_notebook_files
+
+PIP_MAGIC_PATTERN = re.compile(r"%pip install (.+?)(?:\s+#.*)?$", re.IGNORECASE)
+
+# Packages notebooks need without declaring them via %pip
+IMPLICIT_REQUIREMENTS = [
+    (re.compile(r"(F\.)?pandas_udf|from pyspark\.sql\.functions import .*pandas_udf"), "pyarrow"),
+    (re.compile(r"from\s+delta\.tables\s+import\s+DeltaTable"), "delta-spark"),
+]
+
+VENV_COMPLETE_MARKER = ".dscc-complete"
+
+
+def scan_notebook_dependencies(app_path):
+    """
+    Collects `%pip install` requirements and implicit dependencies
+    (pyarrow for pandas UDFs, delta-spark for DeltaTable) in one pass,
+    reading each notebook once.
+
+    Returns:
+        list[str]: Sorted, de-duplicated requirements.
+    """
+    requirements = set()
+    for notebook in discover_notebook_files(app_path):
+        for line in read_notebook_source_lines(notebook):
+            match = PIP_MAGIC_PATTERN.search(line.strip())
+            if match:
+                requirements.update(pkg for pkg in match.group(1).split() if not pkg.startswith("-"))
+            for pattern, requirement in IMPLICIT_REQUIREMENTS:
+                if requirement not in requirements and pattern.search(line):
+                    requirements.add(requirement)
+    return sorted(requirements)
+
+
+def requirements_digest(requirements):
+    return hashlib.sha256("\n".join(sorted(set(requirements))).encode()).hexdigest()
+
+
+def virtualenv_key(requirements):
+    """Requirements digest plus the interpreter the virtualenv is built from and layered on."""
+    interpreter = f"{sys.prefix}\0{'.'.join(map(str, sys.version_info))}\0"
+    return hashlib.sha256((interpreter + requirements_digest(requirements)).encode()).hexdigest()
+
+
+def venv_python(venv_dir):
+    if os.name == "nt":
+        return pathlib.Path(venv_dir) / "Scripts" / "python.exe"
+    return pathlib.Path(venv_dir) / "bin" / "python"
+
+
+def link_caller_site_packages(venv_dir):
+    """
+    Writes a .pth file into the virtualenv listing this interpreter's
+    site-packages. Entries are appended after the virtualenv's own, so
+    installed requirements take precedence.
+    """
+    paths = list(site.getsitepackages())
+    if site.ENABLE_USER_SITE and os.path.isdir(site.getusersitepackages()):
+        paths.append(site.getusersitepackages())
+    purelib = subprocess.run(
+        [str(venv_python(venv_dir)), "-c", "import sysconfig; print(sysconfig.get_paths()['purelib'])"],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    pathlib.Path(purelib, "dscc-caller-site.pth").write_text("\n".join(paths) + "\n")
+
+
+def ensure_virtualenv(requirements, quiet=False):
+    """
+    Returns a Python interpreter with `requirements` installed.
+
+    Virtualenvs live under the dscc cache dir, keyed by the requirements
+    digest and the calling interpreter (prefix and version), so they are
+    shared across apps and runs and never touch the caller's environment.
+    A .pth file appends the caller's site-packages to the virtualenv's path,
+    so pyspark and pytest stay importable even when the caller is itself a
+    virtualenv (where --system-site-packages would only expose the base
+    interpreter's packages). With no requirements the current interpreter is
+    returned as-is.
+    """
+    if not requirements:
+        return sys.executable
+
+    venv_root = get_cache_dir() / "venvs"
+    venv_dir = venv_root / virtualenv_key(requirements)
+    if (venv_dir / VENV_COMPLETE_MARKER).exists():
+        if not quiet:
+            print(f"✅ Reusing cached virtualenv {venv_dir.name[:12]}")
+        return str(venv_python(venv_dir))
+
+    if not quiet:
+        print("📦 Notebook dependencies:")
+        for r in requirements:
+            print(f"  - {r}")
+        print(f"🔧 Building cached virtualenv {venv_dir.name[:12]}...")
+
+    # Build aside and rename into place so an interrupted build is never reused
+    build_dir = venv_root / f"{venv_dir.name}.{os.getpid()}.tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    venv_root.mkdir(parents=True, exist_ok=True)
+    try:
+        subprocess.run([sys.executable, "-m", "venv", str(build_dir)], check=True)
+        link_caller_site_packages(build_dir)
+        requirements_path = build_dir / "requirements.txt"
+        requirements_path.write_text("\n".join(requirements))
+        subprocess.run([
+            str(venv_python(build_dir)), "-m", "pip", "install",
+            "--no-warn-script-location", "--disable-pip-version-check", "-q", "-r", str(requirements_path)
+        ], check=True)
+        (build_dir / VENV_COMPLETE_MARKER).touch()
+        try:
+            os.replace(build_dir, venv_dir)
+        except OSError:
+            # Another run finished the same environment first
+            shutil.rmtree(build_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    if not quiet:
+        print("✅ Dependencies installed.")
+    return str(venv_python(venv_dir))
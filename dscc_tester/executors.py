@@ -0,0 +1,254 @@
+import hashlib
+import os
+import pathlib
+import platform
+import shutil
+import subprocess
+import zipfile
+
+from dscc_packaging.shared_utils import get_cache_dir
+from dscc_tester.cache import get_package_version, get_spark_version
+from dscc_tester.results import load_jsonl
+from dscc_tester.dependencies import ensure_virtualenv, requirements_digest
+
+RUNNER_SCRIPT = "dscc_harness.py"
+
+
+def tree_digest(root):
+    """Hashes every file path and its contents under root, in sorted order."""
+    digest = hashlib.sha256()
+    root = pathlib.Path(root)
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        digest.update(path.relative_to(root).as_posix().encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def build_bundle(patched_root, keep=5):
+    """
+    Zips the patched tree into the cache, keyed by its content digest.
+    An unchanged tree reuses the existing archive instead of re-zipping.
+    Returns (digest, zip_path).
+    """
+    digest = tree_digest(patched_root)
+    bundle_dir = get_cache_dir() / "bundles"
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = bundle_dir / f"{digest}.zip"
+    if zip_path.exists():
+        os.utime(zip_path)
+        return digest, zip_path
+
+    tmp_path = zip_path.with_suffix(f".{os.getpid()}.tmp")
+    root = pathlib.Path(patched_root)
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path in sorted(p for p in root.rglob("*") if p.is_file()):
+            zipf.write(path, path.relative_to(root).as_posix())
+    os.replace(tmp_path, zip_path)
+
+    # Keep only the most recently used bundles
+    bundles = sorted(bundle_dir.glob("*.zip"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in bundles[keep:]:
+        stale.unlink(missing_ok=True)
+    return digest, zip_path
+
+
+class Executor:
+    """
+    Runs generated test modules from a patched app tree in one batch and
+    returns the structured result entries recorded by dscc_harness.
+    """
+
+    # Header flavour used by rewrite_run_magics for generated test files
+    exec_mode = "local"
+
+    def run_batch(self, patched_root, test_modules, requirements, results_path):
+        raise NotImplementedError
+
+    def runtime_version(self):
+        """The Python and Spark the tests run against, as recorded in result cache keys."""
+        return f"python={platform.python_version()} pyspark={get_spark_version()}"
+
+
+class LocalSubprocessExecutor(Executor):
+    """
+    Runs the batch in a local subprocess, either with a Python interpreter
+    or through a local `spark-submit`. No Docker required.
+    """
+
+    def __init__(self, python=None, launcher=None):
+        self.python = python
+        self.launcher = launcher
+        if launcher == "spark-submit":
+            self.exec_mode = "spark"
+
+    def runtime_version(self):
+        version = super().runtime_version()
+        if self.launcher:
+            # The Spark behind spark-submit, not the pyspark package of this interpreter
+            launcher = shutil.which(self.launcher)
+            version += f" launcher={os.path.realpath(launcher) if launcher else self.launcher}"
+        return version
+
+    def command(self, python, test_modules, results_path):
+        if self.launcher:
+            return [self.launcher, RUNNER_SCRIPT, "--results", str(results_path), *test_modules]
+        return [python, RUNNER_SCRIPT, "--results", str(results_path), *test_modules]
+
+    def run_batch(self, patched_root, test_modules, requirements, results_path):
+        # Requirements go into a cached virtualenv, never the caller's environment
+        python = self.python or ensure_virtualenv(requirements)
+
+        env = os.environ.copy()
+        env["PYTHONPATH"] = f"{patched_root}:{env.get('PYTHONPATH', '')}"
+        if self.launcher:
+            env["PYSPARK_PYTHON"] = env["PYSPARK_DRIVER_PYTHON"] = python
+        print(f"▶️ Running {len(test_modules)} test module(s) locally in one batch...")
+        subprocess.run(self.command(python, test_modules, results_path), env=env, cwd=patched_root)
+        return load_jsonl(results_path)
+
+
+class LiteExecutor(Executor):
+    """
+    Runs the batch against the in-process pandas engine (dscc_lite), with no
+    JVM. Modules that use unsupported pyspark features, or whose tests do not
+    all pass, are re-run on real Spark through the fallback executor.
+    """
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or LocalSubprocessExecutor()
+
+    def runtime_version(self):
+        return f"lite pandas={get_package_version('pandas')} fallback=({self.fallback.runtime_version()})"
+
+    def run_batch(self, patched_root, test_modules, requirements, results_path):
+        python = ensure_virtualenv(requirements)
+        fallback_path = f"{results_path}.fallback"
+
+        env = os.environ.copy()
+        env["PYTHONPATH"] = f"{patched_root}:{env.get('PYTHONPATH', '')}"
+        print(f"▶️ Running {len(test_modules)} test module(s) with the lite engine...")
+        subprocess.run(
+            [python, RUNNER_SCRIPT, "--engine", "lite", "--fallback", fallback_path,
+             "--results", str(results_path), *test_modules],
+            env=env, cwd=patched_root,
+        )
+        entries = load_jsonl(results_path)
+
+        fallback_modules = []
+        if os.path.exists(fallback_path):
+            with open(fallback_path) as f:
+                fallback_modules = [line.strip() for line in f if line.strip()]
+            os.remove(fallback_path)
+        if fallback_modules:
+            print(f"↩️  Re-running {len(fallback_modules)} module(s) on Spark: {', '.join(fallback_modules)}")
+            spark_results = str(results_path).replace(".jsonl", "") + "-spark.jsonl"
+            entries += self.fallback.run_batch(patched_root, fallback_modules, requirements, spark_results)
+        return entries
+
+
+class DockerSparkExecutor(Executor):
+    """
+    Runs the batch with one `spark-submit` inside the dscc-spark-api container.
+
+    The bundle is copied and unpacked only when its content digest is new to
+    the container, and requirements are installed once per requirements digest.
+    """
+
+    exec_mode = "spark"
+
+    def __init__(self, container="dscc-spark-api", workdir="/tmp/dscc"):
+        self.container = container
+        self.workdir = workdir
+        self._runtime = None
+
+    def runtime_version(self):
+        """Python and pyspark versions inside the container, queried once."""
+        if self._runtime is None:
+            try:
+                result = self._exec(
+                    "python3 -c 'import platform, pyspark; print(platform.python_version(), pyspark.__version__)'",
+                    check=False, capture_output=True, text=True,
+                )
+                python, pyspark = result.stdout.split() if result.returncode == 0 else ("unknown", "unknown")
+            except (OSError, ValueError):
+                python, pyspark = "unknown", "unknown"
+            self._runtime = f"container={self.container} python={python} pyspark={pyspark}"
+        return self._runtime
+
+    def _exec(self, script, check=True, env=None, **kwargs):
+        cmd = ["docker", "exec"]
+        for key, value in (env or {}).items():
+            cmd += ["-e", f"{key}={value}"]
+        cmd += [self.container, "bash", "-c", script]
+        return subprocess.run(cmd, check=check, **kwargs)
+
+    def _has(self, path):
+        return self._exec(f"test -e {path}", check=False).returncode == 0
+
+    def ensure_bundle(self, patched_root):
+        digest, zip_path = build_bundle(patched_root)
+        bundle_path = f"{self.workdir}/bundles/{digest}"
+        if not self._has(bundle_path):
+            print(f"📦 Uploading test bundle {digest[:12]}...")
+            self._exec(f"mkdir -p {self.workdir}/bundles")
+            subprocess.run(["docker", "cp", str(zip_path), f"{self.container}:{bundle_path}.zip"], check=True)
+            self._exec(f"unzip -qq -o {bundle_path}.zip -d {bundle_path}.tmp && mv {bundle_path}.tmp {bundle_path} && rm -f {bundle_path}.zip")
+        return bundle_path
+
+    def ensure_requirements(self, requirements, tmpdir):
+        if not requirements:
+            return
+        digest = requirements_digest(requirements)
+        marker = f"{self.workdir}/deps/{digest}.ok"
+        if self._has(marker):
+            print("✅ Container requirements already installed.")
+            return
+        requirements_path = os.path.join(tmpdir, "requirements.txt")
+        with open(requirements_path, "w") as f:
+            f.write("\n".join(requirements))
+        self._exec(f"mkdir -p {self.workdir}/deps")
+        subprocess.run(["docker", "cp", requirements_path, f"{self.container}:{self.workdir}/deps/{digest}.txt"], check=True)
+        self._exec(
+            f"pip install --no-warn-script-location --quiet --disable-pip-version-check -r {self.workdir}/deps/{digest}.txt"
+            f" && touch {marker}"
+        )
+
+    def run_batch(self, patched_root, test_modules, requirements, results_path):
+        print("🚀 Running tests using Spark inside dscc-spark-api container...")
+        bundle_path = self.ensure_bundle(patched_root)
+        self.ensure_requirements(requirements, os.path.dirname(patched_root))
+
+        # Results land in a run-specific file inside the container and are copied back
+        run_id = os.path.basename(os.path.dirname(results_path))
+        container_results = f"{self.workdir}/results/{run_id}/{os.path.basename(results_path)}"
+        try:
+            self._exec(
+                f"cd {bundle_path} && export PYTHONPATH={bundle_path} && "
+                f"spark-submit {RUNNER_SCRIPT} --results {container_results} {' '.join(test_modules)} 2>/dev/null",
+                check=False,
+            )
+        finally:
+            subprocess.run(["docker", "cp", f"{self.container}:{container_results}", str(results_path)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._exec(f"rm -rf {self.workdir}/results/{run_id}", check=False)
+        return load_jsonl(results_path)
+
+
+EXECUTORS = {
+    "local": LocalSubprocessExecutor,
+    "spark-submit": lambda: LocalSubprocessExecutor(launcher="spark-submit"),
+    "spark": DockerSparkExecutor,
+    "lite": LiteExecutor,
+}
+
+
+def get_executor(exec_mode):
+    factory = EXECUTORS.get(exec_mode)
+    if factory is None:
+        return None
+    if shutil.which("docker") is None and exec_mode == "spark":
+        print("⚠️  docker not found; the spark executor needs the dscc-spark-api container.")
+    return factory()
@@ -1,16 +1,24 @@
 from dscc_tester.parser import extract_tests_from_file
 from dscc_tester.testgen import generate_test_file
-from dscc_packaging.notebook_io import read_notebook_source_lines, discover_notebook_files
+from dscc_tester.cache import ResultCache
+from dscc_tester.results import ResultsWriter, new_run_dir
+from dscc_tester.executors import get_executor
+from dscc_tester.dependencies import scan_notebook_dependencies
+from dscc_packaging.autogen_tests import load_notebook_analysis
+from dscc_packaging.ignore import default_matcher
+from dscc_packaging.notebook_io import read_notebook_source_lines, discover_notebook_files, parse_notebook
 import tempfile
 import os
-import subprocess
 import pathlib
 import shutil
-import zipfile
 import re
-import warnings
 
-import hashlib
+# Standalone modules shipped into the patched tree for generated tests to import
+RUNTIME_MODULES = {
+    "harness.py": "dscc_harness.py",
+    "lite.py": "dscc_lite.py",
+    "compare.py": "dscc_compare.py",
+}
 
 
 def path_to_module(notebook_path, root=None):
@@ -25,140 +33,17 @@ def path_to_module(notebook_path, root=None):
     return ".".join(parts)
 
 
-def extract_requirements_from_pip_magics(base_path):
-    requirements = set()
-    pattern = re.compile(r"%pip install (.+?)(?:\s+#.*)?$", re.IGNORECASE)
-
-    #for file in pathlib.Path(base_path).rglob("*.py"):
-    #    with open(file) as f:
-    for file in pathlib.Path(base_path).rglob("*"):
-        if file.suffix not in [".py", ".ipynb"]:
-            continue
-        #for line in f:
-        for line in read_notebook_source_lines(file):
-            match = pattern.search(line.strip())
-            if match:
-                pkgs = match.group(1).split()
-                cleaned_pkgs = [pkg for pkg in pkgs if not pkg.startswith('-')]
-                requirements.update(cleaned_pkgs)
-
-    return sorted(requirements)
-
-
-def detect_pandas_udf_usage(base_path):
-    udf_pattern = re.compile(r"(F\.)?pandas_udf|from pyspark\\.sql\\.functions import .*pandas_udf")
-    #for file in pathlib.Path(base_path).rglob("*.py"):
-    #    with open(file) as f:
-    #        for line in f:
-    for file in pathlib.Path(base_path).rglob("*"):
-        if file.suffix not in [".py", ".ipynb"]:
-            continue
-        for line in read_notebook_source_lines(file):
-            if udf_pattern.search(line):
-                return True
-    return False
-
-
-def detect_delta_usage(base_path):
-    delta_pattern = re.compile(r"from\s+delta\.tables\s+import\s+DeltaTable")
-    #for file in pathlib.Path(base_path).rglob("*.py"):
-    #    with open(file) as f:
-    #        for line in f:
-    for file in pathlib.Path(base_path).rglob("*"):
-        if file.suffix not in [".py", ".ipynb"]:
-            continue
-        for line in read_notebook_source_lines(file):
-            if delta_pattern.search(line):
-                return True
-    return False
-
-
-def install_notebook_dependencies(app_path: str, local: bool = False, quiet: bool = False, requirements_output_path: str = None):
+def infer_required_columns_from_source(filepath):
     """
-    Extracts and installs pip dependencies used in notebooks from %pip magics.
-
-    Args:
-        app_path: Root path to the notebook app.
-        local: If True, installs directly via pip for local use.
-        quiet: If True, suppresses output (useful for Spark).
-        requirements_output_path: Optional path to save requirements.txt (e.g., for Docker copy).
+    Columns a notebook references, from the AST column extractor shared with
+    test inference (dscc_packaging.columns). The analysis is cached by a hash
+    of the code cells, so each notebook is analysed once.
     """
-    requirements = extract_requirements_from_pip_magics(app_path)
-
-    # Add implicit ones based on code usage
-    if detect_pandas_udf_usage(app_path):
-        requirements.append("pyarrow")
-    if detect_delta_usage(app_path):
-        requirements.append("delta-spark")
-
-    requirements = sorted(set(requirements))  # dedupe and sort
-
-    if not requirements:
-        if not quiet:
-            print("✅ No notebook dependencies found.")
-        return
-
-    if not quiet:
-        print("📦 Notebook dependencies:")
-        for r in requirements:
-            print(f"  - {r}")
-
-    # Output the requirements file if needed (for Spark container)
-    if requirements_output_path:
-        with open(requirements_output_path, "w") as f:
-            f.write("\n".join(requirements))
-
-    if local:
-        # Check for pip
-        if not shutil.which("pip"):
-            print("❌ pip is not available in this environment. Cannot install dependencies.")
-            return
-
-        hash_path = os.path.join(app_path, ".requirements.hash")
-        new_hash = hashlib.md5("\n".join(requirements).encode()).hexdigest()
-
-        if os.path.exists(hash_path):
-            with open(hash_path, "r") as f:
-                if f.read().strip() == new_hash:
-                    if not quiet:
-                        print("✅ Requirements already satisfied (no changes).")
-                    return
-
-        # Write to a temp file for pip install
-        temp_path = os.path.join(app_path, "requirements.txt")
-        with open(temp_path, "w") as f:
-            f.write("\n".join(requirements))
-
-        if not quiet:
-            print("🔧 Installing dependencies...")
-
-        subprocess.run([
-            "pip", "install", "--no-warn-script-location", "--disable-pip-version-check", "-q", "-r", temp_path
-        ], check=True)
-
-        # Save hash to skip reinstalling
-        with open(hash_path, "w") as f:
-            f.write(new_hash)
-
-        if not quiet:
-            print("✅ Dependencies installed.")
-
-def infer_required_columns_from_source(filepath):
-    required = set()
-    column_patterns = [
-        re.compile(r"col\([\"'](.*?)[\"']\)"),
-        re.compile(r"\['(.*?)'\]"),
-        re.compile(r'\"(.*?)\"\s*(==|!=|in|not in)'),
-        re.compile(r"'(.*?)'\s*(==|!=|in|not in)"),
-    ]
-    #with open(filepath) as f:
-    #    code = f.read()
-    code = "\n".join(read_notebook_source_lines(filepath))
-
-    for pattern in column_patterns:
-        required.update(pattern.findall(code))
-
-    return sorted(set(x if isinstance(x, str) else x[0] for x in required))
+    try:
+        analysis = load_notebook_analysis(parse_notebook(filepath).code)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    return analysis.get("all_columns", [])
 
 
 def generate_stub_schema_code(columns):
@@ -191,8 +76,9 @@ def generate_stub_schema_code(columns):
     return indent(f"StructType([\n{nested_fields}\n])", "                ")
 
 
-def rewrite_run_magics(filepath, exec_mode="local"):
-    required_columns = infer_required_columns_from_source(filepath)
+def rewrite_run_magics(filepath, exec_mode="local", required_columns=None):
+    if required_columns is None:
+        required_columns = infer_required_columns_from_source(filepath)
 
     #with open(filepath, 'r') as f:
     #    lines = f.readlines()
@@ -277,16 +163,17 @@ spark.sparkContext.setLogLevel("WARN")
 
     rewritten.append("\nif __name__ == '__main__':\n")
     if exec_mode == "spark":
-        rewritten.append("    try:\n")
-        rewritten.append("        result = test_case_0()\n")
-        rewritten.append("        count = result.count() if result else 0\n")
-        rewritten.append("        print(f'✅ Test ran with result count: {count}')\n")
-        #rewritten.append("        if count == 0:\n")
-        #rewritten.append("            print('⚠️  Soft assert failed: test did not match expected output count')\n")
-        rewritten.append("        with open('/tmp/coverage.log', 'a') as log:\n")
-        rewritten.append("            log.write(f'{__file__}: count={count}\\n')\n")
-        rewritten.append("    except Exception as e:\n")
-        rewritten.append("        print(f'❌ Test error: {e}')\n")
+        rewritten.append("    import sys\n")
+        rewritten.append("    failures = 0\n")
+        rewritten.append("    test_names = sorted((n for n in list(globals()) if n.startswith('test_case_')), key=lambda n: int(n.rsplit('_', 1)[1]))\n")
+        rewritten.append("    for test_name in test_names:\n")
+        rewritten.append("        try:\n")
+        rewritten.append("            globals()[test_name]()\n")
+        rewritten.append("            print(f'✅ {test_name} passed')\n")
+        rewritten.append("        except Exception as e:\n")
+        rewritten.append("            failures += 1\n")
+        rewritten.append("            print(f'❌ Test error: {e}')\n")
+        rewritten.append("    sys.exit(1 if failures else 0)\n")
     else:
         rewritten.append("    import pytest\n")
         rewritten.append("    import sys\n")
@@ -295,41 +182,6 @@ spark.sparkContext.setLogLevel("WARN")
     with open(filepath, 'w') as f:
         f.writelines(rewritten)
 
-def print_coverage_summary():
-    coverage_path = '/tmp/coverage.log'
-    if not os.path.exists(coverage_path):
-        print("⚠️  No coverage log found.")
-        return
-
-    print("\n📊 DSCC Test Coverage Report:\n")
-    with open(coverage_path, 'r') as f:
-        lines = f.readlines()
-
-    total = len(lines)
-    passing = 0
-    failing = 0
-    empty = 0
-
-    for line in lines:
-        path, count = line.strip().split(": count=")
-        count = int(count)
-        status = "✅"
-        if count == 0:
-            status = "⚠️ "
-            empty += 1
-        else:
-            passing += 1
-        print(f"{status} {path} — returned {count} rows")
-
-    failing = total - passing
-    print("\n📌 Summary:")
-    print(f"  ✅ Passed: {passing}")
-    print(f"  ⚠️  Empty Results: {empty}")
-    print(f"  ❌ Failed (exceptions): {failing}")
-    print(f"  📄 Total Tests: {total}")
-
-
-
 def ensure_inits(path):
     for root, dirs, files in os.walk(path):
         if "__init__.py" not in files:
@@ -338,7 +190,10 @@ def ensure_inits(path):
 
 def patch_source_tree(app_path, tmpdir):
     patched_root = os.path.join(tmpdir, "patched")
-    shutil.copytree(app_path, patched_root, dirs_exist_ok=True)
+    # System files (.git, __pycache__, checkpoints, ...) are not copied into the patched tree
+    shutil.copytree(app_path, patched_root, dirs_exist_ok=True, ignore=default_matcher().copytree_ignore(app_path))
+    for module_name, target_name in RUNTIME_MODULES.items():
+        shutil.copy(os.path.join(os.path.dirname(__file__), module_name), os.path.join(patched_root, target_name))
 
     for notebook in discover_notebook_files(os.path.join(patched_root, "base")):
         rewrite_run_magics(notebook)
@@ -347,90 +202,69 @@ def patch_source_tree(app_path, tmpdir):
     return patched_root
 
 
-def run(app_path, module=None, exec="local"):
+def run(app_path, module=None, exec="local", no_cache=False, results_dir=None):
+    executor = get_executor(exec)
+    if executor is None:
+        print(f"Unknown execution mode: {exec}")
+        return
+
     detection_files = discover_notebook_files(os.path.join(app_path, "base"))
     print(f"🔍 Found {len(detection_files)} detection notebooks in {app_path}/base")
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        patched_root = patch_source_tree(app_path, tmpdir)
-
-        for file in detection_files:
-            tests = extract_tests_from_file(file)
-            print(f"Extracted {len(tests)} Tests from:", file)
-            for test in tests:
-                print(test)
-
-            if not tests:
-                continue  # skip if no tests found
-
-            module_path = path_to_module(file, root=app_path)
-            # output_path = os.path.join(tmpdir, "test_generated.py")
-            output_path = os.path.join(patched_root, "test_generated.py")
-
-            generate_test_file(tests, output_path, module_path)
-            rewrite_run_magics(output_path, exec_mode=exec)
-            print(f"Generated test file at: {output_path}")
-
-            if exec == "spark":
-                run_on_spark(output_path, app_path, tmpdir)
-            elif exec == "local":
-                run_locally(output_path, patched_root)
-            else:
-                print(f"Unknown execution mode: {exec}")
-
-
-def run_locally(test_path, patched_root):
-    print(f"▶️ Running tests locally with pytest...{test_path}")
-    install_notebook_dependencies(patched_root, local=True)
-    
-    env = os.environ.copy()
-    test_dir = os.path.dirname(test_path)
-    env["PYTHONPATH"] = f"{test_dir}:{patched_root}:{env.get('PYTHONPATH', '')}"
-
-    # Set working directory to patched_root to match how imports work
-    import sys
-    subprocess.run([sys.executable, "-m", "pytest", test_path], env=env, cwd=patched_root)
-
-
-def run_on_spark(test_path, app_root, tmpdir):
-    print("🚀 Running tests using Spark inside dscc-spark-api container...")
-
-    zip_path = os.path.join(tmpdir, "app.zip")
-    patched_path = os.path.join(tmpdir, "patched")
-
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore", category=UserWarning, message="Duplicate name:")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for root, _, files in os.walk(patched_path):
-                rel_root = os.path.relpath(root, patched_path)
-                init_path = os.path.join(root, "__init__.py")
-                if not os.path.exists(init_path):
-                    open(init_path, "w").close()
-                zipf.write(init_path, os.path.join(rel_root, "__init__.py"))
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, patched_path)
-                    zipf.write(file_path, arcname)
-
-    # Extract and install notebook requirements
-    requirements_path = os.path.join(tmpdir, "requirements.txt")
-    install_notebook_dependencies(app_root, local=False)
-
-    if os.path.exists(os.path.join(app_root, "requirements.txt")):
-        subprocess.run(["docker", "cp", os.path.join(app_root, "requirements.txt"), "dscc-spark-api:/tmp/requirements.txt"], check=True)
-        subprocess.run([
-            "docker", "exec", "dscc-spark-api",
-            "bash", "-c",
-            "pip install --no-warn-script-location --quiet --disable-pip-version-check -r /tmp/requirements.txt"
-        ], check=True)
-
-    try:
-        subprocess.run(["docker", "cp", test_path, "dscc-spark-api:/tmp/test_generated.py"], check=True)
-        subprocess.run(["docker", "cp", zip_path, "dscc-spark-api:/tmp/app.zip"], check=True)
-        subprocess.run([
-            "docker", "exec", "dscc-spark-api",
-            "bash", "-c",
-            "cd /tmp && export PYTHONPATH=/tmp:/tmp/app && unzip -qq -o /tmp/app.zip -d /tmp/app && spark-submit test_generated.py 2>/dev/null"
-        ], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Spark test failed: {e}")
\ No newline at end of file
+    cache = ResultCache(enabled=not no_cache, runtime=executor.runtime_version() if not no_cache else None)
+    writer = ResultsWriter(new_run_dir(results_dir))
+    pending = {}
+    for file in detection_files:
+        tests = extract_tests_from_file(file)
+        print(f"Extracted {len(tests)} Tests from:", file)
+        for test in tests:
+            print(test)
+
+        if not tests:
+            continue  # skip if no tests found
+
+        notebook = pathlib.Path(file).relative_to(app_path).as_posix()
+        keys = [cache.test_key(file, test, app_path, exec) for test in tests]
+        if all(cache.is_cached_pass(key) for key in keys):
+            for index, test in enumerate(tests):
+                writer.add({
+                    "notebook": notebook, "function": test.get("function"), "index": index,
+                    "status": "cached", "rows": None, "duration": None, "spark_jobs": None, "exception": None,
+                })
+            continue
+        pending[notebook] = (file, tests, keys)
+
+    if pending:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            patched_root = patch_source_tree(app_path, tmpdir)
+
+            test_modules = []
+            for notebook, (file, tests, keys) in pending.items():
+                module_path = path_to_module(file, root=app_path)
+                test_module = "test_" + module_path.replace(".", "_")
+                output_path = os.path.join(patched_root, f"{test_module}.py")
+
+                generate_test_file(tests, output_path, module_path, notebook=notebook)
+                # Stub schemas come from the notebook under test, not the generated file
+                rewrite_run_magics(output_path, exec_mode=executor.exec_mode, required_columns=infer_required_columns_from_source(file))
+                test_modules.append(test_module)
+            print(f"Generated {len(test_modules)} test file(s) in: {patched_root}")
+
+            requirements = scan_notebook_dependencies(app_path)
+            results_path = os.path.join(writer.run_dir, "raw_results.jsonl")
+            recorded = executor.run_batch(patched_root, test_modules, requirements, results_path)
+
+            by_notebook = {}
+            for entry in recorded:
+                by_notebook.setdefault(entry["notebook"], []).append(entry)
+            for notebook, (file, tests, keys) in pending.items():
+                entries = by_notebook.get(notebook, [])
+                writer.extend(entries)
+                writer.add_missing(notebook, tests, entries, "no result recorded (test module failed to load?)")
+                for entry in entries:
+                    if entry["status"] == "passed":
+                        cache.record_pass(keys[entry["index"]], file, entry["function"])
+
+    writer.write()
+    writer.print_summary()
+    return writer.entries
@@ -0,0 +1,176 @@
+"""
+Runtime support for generated dscc tests.
+
+This module is copied into the patched app tree as `dscc_harness.py` and
+imported by generated test files, so it must only depend on the standard
+library (and optionally pyspark) to run inside the Spark container.
+"""
+import json
+import os
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+RESULTS_PATH_ENV = "DSCC_RESULTS_PATH"
+ENGINE_ENV = "DSCC_ENGINE"
+
+
+def _spark_context():
+    try:
+        from pyspark.sql import SparkSession
+        session = SparkSession.getActiveSession()
+        return session.sparkContext if session is not None else None
+    except Exception:
+        return None
+
+
+def _write_result(entry):
+    results_path = os.environ.get(RESULTS_PATH_ENV)
+    if not results_path:
+        return
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "a") as f:
+        f.write(json.dumps(entry, default=str) + "\n")
+
+
+@contextmanager
+def record_test(notebook, function, index):
+    """
+    Times a test body and appends its outcome to $DSCC_RESULTS_PATH as JSONL.
+
+    The body sets `result["rows"]` once it has counted the returned DataFrame.
+    Spark jobs are attributed to the test through a dedicated job group.
+    """
+    result = {"rows": None}
+    sc = _spark_context()
+    job_group = f"dscc-{uuid.uuid4().hex}"
+    if sc is not None:
+        try:
+            sc.setJobGroup(job_group, f"{notebook}::{function}[{index}]")
+        except Exception:
+            sc = None
+
+    entry = {
+        "notebook": notebook,
+        "function": function,
+        "index": index,
+        "engine": os.environ.get(ENGINE_ENV, "spark"),
+        "status": "passed",
+        "rows": None,
+        "duration": None,
+        "spark_jobs": None,
+        "exception": None,
+    }
+    start = time.perf_counter()
+    try:
+        yield result
+    except AssertionError as e:
+        entry["status"] = "failed"
+        entry["exception"] = str(e) or traceback.format_exc(limit=1).strip()
+        raise
+    except Exception as e:
+        entry["status"] = "error"
+        entry["exception"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        entry["duration"] = round(time.perf_counter() - start, 4)
+        entry["rows"] = result.get("rows")
+        if sc is not None:
+            try:
+                entry["spark_jobs"] = len(sc.statusTracker().getJobIdsForGroup(job_group))
+                sc.setLocalProperty("spark.jobGroup.id", None)
+            except Exception:
+                pass
+        _write_result(entry)
+
+
+def _test_names(module):
+    names = [name for name in dir(module) if name.startswith("test_case_")]
+    return sorted(names, key=lambda name: int(name.rsplit("_", 1)[1]))
+
+
+def _run_module(module_name):
+    import importlib
+
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:
+        print(f"❌ Could not load {module_name}: {type(e).__name__}: {e}")
+        return 1
+    failures = 0
+    for test_name in _test_names(module):
+        try:
+            getattr(module, test_name)()
+            print(f"✅ {module_name}::{test_name} passed")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {module_name}::{test_name}: {type(e).__name__}: {e}")
+    return failures
+
+
+def run_modules(module_names, lite=False):
+    """
+    Imports each generated test module and runs its test cases in order.
+
+    With `lite`, results are staged per module and kept only when every test
+    passed; any other module is returned for a re-run on real Spark, so a gap
+    in the lite engine can never turn into a wrong verdict.
+
+    Returns (failures, fallback_modules).
+    """
+    results_path = os.environ.get(RESULTS_PATH_ENV)
+    failures = 0
+    fallback = []
+    for module_name in module_names:
+        if not lite:
+            failures += _run_module(module_name)
+            continue
+
+        part_path = f"{results_path}.{module_name}.part" if results_path else None
+        if part_path:
+            os.environ[RESULTS_PATH_ENV] = part_path
+        module_failures = _run_module(module_name)
+        if module_failures:
+            fallback.append(module_name)
+        elif part_path and os.path.exists(part_path):
+            with open(part_path) as src, open(results_path, "a") as dst:
+                dst.write(src.read())
+        if part_path:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            os.environ[RESULTS_PATH_ENV] = results_path
+    return failures, fallback
+
+
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Run generated dscc test modules in one process")
+    parser.add_argument("--results", required=True, help="JSONL file to append test results to")
+    parser.add_argument("--engine", choices=["spark", "lite"], default="spark", help="DataFrame engine to run against")
+    parser.add_argument("--fallback", help="File listing modules that must be re-run on Spark (lite engine)")
+    parser.add_argument("modules", nargs="+", help="Generated test modules to import and run")
+    args = parser.parse_args(argv)
+
+    os.environ[RESULTS_PATH_ENV] = args.results
+    os.environ[ENGINE_ENV] = args.engine
+    if args.engine == "spark":
+        failures, _ = run_modules(args.modules)
+        sys.exit(1 if failures else 0)
+
+    try:
+        import dscc_lite
+        dscc_lite.install()
+        _, fallback = run_modules(args.modules, lite=True)
+    except Exception as e:
+        print(f"⚠️  Lite engine unavailable ({type(e).__name__}: {e}); deferring all modules to Spark.")
+        fallback = list(args.modules)
+    if args.fallback:
+        with open(args.fallback, "w") as f:
+            f.write("\n".join(fallback))
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
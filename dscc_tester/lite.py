@@ -0,0 +1,634 @@
+"""
+In-process stand-in for the subset of `pyspark.sql` most detections use.
+
+This module is copied into the patched app tree as `dscc_lite.py`. Calling
+`install()` registers shim `pyspark`, `pyspark.sql`, `pyspark.sql.functions`
+and `pyspark.sql.types` modules backed by pandas, so detection functions run
+against their mocks without starting a JVM.
+
+Supported: `spark.table` (via the patched mock loader), `spark.read`
+json/csv/parquet, `createDataFrame`, `filter`/`where` with Column
+expressions, `select`, `withColumn`, `col`/`lit`, comparisons and boolean
+operators, `groupBy(...).count()` and equi-joins on column names. Anything
+else raises `LiteUnsupported`, which the harness treats as a signal to
+re-run the module on real Spark.
+"""
+import importlib.abc
+import importlib.machinery
+import re
+import sys
+import types
+
+
+class LiteUnsupported(NotImplementedError):
+    """Raised when code needs a pyspark feature the lite engine does not provide."""
+
+    # Checked by dscc_harness without importing this module
+    dscc_lite_fallback = True
+
+
+def _unsupported(what):
+    raise LiteUnsupported(f"dscc lite engine does not support {what}")
+
+
+def _pandas():
+    try:
+        import pandas
+        return pandas
+    except ImportError:
+        raise LiteUnsupported("pandas is not installed")
+
+
+# ─────────────────────────────────────
+# Types
+# ─────────────────────────────────────
+
+class DataType:
+    def __eq__(self, other):
+        return type(self) is type(other)
+
+    def __hash__(self):
+        return hash(type(self))
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class StringType(DataType): pass
+class IntegerType(DataType): pass
+class LongType(DataType): pass
+class DoubleType(DataType): pass
+class FloatType(DataType): pass
+class BooleanType(DataType): pass
+class TimestampType(DataType): pass
+class DateType(DataType): pass
+
+
+class StructField:
+    def __init__(self, name, dataType, nullable=True):
+        self.name = name
+        self.dataType = dataType
+        self.nullable = nullable
+
+
+class StructType(DataType):
+    def __init__(self, fields=None):
+        self.fields = list(fields or [])
+
+    def __eq__(self, other):
+        return isinstance(other, StructType) and [(f.name, f.dataType) for f in self.fields] == [(f.name, f.dataType) for f in other.fields]
+
+    def __hash__(self):
+        return hash(tuple(f.name for f in self.fields))
+
+    @property
+    def names(self):
+        return [f.name for f in self.fields]
+
+
+# ─────────────────────────────────────
+# Rows and columns
+# ─────────────────────────────────────
+
+class Row(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return dict.__getitem__(self, key)
+
+    def asDict(self, recursive=False):
+        return dict(self)
+
+
+def _get_path(value, parts):
+    for part in parts:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class Column:
+    def __init__(self, evaluate, name):
+        self._evaluate = evaluate
+        self._name = name
+
+    def _eval(self, pdf):
+        return self._evaluate(pdf)
+
+    def __bool__(self):
+        raise ValueError("Cannot convert column into bool: please use '&' for 'and', '|' for 'or', '~' for 'not'")
+
+    def _binary(self, other, op, symbol):
+        right = other if isinstance(other, Column) else lit(other)
+        return Column(lambda pdf: op(self._eval(pdf), right._eval(pdf)), f"({self._name} {symbol} {right._name})")
+
+    def __eq__(self, other): return self._binary(other, _compare(lambda a, b: a == b), "=")
+    def __ne__(self, other): return self._binary(other, _compare(lambda a, b: a != b), "!=")
+    def __lt__(self, other): return self._binary(other, _compare(lambda a, b: a < b), "<")
+    def __le__(self, other): return self._binary(other, _compare(lambda a, b: a <= b), "<=")
+    def __gt__(self, other): return self._binary(other, _compare(lambda a, b: a > b), ">")
+    def __ge__(self, other): return self._binary(other, _compare(lambda a, b: a >= b), ">=")
+    def __and__(self, other): return self._binary(other, lambda a, b: _as_logical(a) & _as_logical(b), "AND")
+    def __or__(self, other): return self._binary(other, lambda a, b: _as_logical(a) | _as_logical(b), "OR")
+    def __add__(self, other): return self._binary(other, lambda a, b: a + b, "+")
+    def __sub__(self, other): return self._binary(other, lambda a, b: a - b, "-")
+    def __mul__(self, other): return self._binary(other, lambda a, b: a * b, "*")
+    def __truediv__(self, other): return self._binary(other, lambda a, b: a / b, "/")
+
+    def __invert__(self):
+        return Column(lambda pdf: ~_as_logical(self._eval(pdf)), f"(NOT {self._name})")
+
+    __hash__ = object.__hash__
+
+    def alias(self, name):
+        return Column(self._evaluate, name)
+
+    name = alias
+
+    def isin(self, *values):
+        if len(values) == 1 and isinstance(values[0], (list, tuple, set)):
+            values = tuple(values[0])
+        known = [v for v in values if not _is_missing(v)]
+
+        def evaluate(pdf):
+            series = self._eval(pdf)
+            result = series.isin(known).astype("boolean")
+            result[series.isna()] = _pandas().NA
+            if len(known) < len(values):
+                # x IN (..., NULL) is NULL unless x matches a non-null value
+                result[~result.fillna(True)] = _pandas().NA
+            return result
+
+        return Column(evaluate, f"({self._name} IN {values})")
+
+    def isNull(self):
+        return Column(lambda pdf: self._eval(pdf).isna(), f"({self._name} IS NULL)")
+
+    def isNotNull(self):
+        return Column(lambda pdf: self._eval(pdf).notna(), f"({self._name} IS NOT NULL)")
+
+    def contains(self, value):
+        return Column(lambda pdf: self._eval(pdf).astype("string").str.contains(value, regex=False), self._name)
+
+    def startswith(self, value):
+        return Column(lambda pdf: self._eval(pdf).astype("string").str.startswith(value), self._name)
+
+    def endswith(self, value):
+        return Column(lambda pdf: self._eval(pdf).astype("string").str.endswith(value), self._name)
+
+    def like(self, pattern):
+        regex = "^" + "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern) + "$"
+        return self.rlike(regex)
+
+    def rlike(self, regex):
+        return Column(lambda pdf: self._eval(pdf).astype("string").str.contains(regex, regex=True), self._name)
+
+    def getField(self, name):
+        return Column(lambda pdf: self._eval(pdf).map(lambda v: _get_path(v, [name])), name)
+
+    def __getitem__(self, name):
+        return self.getField(name)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        _unsupported(f"Column.{name}")
+
+
+# Predicates follow SQL three-valued logic: comparisons and IN are NULL (pd.NA)
+# where an operand is null, NOT/AND/OR keep NULL as in Spark, and only filter
+# treats NULL as false.
+
+def _compare(op):
+    def apply(a, b):
+        pd = _pandas()
+        known = a.notna() & b.notna()
+        result = pd.Series(pd.NA, index=a.index, dtype="boolean")
+        if known.any():
+            result[known] = op(a[known], b[known]).astype(bool)
+        return result
+    return apply
+
+
+def _as_logical(series):
+    if hasattr(series, "astype"):
+        return series.astype("boolean")
+    return bool(series)
+
+
+def _as_bool(series):
+    if hasattr(series, "fillna"):
+        return _as_logical(series).fillna(False).astype(bool)
+    return bool(series)
+
+
+def col(name):
+    if name == "*":
+        _unsupported("col('*') outside select")
+    parts = name.split(".")
+
+    def evaluate(pdf):
+        if name in pdf.columns:
+            return pdf[name]
+        if parts[0] not in pdf.columns:
+            raise KeyError(f"Column '{name}' does not exist")
+        return pdf[parts[0]].map(lambda v: _get_path(v, parts[1:]))
+
+    return Column(evaluate, parts[-1])
+
+
+column = col
+
+
+def lit(value):
+    def evaluate(pdf):
+        pd = _pandas()
+        return pd.Series([value] * len(pdf), index=pdf.index, dtype=object if value is None else None)
+    return Column(evaluate, str(value))
+
+
+def _to_column(value):
+    if isinstance(value, Column):
+        return value
+    if isinstance(value, str):
+        return col(value)
+    _unsupported(f"column expression {value!r}")
+
+
+# ─────────────────────────────────────
+# DataFrame
+# ─────────────────────────────────────
+
+JOIN_TYPES = {
+    "inner": "inner", "left": "left", "left_outer": "left", "leftouter": "left",
+    "right": "right", "right_outer": "right", "rightouter": "right",
+    "outer": "outer", "full": "outer", "full_outer": "outer", "fullouter": "outer",
+}
+
+
+class DataFrame:
+    # Lets comparison helpers tell the shim apart from a real Spark DataFrame
+    _dscc_lite = True
+
+    def __init__(self, pdf):
+        self._pdf = pdf.reset_index(drop=True)
+
+    @property
+    def columns(self):
+        return list(self._pdf.columns)
+
+    def __getitem__(self, name):
+        if isinstance(name, str):
+            return col(name)
+        _unsupported(f"DataFrame[{name!r}]")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._pdf.columns:
+            return col(name)
+        _unsupported(f"DataFrame.{name}")
+
+    def filter(self, condition):
+        if not isinstance(condition, Column):
+            _unsupported("SQL string filter expressions")
+        return DataFrame(self._pdf[_as_bool(condition._eval(self._pdf)).values])
+
+    where = filter
+
+    def select(self, *cols):
+        if len(cols) == 1 and isinstance(cols[0], (list, tuple)):
+            cols = tuple(cols[0])
+        pd = _pandas()
+        out = {}
+        for c in cols:
+            if c == "*":
+                for name in self._pdf.columns:
+                    out[name] = self._pdf[name]
+                continue
+            column_ = _to_column(c)
+            value = column_._eval(self._pdf)
+            if column_._name in out:
+                _unsupported(f"duplicate output column '{column_._name}'")
+            out[column_._name] = value
+        return DataFrame(pd.DataFrame(out, index=self._pdf.index))
+
+    def withColumn(self, name, column_):
+        pdf = self._pdf.copy()
+        pdf[name] = _to_column(column_)._eval(pdf)
+        return DataFrame(pdf)
+
+    def withColumnRenamed(self, existing, new):
+        return DataFrame(self._pdf.rename(columns={existing: new}))
+
+    def drop(self, *names):
+        return DataFrame(self._pdf.drop(columns=[n for n in names if n in self._pdf.columns]))
+
+    def join(self, other, on=None, how="inner"):
+        if not isinstance(other, DataFrame):
+            _unsupported("joins with non-lite DataFrames")
+        if isinstance(on, str):
+            on = [on]
+        if not on or not all(isinstance(k, str) for k in on):
+            _unsupported("join conditions other than column names")
+        how = (how or "inner").lower()
+        overlap = (set(self.columns) & set(other.columns)) - set(on)
+        if overlap:
+            _unsupported(f"joins with ambiguous columns {sorted(overlap)}")
+        # pandas matches null keys to each other, Spark never does: null-key rows
+        # take no part in matching (outer joins still keep them unmatched)
+        left_null = self._pdf[on].isna().any(axis=1).values
+        right_null = other._pdf[on].isna().any(axis=1).values
+        if how in ("semi", "leftsemi", "left_semi", "anti", "leftanti", "left_anti"):
+            keys = other._pdf[~right_null][on].drop_duplicates()
+            marked = self._pdf.merge(keys, on=on, how="left", indicator=True)
+            matched = (marked["_merge"] == "both").values & ~left_null
+            keep = matched if "semi" in how else ~matched
+            return DataFrame(self._pdf[keep])
+        if how not in JOIN_TYPES:
+            _unsupported(f"join type '{how}'")
+        how = JOIN_TYPES[how]
+        joined = self._pdf[~left_null].merge(other._pdf[~right_null], on=on, how=how)
+        unmatched = []
+        if how in ("left", "outer") and left_null.any():
+            unmatched.append(self._pdf[left_null])
+        if how in ("right", "outer") and right_null.any():
+            unmatched.append(other._pdf[right_null])
+        if unmatched:
+            joined = _pandas().concat([joined, *unmatched], ignore_index=True)[joined.columns]
+        return DataFrame(joined)
+
+    def groupBy(self, *cols):
+        if len(cols) == 1 and isinstance(cols[0], (list, tuple)):
+            cols = tuple(cols[0])
+        if not all(isinstance(c, str) for c in cols):
+            _unsupported("groupBy on Column expressions")
+        return GroupedData(self, list(cols))
+
+    groupby = groupBy
+
+    def union(self, other):
+        if list(self.columns) != list(other.columns):
+            _unsupported("union of DataFrames with different column order")
+        return DataFrame(_pandas().concat([self._pdf, other._pdf], ignore_index=True))
+
+    unionAll = union
+
+    def unionByName(self, other):
+        return DataFrame(_pandas().concat([self._pdf, other._pdf[self.columns]], ignore_index=True))
+
+    def distinct(self):
+        return DataFrame(self._pdf.drop_duplicates())
+
+    def dropDuplicates(self, subset=None):
+        return DataFrame(self._pdf.drop_duplicates(subset=subset))
+
+    drop_duplicates = dropDuplicates
+
+    def orderBy(self, *cols, ascending=True):
+        if not all(isinstance(c, str) for c in cols):
+            _unsupported("orderBy on Column expressions")
+        return DataFrame(self._pdf.sort_values(list(cols), ascending=ascending, na_position="first" if ascending else "last"))
+
+    sort = orderBy
+
+    def limit(self, num):
+        return DataFrame(self._pdf.head(num))
+
+    def count(self):
+        return len(self._pdf)
+
+    def isEmpty(self):
+        return self._pdf.empty
+
+    def collect(self):
+        return [Row({k: (None if _is_missing(v) else v) for k, v in record.items()}) for record in self._pdf.to_dict("records")]
+
+    def toLocalIterator(self):
+        return iter(self.collect())
+
+    def first(self):
+        rows = self.limit(1).collect()
+        return rows[0] if rows else None
+
+    def head(self, n=None):
+        if n is None:
+            return self.first()
+        return self.limit(n).collect()
+
+    take = head
+
+    def toPandas(self):
+        return self._pdf.copy()
+
+    def show(self, n=20, truncate=True, vertical=False):
+        print(self._pdf.head(n).to_string(index=False))
+
+    def cache(self):
+        return self
+
+    persist = cache
+
+
+def _is_missing(value):
+    try:
+        return value is None or (value != value)
+    except Exception:
+        return False
+
+
+class GroupedData:
+    def __init__(self, df, keys):
+        self._df = df
+        self._keys = keys
+
+    def count(self):
+        pdf = self._df._pdf
+        if not self._keys:
+            return DataFrame(_pandas().DataFrame({"count": [len(pdf)]}))
+        return DataFrame(pdf.groupby(self._keys, dropna=False, sort=False).size().reset_index(name="count"))
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        _unsupported(f"GroupedData.{name}")
+
+
+# ─────────────────────────────────────
+# Session
+# ─────────────────────────────────────
+
+class _StatusTracker:
+    def getJobIdsForGroup(self, group=None):
+        return []
+
+
+class SparkContext:
+    def setLogLevel(self, level):
+        pass
+
+    def setJobGroup(self, group, description, interruptOnCancel=False):
+        pass
+
+    def setLocalProperty(self, key, value):
+        pass
+
+    def statusTracker(self):
+        return _StatusTracker()
+
+
+class DataFrameReader:
+    def __init__(self):
+        self._options = {}
+
+    def option(self, key, value):
+        self._options[key] = value
+        return self
+
+    def options(self, **options):
+        self._options.update(options)
+        return self
+
+    def json(self, path):
+        return DataFrame(_pandas().read_json(path, lines=not self._options.get("multiLine"), dtype=False))
+
+    def csv(self, path, header=None):
+        header = header if header is not None else str(self._options.get("header", "false")).lower() == "true"
+        pdf = _pandas().read_csv(path, header=0 if header else None, dtype=str, keep_default_na=False, na_values=[""])
+        if not header:
+            pdf.columns = [f"_c{i}" for i in range(len(pdf.columns))]
+        return DataFrame(pdf)
+
+    def parquet(self, path):
+        return DataFrame(_pandas().read_parquet(path))
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        _unsupported(f"DataFrameReader.{name}")
+
+
+class _Builder:
+    def appName(self, name):
+        return self
+
+    def master(self, master):
+        return self
+
+    def config(self, *args, **kwargs):
+        return self
+
+    def enableHiveSupport(self):
+        return self
+
+    def getOrCreate(self):
+        if SparkSession._active is None:
+            SparkSession._active = SparkSession()
+        return SparkSession._active
+
+
+class SparkSession:
+    _active = None
+    builder = _Builder()
+
+    def __init__(self):
+        self.sparkContext = SparkContext()
+
+    @classmethod
+    def getActiveSession(cls):
+        return cls._active
+
+    @property
+    def read(self):
+        return DataFrameReader()
+
+    def table(self, name):
+        _unsupported(f"spark.table('{name}') without a mock")
+
+    def createDataFrame(self, data, schema=None):
+        pd = _pandas()
+        if isinstance(data, pd.DataFrame):
+            return DataFrame(data.copy())
+        names = None
+        if isinstance(schema, StructType):
+            names = schema.names
+        elif isinstance(schema, (list, tuple)) and all(isinstance(s, str) for s in schema):
+            names = list(schema)
+        elif schema is not None:
+            _unsupported("DDL string schemas")
+        rows = [dict(r) if isinstance(r, dict) else r for r in data]
+        if rows and not isinstance(rows[0], dict) and names:
+            rows = [dict(zip(names, r)) for r in rows]
+        pdf = pd.DataFrame(rows, columns=names)
+        return DataFrame(pdf)
+
+    def sql(self, query):
+        _unsupported("spark.sql")
+
+    def stop(self):
+        pass
+
+
+# ─────────────────────────────────────
+# Module installation
+# ─────────────────────────────────────
+
+def _module_getattr(module_name):
+    def __getattr__(name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        _unsupported(f"{module_name}.{name}")
+    return __getattr__
+
+
+class _UnsupportedPysparkFinder(importlib.abc.MetaPathFinder):
+    """Turns imports of pyspark modules the shim does not provide into LiteUnsupported."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname == "pyspark" or fullname.startswith("pyspark."):
+            if fullname not in sys.modules:
+                _unsupported(f"module {fullname}")
+        return None
+
+
+def install():
+    """Registers the shim as `pyspark` for the current interpreter."""
+    _pandas()
+
+    pyspark = types.ModuleType("pyspark")
+    pyspark.__version__ = "dscc-lite"
+    sql = types.ModuleType("pyspark.sql")
+    functions = types.ModuleType("pyspark.sql.functions")
+    sql_types = types.ModuleType("pyspark.sql.types")
+
+    for name in ("SparkSession", "DataFrame", "Column", "Row"):
+        setattr(sql, name, globals()[name])
+    for name in ("col", "column", "lit"):
+        setattr(functions, name, globals()[name])
+    for name in ("StructType", "StructField", "StringType", "IntegerType", "LongType", "DoubleType",
+                 "FloatType", "BooleanType", "TimestampType", "DateType", "DataType"):
+        setattr(sql_types, name, globals()[name])
+
+    for module in (pyspark, sql, functions, sql_types):
+        module.__getattr__ = _module_getattr(module.__name__)
+    # Mark as packages so submodule imports reach _UnsupportedPysparkFinder
+    pyspark.__path__ = []
+    sql.__path__ = []
+    pyspark.sql = sql
+    sql.functions = functions
+    sql.types = sql_types
+
+    sys.modules.update({
+        "pyspark": pyspark,
+        "pyspark.sql": sql,
+        "pyspark.sql.functions": functions,
+        "pyspark.sql.types": sql_types,
+    })
+    sys.meta_path.insert(0, _UnsupportedPysparkFinder())
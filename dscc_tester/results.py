@@ -0,0 +1,142 @@
+import json
+import os
+import pathlib
+import time
+import xml.etree.ElementTree as ET
+
+from dscc_packaging.shared_utils import get_cache_dir
+
+STATUS_ICONS = {
+    "passed": "✅",
+    "cached": "⏭️ ",
+    "failed": "❌",
+    "error": "💥",
+}
+
+
+def new_run_dir(results_dir=None):
+    """
+    Returns a fresh directory for one test run. Concurrent runs never share
+    a results directory, unlike the old append-only /tmp/coverage.log.
+    """
+    if results_dir:
+        run_dir = pathlib.Path(results_dir)
+    else:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        run_dir = get_cache_dir() / "runs" / f"{stamp}-{os.getpid()}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+
+def load_jsonl(path):
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+class ResultsWriter:
+    """
+    Collects per-test result entries and writes them as results.jsonl and
+    junit.xml in a run-specific directory.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = pathlib.Path(run_dir)
+        self.entries = []
+
+    def add(self, entry):
+        self.entries.append(entry)
+
+    def extend(self, entries):
+        self.entries.extend(entries)
+
+    def add_missing(self, notebook, tests, recorded, exception):
+        """Adds an error entry for every test that produced no result (e.g. import failures)."""
+        seen = {entry.get("index") for entry in recorded}
+        for index, test in enumerate(tests):
+            if index not in seen:
+                self.add({
+                    "notebook": notebook,
+                    "function": test.get("function"),
+                    "index": index,
+                    "status": "error",
+                    "rows": None,
+                    "duration": None,
+                    "spark_jobs": None,
+                    "exception": exception,
+                })
+
+    def write(self):
+        jsonl_path = self.run_dir / "results.jsonl"
+        with open(jsonl_path, "w") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        self.write_junit(self.run_dir / "junit.xml")
+        return jsonl_path
+
+    def write_junit(self, path):
+        suites = ET.Element("testsuites")
+        by_notebook = {}
+        for entry in self.entries:
+            by_notebook.setdefault(entry["notebook"], []).append(entry)
+
+        for notebook, entries in sorted(by_notebook.items()):
+            suite = ET.SubElement(suites, "testsuite", {
+                "name": notebook,
+                "tests": str(len(entries)),
+                "failures": str(sum(e["status"] == "failed" for e in entries)),
+                "errors": str(sum(e["status"] == "error" for e in entries)),
+                "skipped": str(sum(e["status"] == "cached" for e in entries)),
+                "time": f"{sum(e.get('duration') or 0 for e in entries):.4f}",
+            })
+            for entry in entries:
+                case = ET.SubElement(suite, "testcase", {
+                    "classname": notebook,
+                    "name": f"{entry['function']}[{entry['index']}]",
+                    "time": f"{entry.get('duration') or 0:.4f}",
+                })
+                props = [name for name in ("rows", "spark_jobs") if entry.get(name) is not None]
+                if props:
+                    properties = ET.SubElement(case, "properties")
+                    for name in props:
+                        ET.SubElement(properties, "property", {"name": name, "value": str(entry[name])})
+                if entry["status"] == "failed":
+                    ET.SubElement(case, "failure", {"message": entry.get("exception") or ""})
+                elif entry["status"] == "error":
+                    ET.SubElement(case, "error", {"message": entry.get("exception") or ""})
+                elif entry["status"] == "cached":
+                    ET.SubElement(case, "skipped", {"message": "cached pass"})
+
+        ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+    def print_summary(self):
+        if not self.entries:
+            print("⚠️  No test results recorded.")
+            return
+
+        print("\n📊 DSCC Test Report:\n")
+        for entry in self.entries:
+            icon = STATUS_ICONS.get(entry["status"], "❔")
+            rows = entry.get("rows")
+            duration = entry.get("duration")
+            detail = f"returned {rows} rows" if rows is not None else entry["status"]
+            if duration is not None:
+                detail += f" in {duration:.2f}s"
+            if entry.get("exception"):
+                detail += f" — {entry['exception']}"
+            print(f"{icon} {entry['notebook']} :: {entry['function']}[{entry['index']}] — {detail}")
+
+        counts = {status: sum(e["status"] == status for e in self.entries) for status in STATUS_ICONS}
+        print("\n📌 Summary:")
+        print(f"  ✅ Passed: {counts['passed']}")
+        print(f"  ⏭️  Cached: {counts['cached']}")
+        print(f"  ❌ Failed (assertions): {counts['failed']}")
+        print(f"  💥 Errors (exceptions): {counts['error']}")
+        print(f"  📄 Total Tests: {len(self.entries)}")
+        print(f"  🗂️  Results: {self.run_dir}")
@@ -1,12 +1,46 @@
 import re
 
-def generate_test_file(tests, output_path, function_module):
+from dscc_tester.compare import MODES, DEFAULT_MODE, DEFAULT_MAX_DIFFS
+
+
+def parse_data_expectation(spec):
+    """
+    Normalizes `expect.data`, which is either a path or a mapping with
+    `path`, `mode`, `keys` and `max_diffs`. Returns None if it is invalid.
+    """
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    if not isinstance(spec, dict) or not spec.get("path"):
+        print(f"⚠️  Invalid data expectation: {spec!r}. Expected a path or a mapping with 'path'.")
+        return None
+    mode = spec.get("mode", DEFAULT_MODE)
+    if mode not in MODES:
+        print(f"⚠️  Invalid data comparison mode: '{mode}'. Expected one of: {', '.join(MODES)}")
+        return None
+    keys = spec.get("keys")
+    if isinstance(keys, str):
+        keys = [keys]
+    if mode == "keys" and not keys:
+        print("⚠️  Data comparison mode 'keys' needs a 'keys' list.")
+        return None
+    return {
+        "path": str(spec["path"]),
+        "mode": mode,
+        "keys": keys,
+        "max_diffs": int(spec.get("max_diffs", DEFAULT_MAX_DIFFS)),
+    }
+
+
+def generate_test_file(tests, output_path, function_module, notebook=None):
+    notebook = notebook or function_module
     lines = [
         f"from {function_module} import *\n",
         "import pytest\n",
         "import json\n",
         "import os\n",
-        "from pyspark.sql.types import StructType\n\n"
+        "from pyspark.sql.types import StructType\n",
+        "from dscc_harness import record_test\n",
+        "from dscc_compare import assert_matches_expected\n\n"
     ]
 
     def add_assertions(expect_block):
@@ -17,17 +51,20 @@ def generate_test_file(tests, output_path, function_module):
             match = re.match(r"^\s*(==|>|>=|<|<=)\s*(\d+)\s*$", count_val)
             if match:
                 op, num = match.groups()
-                assertions.append(f"    assert df.count() {op} {num}")
+                assertions.append(f"        assert rows {op} {num}")
             else:
                 print(f"⚠️  Invalid count assertion format: '{count_val}'. Expected formats like '> 0', '== 5', etc.")
-        if "data" in expect_block:
-            assertions.append(f"    with open(os.path.join(os.path.dirname(__file__), '{expect_block['data']}')) as f:")
-            assertions.append("        expected_data = [json.loads(line) for line in f]")
-            assertions.append("    actual_data = [row.asDict() for row in df.collect()]")
-            assertions.append("    assert actual_data == expected_data")
-        if "schema" in expect_block:
-            assertions.append(f"    expected_schema = {expect_block['schema']}")
-            assertions.append("    assert df.schema == expected_schema")
+        if expect_block.get("data"):
+            data = parse_data_expectation(expect_block["data"])
+            if data:
+                assertions.append(f"        expected_path = os.path.join(os.path.dirname(__file__), {data['path']!r})")
+                assertions.append(
+                    f"        assert_matches_expected(df, expected_path, mode={data['mode']!r}, "
+                    f"keys={data['keys']!r}, max_diffs={data['max_diffs']})"
+                )
+        if expect_block.get("schema"):
+            assertions.append(f"        expected_schema = {expect_block['schema']}")
+            assertions.append("        assert df.schema == expected_schema")
         return assertions
 
     for i, test in enumerate(tests):
@@ -48,7 +85,10 @@ def generate_test_file(tests, output_path, function_module):
 
         lines.append(f"def test_case_{i}():")
         lines.append(f"    \"\"\"{desc}\"\"\"")
-        lines.append(f"    df = {func_name}({input_str})")
+        lines.append(f"    with record_test({notebook!r}, {func_name!r}, {i}) as result:")
+        lines.append(f"        df = {func_name}({input_str})")
+        lines.append("        rows = df.count() if df is not None else 0")
+        lines.append("        result['rows'] = rows")
 
         if expect_block:
             lines.extend(add_assertions(expect_block))
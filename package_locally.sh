@@ -2,37 +2,11 @@
 # Helper script to package your DSCC app locally
 # Usage: ./package_locally.sh [dscc-tool options]
 # Example: ./package_locally.sh --noninteractive --no-sample
-
-# Function to clean system files
-clean_system_files() {
-    local dir="$1"
-    echo "🧹 Cleaning system files..."
-    
-    # macOS files
-    find "$dir" -name ".DS_Store" -type f -delete
-    find "$dir" -name "._*" -type f -delete
-    
-    # Windows files
-    find "$dir" -name "Thumbs.db" -type f -delete
-    
-    # Python files
-    find "$dir" -name "__pycache__" -type d -exec rm -rf {} +
-    find "$dir" -name "*.pyc" -type f -delete
-    find "$dir" -name "*.pyo" -type f -delete
-    find "$dir" -name "*.pyd" -type f -delete
-    
-    # Jupyter files
-    find "$dir" -name ".ipynb_checkpoints" -type d -exec rm -rf {} +
-    
-    echo "✅ System files cleaned"
-}
+# Set STRIP_ARGS to enforce a notebook size budget, e.g. STRIP_ARGS="--max_notebook_kb 512"
 
 echo "🚀 Starting local packaging process..."
 cd "/Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app"
 
-# Clean system files before starting
-clean_system_files "."
-
 # Check Python version
 python_version=$(python3 --version 2>&1 | cut -d' ' -f2)
 if [[ "$python_version" < "3.11" ]]; then
@@ -48,6 +22,9 @@ else
     exit 1
 fi
 
+# Clean system files before starting
+dscc packaging clean --app_path "."
+
 # Run the packaging process, passing all user arguments
 if dscc packaging prepare_notebooks --app_path "/Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app" "$@"; then
     echo "✅ Notebook preparation complete"
@@ -59,11 +36,18 @@ if dscc packaging prepare_notebooks --app_path "/Users/derek.king/Documents/Dev_
         
         # Validate manifest
         echo "🔍 Validating manifest..."
-        if dscc packaging validate_manifest --manifest_path "/Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app/manifest.yaml"; then
+        if ! dscc packaging validate_manifest --manifest_path "/Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app/manifest.yaml"; then
+            echo "❌ Manifest validation failed. Please fix the errors above and try again."
+            exit 1
+        fi
+
+        # Strip notebook outputs and check sizes
+        echo "✂️  Stripping notebook outputs..."
+        if dscc packaging strip_outputs --app_path "/Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app" $STRIP_ARGS; then
             echo "✨ Packaging complete! Your app is ready in: /Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app"
             echo "📦 To create the final package, run: dscc packaging package --app_path /Users/derek.king/Documents/Dev_Work/dscc_apps/databricks_workspace_detection_app"
         else
-            echo "❌ Manifest validation failed. Please fix the errors above and try again."
+            echo "❌ Notebooks are over the size budget. Please fix the errors above and try again."
             exit 1
         fi
     else
@@ -0,0 +1,88 @@
+"""
+Delta packages: a release plus its delta must give the new tree, and a delta
+must refuse a target that is not the release it was built against.
+"""
+import shutil
+import zipfile
+
+import pytest
+
+from dscc_packaging.delta import apply_delta, package_delta
+from dscc_packaging.package import package_app
+
+MANIFEST = """\
+app: demo
+version: {version}
+notebooks: []
+requirements:
+  platform: [serverless]
+  features: [jobs]
+"""
+
+
+def _tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.name != "manifest.yaml"
+    }
+
+
+@pytest.fixture
+def releases(tmp_path):
+    """(previous package, unpacked previous release, current app)."""
+    app = tmp_path / "demo"
+    (app / "base" / "detections").mkdir(parents=True)
+    (app / "sample_data" / "old").mkdir(parents=True)
+    (app / "manifest.yaml").write_text(MANIFEST.format(version="1.0.0"))
+    (app / "base" / "detections" / "kept.py").write_text("kept\n")
+    (app / "base" / "detections" / "changed.py").write_text("before\n")
+    (app / "sample_data" / "old" / "removed.json").write_text("{}\n")
+    previous = package_app(app, output=tmp_path / "demo-1.0.0.zip")
+
+    installed = tmp_path / "installed"
+    with zipfile.ZipFile(previous) as archive:
+        archive.extractall(installed)
+    installed = installed / "demo"
+
+    (app / "manifest.yaml").write_text(MANIFEST.format(version="1.0.1"))
+    (app / "base" / "detections" / "changed.py").write_text("after\n")
+    (app / "base" / "detections" / "added.py").write_text("added\n")
+    shutil.rmtree(app / "sample_data" / "old")
+    return previous, installed, app
+
+
+def test_delta_round_trip(releases, tmp_path):
+    previous, installed, app = releases
+    delta = package_delta(app, since=previous, output=tmp_path / "demo-delta.zip")
+    assert delta is not None
+
+    with zipfile.ZipFile(delta) as archive:
+        packaged = {name.split("/", 1)[1] for name in archive.namelist() if not name.endswith("/")}
+    assert packaged == {"manifest.yaml", "delta.yaml", "base/detections/changed.py", "base/detections/added.py"}
+
+    assert apply_delta(delta, installed)
+    assert _tree(installed) == _tree(app)
+    assert not (installed / "sample_data" / "old").exists()
+    assert "version: 1.0.1" in (installed / "manifest.yaml").read_text()
+    assert not list(installed.rglob("*.tmp"))
+
+
+def test_delta_refuses_a_modified_target(releases, tmp_path):
+    previous, installed, app = releases
+    delta = package_delta(app, since=previous, output=tmp_path / "demo-delta.zip")
+    (installed / "base" / "detections" / "changed.py").write_text("edited locally\n")
+    before = _tree(installed)
+
+    assert not apply_delta(delta, installed)
+    assert _tree(installed) == before
+
+    assert apply_delta(delta, installed, force=True)
+    assert _tree(installed) == _tree(app)
+
+
+def test_delta_from_a_manifest_without_files_table_fails(releases, tmp_path):
+    _, _, app = releases
+    bare = tmp_path / "manifest.yaml"
+    bare.write_text(MANIFEST.format(version="1.0.0"))
+    assert package_delta(app, since=bare, output=tmp_path / "demo-delta.zip") is None
@@ -0,0 +1,102 @@
+"""
+Ignore patterns follow .gitignore rules: name vs anchored patterns, `**`,
+folder-only patterns and negation, on both the combined-regex fast path and
+the ordered path used when a pattern is negated.
+"""
+import pytest
+
+from dscc_packaging.ignore import IgnoreMatcher, default_matcher
+
+PATTERNS = [
+    "*.pyc",
+    "build/",
+    "/dist",
+    "docs/*.md",
+    "logs/**/debug.log",
+    "**/tmp",
+    "cache/**",
+    "data[0-9].csv",
+]
+
+CASES = [
+    # (path, is_dir, ignored)
+    ("x.pyc", False, True),
+    ("a/b/x.pyc", False, True),
+    ("x.pyc.txt", False, False),
+    ("build", True, True),
+    ("a/build", True, True),
+    ("build", False, False),            # folder-only
+    ("dist", False, True),
+    ("dist", True, True),
+    ("a/dist", True, False),            # leading slash anchors to the root
+    ("docs/readme.md", False, True),
+    ("docs/api/readme.md", False, False),  # * stays within a component
+    ("a/docs/readme.md", False, False),    # a middle slash anchors too
+    ("logs/debug.log", False, True),
+    ("logs/a/b/debug.log", False, True),
+    ("logs/a/info.log", False, False),
+    ("tmp", True, True),
+    ("a/b/tmp", False, True),
+    ("cache/x", False, True),
+    ("cache/a/b", False, True),
+    ("cache", True, False),             # trailing ** matches inside, not the folder
+    ("data1.csv", False, True),
+    ("dataX.csv", False, False),
+]
+
+
+@pytest.mark.parametrize("ordered", [False, True], ids=["combined", "ordered"])
+@pytest.mark.parametrize("path,is_dir,ignored", CASES, ids=[f"{c[0]}{'/' if c[1] else ''}" for c in CASES])
+def test_patterns(path, is_dir, ignored, ordered):
+    # A negation that matches nothing forces the ordered, rule-by-rule path
+    matcher = IgnoreMatcher(PATTERNS + (["!never-matches"] if ordered else []))
+    assert matcher._ordered is ordered
+    assert matcher.match(path, is_dir=is_dir) is ignored
+
+
+def test_negation_uses_the_last_matching_rule():
+    matcher = IgnoreMatcher(["*.log", "!keep.log", "logs/keep.log"])
+    assert matcher.match("app.log")
+    assert not matcher.match("keep.log")
+    assert not matcher.match("a/keep.log")
+    assert matcher.match("logs/keep.log")
+
+
+def test_negation_respects_folder_only_rules():
+    matcher = IgnoreMatcher(["out", "!out/"])
+    assert matcher.match("out")
+    assert not matcher.match("out", is_dir=True)
+
+
+def test_comments_and_blank_lines_are_skipped():
+    matcher = IgnoreMatcher(["# *.py", "", "   ", "*.tmp"])
+    assert not matcher.match("a.py")
+    assert matcher.match("a.tmp")
+
+
+def test_walk_prunes_ignored_folders(tmp_path):
+    for rel in ("keep.py", "x.pyc", "build/out.py", "src/build/out.py", "src/main.py", "dist/a", "src/dist/a"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+    matcher = IgnoreMatcher(PATTERNS)
+
+    walked = [
+        (root / name).relative_to(tmp_path).as_posix()
+        for root, _, files in matcher.walk(tmp_path)
+        for name in files
+    ]
+    assert walked == ["keep.py", "src/main.py", "src/dist/a"]
+
+    found = [path.relative_to(tmp_path).as_posix() for path in matcher.find_ignored(tmp_path)]
+    assert found == ["build", "dist", "src/build", "x.pyc"]
+
+
+def test_default_matcher_skips_system_files():
+    matcher = default_matcher()
+    assert matcher.match(".git", is_dir=True)
+    assert matcher.match("base/__pycache__", is_dir=True)
+    assert not matcher.match("base/__pycache__")
+    assert matcher.match("base/._rule.py")
+    assert matcher.match("notebooks/.ipynb_checkpoints", is_dir=True)
+    assert not matcher.match("base/rule.py")
@@ -0,0 +1,81 @@
+"""
+Parity of the lite engine with Spark on null input: three-valued logic in
+filters, and null join keys that never match.
+
+Each case filters or joins the same rows. The expected ids
+are what Spark returns; when pyspark is installed the cases are also run
+against a local Spark session.
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from dscc_tester import lite
+
+ROWS = [(1, "a", 5), (2, "b", None), (3, None, 7), (4, None, None)]
+COLUMNS = ["id", "x", "n"]
+
+CASES = [
+    ("eq", lambda F: F.col("x") == "a", [1]),
+    ("ne", lambda F: F.col("x") != "a", [2]),
+    ("not_eq", lambda F: ~(F.col("x") == "a"), [2]),
+    ("gt", lambda F: F.col("n") > 5, [3]),
+    ("not_le", lambda F: ~(F.col("n") <= 5), [3]),
+    ("isin", lambda F: F.col("x").isin("a", "b"), [1, 2]),
+    ("not_isin", lambda F: ~F.col("x").isin("a"), [2]),
+    ("not_isin_with_null", lambda F: ~F.col("x").isin("a", None), []),
+    ("or_null", lambda F: (F.col("x") == "a") | (F.col("n") > 6), [1, 3]),
+    ("not_and_null", lambda F: ~((F.col("x") == "b") & (F.col("n") > 6)), [1]),
+    ("is_null", lambda F: F.col("x").isNull(), [3, 4]),
+]
+
+
+def _ids(rows):
+    return sorted(row["id"] for row in rows)
+
+
+@pytest.mark.parametrize("name,expression,expected", CASES, ids=[c[0] for c in CASES])
+def test_lite_matches_spark_on_nulls(name, expression, expected):
+    df = lite.SparkSession().createDataFrame(ROWS, COLUMNS)
+    assert _ids(df.filter(expression(lite)).collect()) == expected
+
+
+@pytest.fixture(scope="module")
+def spark():
+    pyspark = pytest.importorskip("pyspark.sql")
+    session = pyspark.SparkSession.builder.master("local[1]").appName("dscc-lite-parity").getOrCreate()
+    yield session
+    session.stop()
+
+
+@pytest.mark.parametrize("name,expression,expected", CASES, ids=[c[0] for c in CASES])
+def test_expected_ids_are_spark_results(spark, name, expression, expected):
+    from pyspark.sql import functions as F
+    df = spark.createDataFrame(ROWS, "id INT, x STRING, n INT")
+    assert _ids(df.filter(expression(F)).collect()) == expected
+
+
+LEFT = [(1, "u"), (2, None), (3, "v")]
+RIGHT = [("u", "x"), (None, "y")]
+
+JOIN_CASES = [
+    ("inner", [1]),
+    ("left", [1, 2, 3]),
+    ("left_semi", [1]),
+    ("left_anti", [2, 3]),
+]
+
+
+@pytest.mark.parametrize("how,expected", JOIN_CASES, ids=[c[0] for c in JOIN_CASES])
+def test_lite_join_never_matches_null_keys(how, expected):
+    session = lite.SparkSession()
+    left = session.createDataFrame(LEFT, ["id", "k"])
+    right = session.createDataFrame(RIGHT, ["k", "r"])
+    assert _ids(left.join(right, on="k", how=how).collect()) == expected
+
+
+@pytest.mark.parametrize("how,expected", JOIN_CASES, ids=[c[0] for c in JOIN_CASES])
+def test_expected_join_ids_are_spark_results(spark, how, expected):
+    left = spark.createDataFrame(LEFT, "id INT, k STRING")
+    right = spark.createDataFrame(RIGHT, "k STRING, r STRING")
+    assert _ids(left.join(right, on="k", how=how).collect()) == expected
@@ -0,0 +1,112 @@
+"""
+Package zips: readable by the standard library, identical for any number of
+jobs, and storing incompressible content instead of deflating it.
+"""
+import io
+import os
+import random
+import zipfile
+
+import pytest
+
+from dscc_packaging import package
+from dscc_packaging.package import (
+    METHOD_DEFLATED,
+    METHOD_STORED,
+    package_app,
+    verify_package,
+    write_app_zip,
+)
+
+MANIFEST = """\
+# Kept verbatim
+app: demo
+notebooks: []
+requirements:
+  platform: [serverless]
+  features: [jobs]
+"""
+
+
+@pytest.fixture
+def app(tmp_path):
+    root = tmp_path / "demo"
+    (root / "base" / "detections").mkdir(parents=True)
+    (root / "sample_data").mkdir()
+    (root / "manifest.yaml").write_text(MANIFEST)
+    (root / "base" / "detections" / "rule.py").write_text("def rule(df):\n    return df\n" * 200)
+    noise = random.Random(0).randbytes(200_000)
+    (root / "sample_data" / "noise.bin").write_bytes(noise)
+    (root / "sample_data" / "events.parquet").write_bytes(b"PAR1" + b"\0" * 5000)
+    (root / "base" / "empty.txt").write_bytes(b"")
+    return root
+
+
+def _zip_bytes(app, **kwargs):
+    stream = io.BytesIO()
+    write_app_zip(app, stream, **kwargs)
+    return stream.getvalue()
+
+
+def _tree(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.name != "manifest.yaml"
+    }
+
+
+def test_zip_is_valid_and_round_trips(app):
+    with zipfile.ZipFile(io.BytesIO(_zip_bytes(app))) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert "demo/" in names and "demo/base/detections/" in names
+        contents = {name.split("/", 1)[1]: archive.read(name) for name in names if not name.endswith("/")}
+    manifest = contents.pop("manifest.yaml").decode("utf-8")
+    assert manifest.startswith(MANIFEST)
+    assert "files:" in manifest
+    assert contents == _tree(app)
+
+
+def test_zip_is_deterministic(app):
+    first = _zip_bytes(app, jobs=1)
+    os.utime(app / "base" / "detections" / "rule.py", (0, 0))
+    assert _zip_bytes(app, jobs=4) == first
+    assert _zip_bytes(app, jobs=2) == first
+
+
+def test_multi_block_files_are_identical_for_any_jobs(app, monkeypatch):
+    # Small blocks exercise the dictionary-chained deflate across block boundaries
+    monkeypatch.setattr(package, "BLOCK_SIZE", 4096)
+    first = _zip_bytes(app, jobs=1)
+    assert _zip_bytes(app, jobs=8) == first
+    with zipfile.ZipFile(io.BytesIO(first)) as archive:
+        assert archive.testzip() is None
+        assert archive.read("demo/base/detections/rule.py") == (app / "base" / "detections" / "rule.py").read_bytes()
+
+
+def test_incompressible_and_known_formats_are_stored(app):
+    with zipfile.ZipFile(io.BytesIO(_zip_bytes(app))) as archive:
+        methods = {info.filename: info.compress_type for info in archive.infolist()}
+    assert methods["demo/base/detections/rule.py"] == METHOD_DEFLATED
+    assert methods["demo/sample_data/noise.bin"] == METHOD_STORED
+    assert methods["demo/sample_data/events.parquet"] == METHOD_STORED
+
+
+def test_package_app_writes_a_verifiable_package(app, tmp_path):
+    output = package_app(app, output=tmp_path / "out" / "demo.zip", jobs=2)
+    assert output == tmp_path / "out" / "demo.zip"
+    assert verify_package(output)
+    assert not list(output.parent.glob(".*.tmp"))
+
+
+def test_verify_package_detects_tampering(app, tmp_path):
+    output = package_app(app, output=tmp_path / "demo.zip")
+    tampered = tmp_path / "tampered.zip"
+    with zipfile.ZipFile(output) as source, zipfile.ZipFile(tampered, "w") as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename == "demo/base/detections/rule.py":
+                data += b"# changed\n"
+            target.writestr(info, data)
+    assert not verify_package(tampered)
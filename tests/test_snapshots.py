@@ -0,0 +1,154 @@
+"""
+Local snapshot reading: the SQL filter grammar translated to pyarrow, and the
+Delta log replay that picks the active data files.
+"""
+import json
+from datetime import date
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from dscc_packaging.snapshots import (
+    FilterParseError,
+    UnsupportedDeltaTable,
+    delta_active_files,
+    parse_filter,
+)
+
+TABLE = pa.table({
+    "id": [1, 2, 3, 4],
+    "host": ["web-1", "db", None, "it's"],
+    "n": [5, None, 7, 10],
+    "day": [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)],
+})
+
+FILTERS = [
+    ("host = 'db'", [2]),
+    ("host == 'db'", [2]),
+    ("host <> 'db'", [1, 4]),
+    ("n > 5", [3, 4]),
+    ("n >= '7'", [3, 4]),
+    ("host IN ('db', 'web-1')", [1, 2]),
+    ("host NOT IN ('db')", [1, 4]),
+    ("NOT (host IN ('db'))", [1, 4]),
+    ("host IN ('db', NULL)", [2]),
+    ("host NOT IN ('db', NULL)", []),
+    ("host IS NULL", [3]),
+    ("host is not null and n < 10", [1]),
+    ("NOT (n = 5) OR host = 'db'", [2, 3, 4]),
+    ("(host = 'db' OR n = 7) AND id > 2", [3]),
+    ("host = 'it''s'", [4]),
+    ("`host` = 'db'", [2]),
+    ("day >= '2024-01-03'", [3, 4]),
+]
+
+
+@pytest.mark.parametrize("text,expected", FILTERS, ids=[f[0] for f in FILTERS])
+def test_parse_filter(text, expected):
+    expression = parse_filter(text, TABLE.schema)
+    assert ds.dataset(TABLE).to_table(filter=expression).column("id").to_pylist() == expected
+
+
+@pytest.mark.parametrize("text", [
+    "host = ",
+    "host LIKE 'd%'",
+    "host = 'db' AND",
+    "(host = 'db'",
+    "host = 'db')",
+    "host IS 'db'",
+    "host NOT = 'db'",
+    "host IN ()",
+    "host = db",
+    "length(host) > 2",
+    "host; DROP TABLE t",
+])
+def test_parse_filter_rejects_unsupported_syntax(text):
+    with pytest.raises(FilterParseError):
+        parse_filter(text, TABLE.schema)
+
+
+def _write_commit(log_dir, version, *actions):
+    with open(log_dir / f"{version:020d}.json", "w") as f:
+        for action in actions:
+            f.write(json.dumps(action) + "\n")
+
+
+@pytest.fixture
+def delta_table(tmp_path):
+    log_dir = tmp_path / "_delta_log"
+    log_dir.mkdir()
+    for name in ("a.parquet", "b.parquet", "c%20d.parquet"):
+        pq.write_table(TABLE, tmp_path / name)
+    _write_commit(log_dir, 0, {"metaData": {"id": "t", "configuration": {}}}, {"add": {"path": "a.parquet"}}, {"add": {"path": "b.parquet"}})
+    _write_commit(log_dir, 1, {"remove": {"path": "a.parquet"}}, {"add": {"path": "c%20d.parquet"}})
+    return tmp_path
+
+
+def test_delta_replay_applies_adds_and_removes(delta_table):
+    version, files = delta_active_files(delta_table)
+    assert version == 1
+    assert sorted(f.name for f in files) == ["b.parquet", "c d.parquet"]
+
+
+def test_delta_replay_starts_from_the_last_checkpoint(delta_table):
+    log_dir = delta_table / "_delta_log"
+    checkpoint = pa.table({
+        "add": [{"path": "b.parquet"}, None],
+        "metaData": pa.array(
+            [None, {"id": "t", "configuration": [("delta.appendOnly", "true")]}],
+            type=pa.struct([("id", pa.string()), ("configuration", pa.map_(pa.string(), pa.string()))]),
+        ),
+    })
+    pq.write_table(checkpoint, log_dir / f"{1:020d}.checkpoint.parquet")
+    (log_dir / "_last_checkpoint").write_text(json.dumps({"version": 1}))
+    # Commits up to the checkpoint are ignored
+    (log_dir / f"{0:020d}.json").write_text("not json\n")
+    _write_commit(log_dir, 2, {"add": {"path": "a.parquet"}})
+
+    version, files = delta_active_files(delta_table)
+    assert version == 2
+    assert sorted(f.name for f in files) == ["a.parquet", "b.parquet"]
+
+
+def test_delta_replay_rejects_deletion_vectors(delta_table):
+    deletion_vector = {"storageType": "u", "pathOrInlineDv": "ab^-aqEH.-t@S}K{vb[*k^", "sizeInBytes": 36, "cardinality": 2}
+    _write_commit(delta_table / "_delta_log", 2, {"add": {"path": "a.parquet", "deletionVector": deletion_vector}})
+    with pytest.raises(UnsupportedDeltaTable, match="deletion vector"):
+        delta_active_files(delta_table)
+
+
+def test_delta_replay_ignores_deletion_vectors_on_removed_files(delta_table):
+    deletion_vector = {"storageType": "u", "pathOrInlineDv": "x", "sizeInBytes": 36, "cardinality": 2}
+    log_dir = delta_table / "_delta_log"
+    _write_commit(log_dir, 2, {"add": {"path": "a.parquet", "deletionVector": deletion_vector}})
+    _write_commit(log_dir, 3, {"remove": {"path": "a.parquet"}})
+    assert delta_active_files(delta_table)[0] == 3
+
+
+def test_delta_replay_rejects_column_mapping(delta_table):
+    _write_commit(delta_table / "_delta_log", 2, {"metaData": {"id": "t", "configuration": {"delta.columnMapping.mode": "name"}}})
+    with pytest.raises(UnsupportedDeltaTable, match="columnMapping"):
+        delta_active_files(delta_table)
+
+
+def test_delta_replay_rejects_column_mapping_from_a_checkpoint(delta_table):
+    log_dir = delta_table / "_delta_log"
+    checkpoint = pa.table({
+        "add": [{"path": "b.parquet"}, None],
+        "metaData": pa.array(
+            [None, {"id": "t", "configuration": [("delta.columnMapping.mode", "id")]}],
+            type=pa.struct([("id", pa.string()), ("configuration", pa.map_(pa.string(), pa.string()))]),
+        ),
+    })
+    pq.write_table(checkpoint, log_dir / f"{1:020d}.checkpoint.parquet")
+    (log_dir / "_last_checkpoint").write_text(json.dumps({"version": 1}))
+    with pytest.raises(UnsupportedDeltaTable, match="columnMapping"):
+        delta_active_files(delta_table)
+
+
+def test_delta_replay_accepts_column_mapping_none(delta_table):
+    _write_commit(delta_table / "_delta_log", 2, {"metaData": {"id": "t", "configuration": {"delta.columnMapping.mode": "none"}}})
+    assert delta_active_files(delta_table)[0] == 2
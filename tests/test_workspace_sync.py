@@ -0,0 +1,127 @@
+"""
+Incremental workspace sync against a LocalWorkspaceClient: only new and
+modified objects are downloaded, and only files an earlier sync wrote are
+removed when they disappear from the workspace.
+"""
+import os
+
+import pytest
+
+from dscc_packaging import workspace_sync
+from dscc_packaging.workspace_sync import LocalWorkspaceClient, sync_workspace
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(workspace_sync, "get_cache_dir", lambda: cache)
+    return cache
+
+
+def _write(root, rel, text, mtime=1_700_000_000):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "workspace"
+    _write(root, "my_app/base/detections/rule.py", "rule v1\n")
+    _write(root, "my_app/base/detections/old.py", "old\n")
+    _write(root, "my_app/lib/helpers/util.py", "util\n")
+    _write(root, "my_app/README.md", "readme\n")
+    return root
+
+
+def _sync(workspace, local, **kwargs):
+    return sync_workspace(LocalWorkspaceClient(workspace), "/my_app", local, max_workers=2, **kwargs)
+
+
+def test_second_sync_downloads_nothing(workspace, tmp_path):
+    local = tmp_path / "local"
+    first = _sync(workspace, local)
+    assert sorted(first.downloaded) == ["README.md", "base/detections/old.py", "base/detections/rule.py", "lib/helpers/util.py"]
+    assert (local / "base" / "detections" / "rule.py").read_text() == "rule v1\n"
+
+    second = _sync(workspace, local)
+    assert second.downloaded == [] and second.removed == []
+    assert len(second.unchanged) == 4
+
+
+def test_modified_and_locally_missing_files_are_downloaded(workspace, tmp_path):
+    local = tmp_path / "local"
+    _sync(workspace, local)
+    _write(workspace, "my_app/base/detections/rule.py", "rule v2\n", mtime=1_700_000_100)
+    (local / "README.md").unlink()
+
+    result = _sync(workspace, local)
+    assert sorted(result.downloaded) == ["README.md", "base/detections/rule.py"]
+    assert (local / "base" / "detections" / "rule.py").read_text() == "rule v2\n"
+    assert (local / "README.md").exists()
+
+
+def test_only_synced_files_are_removed(workspace, tmp_path):
+    local = tmp_path / "local"
+    _sync(workspace, local)
+    # Files generated locally, next to synced ones and in their own folders
+    _write(local, "manifest.yaml", "app: my_app\n")
+    _write(local, "base/detections/generated_test.py", "test\n")
+    (workspace / "my_app" / "base" / "detections" / "old.py").unlink()
+    (workspace / "my_app" / "lib" / "helpers" / "util.py").unlink()
+
+    result = _sync(workspace, local)
+    assert sorted(result.removed) == ["base/detections/old.py", "lib/helpers/util.py"]
+    assert not (local / "base" / "detections" / "old.py").exists()
+    # Folders left empty by a removal are dropped
+    assert not (local / "lib").exists()
+    assert (local / "manifest.yaml").exists()
+    assert (local / "base" / "detections" / "generated_test.py").exists()
+
+    # A tombstone is applied once; the file is not in the state any more
+    assert _sync(workspace, local).removed == []
+
+
+def test_force_downloads_everything_and_still_removes(workspace, tmp_path):
+    local = tmp_path / "local"
+    _sync(workspace, local)
+    (workspace / "my_app" / "README.md").unlink()
+
+    result = _sync(workspace, local, force=True)
+    assert result.unchanged == []
+    assert len(result.downloaded) == 3
+    assert result.removed == ["README.md"]
+
+
+def test_failed_downloads_are_retried_and_not_removed(workspace, tmp_path):
+    class FlakyClient(LocalWorkspaceClient):
+        failing = True
+
+        def download(self, obj, stream):
+            if self.failing and obj.path.endswith("rule.py"):
+                raise OSError("connection reset")
+            return super().download(obj, stream)
+
+    local = tmp_path / "local"
+    _sync(workspace, local)
+    _write(workspace, "my_app/base/detections/rule.py", "rule v2\n", mtime=1_700_000_100)
+
+    client = FlakyClient(workspace)
+    result = sync_workspace(client, "/my_app", local)
+    assert list(result.failed) == ["base/detections/rule.py"]
+    assert not result.ok
+    # The stale copy is kept, not removed, and no temp file is left behind
+    assert (local / "base" / "detections" / "rule.py").read_text() == "rule v1\n"
+    assert not list(local.rglob("*.tmp"))
+
+    client.failing = False
+    result = sync_workspace(client, "/my_app", local)
+    assert result.downloaded == ["base/detections/rule.py"]
+    assert (local / "base" / "detections" / "rule.py").read_text() == "rule v2\n"
+
+
+def test_state_is_kept_per_local_folder(workspace, tmp_path):
+    _sync(workspace, tmp_path / "one")
+    result = _sync(workspace, tmp_path / "two")
+    assert len(result.downloaded) == 4